@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark the JSON for the network explorer from :func:`bel_commons.send_utils.to_json_custom`.
+
+Run with :code:`python benchmarks/bench_explorer_json.py --edges 20000`. It compares:
+
+1. ``baseline``: the previous implementation, which built the BEL strings of nodes each time they were sorted, hashed,
+   or compared
+2. ``cold``: the current implementation with an empty memo of BEL strings, like the first request for a query
+3. ``warm``: the current implementation with the memo stored alongside the query in the graph cache, after the graph
+   and memo have been pickled and loaded like they are by :class:`bel_commons.graph_cache.GraphCache`
+"""
+
+import argparse
+import gc
+import pickle
+import random
+import time
+from operator import methodcaller
+from typing import Any, Callable
+
+from bel_commons.send_utils import CanonicalStrings, to_json_custom
+from pybel import BELGraph, from_bytes, to_bytes
+from pybel.canonicalize import edge_to_bel
+from pybel.constants import RELATION, TWO_WAY_RELATIONS
+from pybel.dsl import Protein, ProteinModification
+
+
+def make_graph(number_nodes: int, number_edges: int, seed: int = 0) -> BELGraph:
+    """Make a random graph of proteins, some of them modified, with increases and association edges."""
+    rng = random.Random(seed)
+    nodes = [
+        Protein('HGNC', f'GENE{i}', variants=[ProteinModification('Ph', code='Ser', position=i)])
+        if i % 3 == 0 else
+        Protein('HGNC', f'GENE{i}')
+        for i in range(number_nodes)
+    ]
+    graph = BELGraph(name='benchmark', version='1.0.0')
+    for i in range(number_edges):
+        u, v = rng.sample(nodes, 2)
+        add_edge = graph.add_association if i % 5 == 0 else graph.add_increases
+        add_edge(u, v, citation=str(rng.randint(1, 10 ** 6)), evidence=f'Evidence {i}')
+    return graph
+
+
+def baseline_to_json_custom(graph: BELGraph):
+    """Prepare JSON for the network explorer like before the memo of BEL strings was used."""
+    mapping = {}
+    nodes = []
+    for i, node in enumerate(sorted(graph, key=methodcaller('as_bel'))):
+        data = node.copy()
+        data['id'] = node.md5
+        data['bel'] = node.as_bel()
+        nodes.append(data)
+        mapping[node] = i
+
+    rr = {}
+    for u, v, key, data in graph.edges(keys=True, data=True):
+        if data[RELATION] in TWO_WAY_RELATIONS and (u, v) != tuple(sorted((u, v), key=methodcaller('as_bel'))):
+            continue
+        if (u, v) not in rr:
+            rr[u, v] = {'source': mapping[u], 'target': mapping[v], 'contexts': []}
+        payload = {'id': key, 'bel': edge_to_bel(u, v, data)}
+        payload.update(data)
+        rr[u, v]['contexts'].append(payload)
+
+    return {'nodes': nodes, 'links': list(rr.values())}
+
+
+def time_best(setup: Callable[[], Any], func: Callable[[Any], None], repeats: int) -> float:
+    """Get the shortest time of the given number of runs of the function on the results of the setup."""
+    times = []
+    for _ in range(repeats):
+        value = setup()
+        gc.collect()
+        start = time.perf_counter()
+        func(value)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=5000)
+    parser.add_argument('--edges', type=int, default=20000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    graph = make_graph(args.nodes, args.edges)
+    print(f'{graph.number_of_nodes()} nodes and {graph.number_of_edges()} edges')
+
+    graph_bytes = to_bytes(graph)  # this is how the graph cache stores query results
+
+    canonical = CanonicalStrings()
+    to_json_custom(graph, canonical=canonical)
+    memo_bytes = pickle.dumps(canonical.bels)
+    cached_graph_bytes = to_bytes(graph)  # the hashes of the nodes are kept on them now
+
+    baseline = time_best(lambda: from_bytes(graph_bytes), baseline_to_json_custom, args.repeats)
+    cold = time_best(
+        lambda: from_bytes(graph_bytes),
+        lambda loaded: to_json_custom(loaded, canonical=CanonicalStrings()),
+        args.repeats,
+    )
+    warm = time_best(
+        lambda: (from_bytes(cached_graph_bytes), CanonicalStrings(pickle.loads(memo_bytes))),
+        lambda loaded: to_json_custom(loaded[0], canonical=loaded[1]),
+        args.repeats,
+    )
+
+    for name, seconds in (('baseline', baseline), ('cold', cold), ('warm', warm)):
+        print(f'{name:>8}: {seconds:.3f} seconds ({baseline / seconds:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark the JSON encoders for responses from :mod:`bel_commons.json_provider`.
+
+Run with :code:`python benchmarks/bench_json.py --edges 20000`. It encodes the JSON for the network explorer, the
+node-link JSON, and the betweenness centrality of the nodes of a random graph with:
+
+1. ``pretty``: the standard library, indented and with sorted keys, like :func:`flask.jsonify` did before because
+   ``JSONIFY_PRETTYPRINT_REGULAR`` is set
+2. ``compact``: the standard library, compact and with sorted keys
+3. ``fast``: :func:`bel_commons.json_provider.dumps`, compact and with sorted keys, which uses :mod:`orjson` if it's
+   installed
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Callable
+
+from bench_explorer_json import make_graph
+
+from bel_commons import json_provider
+from bel_commons.graph_snapshot import GraphSnapshot
+from bel_commons.send_utils import to_json_custom
+from pybel import to_nodelink
+
+
+def time_best(func: Callable[[], Any], repeats: int) -> float:
+    """Get the shortest time of the given number of runs of the function."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=5000)
+    parser.add_argument('--edges', type=int, default=20000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    graph = make_graph(args.nodes, args.edges)
+    print(f'{graph.number_of_nodes()} nodes and {graph.number_of_edges()} edges')
+    print(f'orjson is {"not " if json_provider.orjson is None else ""}installed')
+
+    snapshot = GraphSnapshot.from_graph(graph)
+    centrality = snapshot.get_approximate_betweenness_centrality(0.1, seed=0)
+    payloads = {
+        'explorer': to_json_custom(graph),
+        'nodelink': to_nodelink(graph),
+        'centrality': [
+            (node_hash, value)
+            for node_hash, value in zip(snapshot.get_node_hashes(range(len(centrality))), centrality)
+        ],
+    }
+
+    encoders = {
+        'pretty': lambda value: json.dumps(
+            value, default=json_provider.default, indent=2, separators=(', ', ': '), sort_keys=True,
+        ),
+        'compact': lambda value: json.dumps(
+            value, default=json_provider.default, separators=(',', ':'), sort_keys=True,
+        ),
+        'fast': lambda value: json_provider.dumps(value, sort_keys=True),
+    }
+
+    for payload_name, payload in payloads.items():
+        baseline = None
+        for encoder_name, encode in encoders.items():
+            size = len(encode(payload).encode('utf-8'))
+            seconds = time_best(lambda: encode(payload), args.repeats)
+            if baseline is None:
+                baseline = seconds, size
+            print(
+                f'{payload_name:>10} {encoder_name:>8}: {seconds:.3f} seconds ({baseline[0] / seconds:.1f}x), '
+                f'{size / 1024 ** 2:.1f} MiB ({size / baseline[1]:.0%})',
+            )
+
+
+if __name__ == '__main__':
+    main()
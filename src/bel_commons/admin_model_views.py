@@ -29,7 +29,23 @@ class ModelView(ModelViewBase):
         return redirect(url_for_security('login', next=request.url))
 
 
-class NetworkView(ModelView):
+class PermissionModelView(ModelView):
+    """A view for models that grant rights to networks, which bumps the version of the rights when they change."""
+
+    def __init__(self, model, manager: Manager, *args, **kwargs):  # noqa: D107
+        super().__init__(model, manager.session, *args, **kwargs)
+        self.manager = manager
+
+    def on_model_change(self, form, model, is_created):
+        """Bump the version of the rights to networks in the same transaction as the change."""
+        self.manager.bump_permission_version()
+
+    def on_model_delete(self, model):
+        """Bump the version of the rights to networks in the same transaction as the deletion."""
+        self.manager.bump_permission_version()
+
+
+class NetworkView(PermissionModelView):
     """Special view for PyBEL Networks."""
 
     column_exclude_list = ['blob', 'md5', 'authors', 'description', 'copyright', 'disclaimer', 'licenses']
@@ -47,7 +63,7 @@ class NamespaceView(ModelView):
     column_exclude_list = ['query_url', 'description', 'author', 'license', 'citation_description']
 
 
-class ReportView(ModelView):
+class ReportView(PermissionModelView):
     """Special view for reports."""
 
     column_exclude_list = ['source', 'calculations', 'source_hash']
@@ -87,12 +103,48 @@ class ExperimentView(ModelView):
     column_exclude_list = ['source', 'result']
 
 
-class UserView(ModelView):
+class UserView(PermissionModelView):
     """A :mod:`flask_admin` view for users."""
 
     column_exclude_list = ['password']
 
 
+class EdgeVoteView(ModelView):
+    """A :mod:`flask_admin` view for votes on edges, which keeps the counts of votes on each edge in sync.
+
+    Votes can only be deleted here, since they're made and changed by users on the edge pages.
+    """
+
+    can_create = False
+    can_edit = False
+
+    def __init__(self, model, manager: Manager, *args, **kwargs):  # noqa: D107
+        super().__init__(model, manager.session, *args, **kwargs)
+        self.manager = manager
+
+    def on_model_delete(self, model):
+        """Remove the vote from the counts of votes on its edge in the same transaction as the deletion."""
+        self.manager.uncount_edge_vote(model)
+
+
+class EdgeCommentView(ModelView):
+    """A :mod:`flask_admin` view for comments on edges, which keeps the counts of comments on each edge in sync.
+
+    Comments can only be deleted here, since they're made by users on the edge pages.
+    """
+
+    can_create = False
+    can_edit = False
+
+    def __init__(self, model, manager: Manager, *args, **kwargs):  # noqa: D107
+        super().__init__(model, manager.session, *args, **kwargs)
+        self.manager = manager
+
+    def on_model_delete(self, model):
+        """Remove the comment from the counts of comments on its edge in the same transaction as the deletion."""
+        self.manager.uncount_edge_comment(model)
+
+
 class QueryView(ModelView):
     """A :mod:`flask_admin` view for queries."""
 
@@ -176,6 +228,11 @@ def build_project_view(manager: Manager) -> ModelView:  # noqa: D202
             """Add the current user when they creating a project, automatically."""
             if current_user not in model.users:
                 model.users.append(current_user)
+            manager.bump_permission_version()
+
+        def on_model_delete(self, model):
+            """Bump the version of the rights to networks in the same transaction as the deletion."""
+            manager.bump_permission_version()
 
         form_ajax_refs = {
             'networks': build_network_ajax_manager(manager=manager),
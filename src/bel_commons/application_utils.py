@@ -17,8 +17,8 @@ from pybel.manager.models import Author, Citation, Edge, Evidence, Namespace, Na
 from pybel.struct.mutation import expand_node_neighborhood, expand_nodes_neighborhoods, infer_child_relations
 from pybel.struct.pipeline import in_place_transformation, uni_in_place_transformation
 from .admin_model_views import (
-    CitationView, EdgeView, EvidenceView, ExperimentView, ModelView, NamespaceView, NetworkView, NodeView, QueryView,
-    ReportView, UserView, build_project_view,
+    CitationView, EdgeCommentView, EdgeView, EdgeVoteView, EvidenceView, ExperimentView, ModelView, NamespaceView,
+    NetworkView, NodeView, PermissionModelView, QueryView, ReportView, UserView, build_project_view,
 )
 from .constants import SENTRY_DSN
 from .manager_utils import insert_graph
@@ -144,23 +144,23 @@ def register_admin_service(app: Flask, manager: Manager) -> Admin:
     """Add a Flask-Admin database front-end."""
     admin = Admin(app, template_mode='bootstrap3')
 
-    admin.add_view(UserView(User, manager.session))
-    admin.add_view(ModelView(Role, manager.session))
+    admin.add_view(UserView(User, manager))
+    admin.add_view(PermissionModelView(Role, manager))
     admin.add_view(NamespaceView(Namespace, manager.session, category='Terminology'))
     admin.add_view(ModelView(NamespaceEntry, manager.session, category='Terminology'))
-    admin.add_view(NetworkView(Network, manager.session, category='Network'))
+    admin.add_view(NetworkView(Network, manager, category='Network'))
     admin.add_view(NodeView(Node, manager.session))
     admin.add_view(EdgeView(Edge, manager.session, category='Edge'))
     admin.add_view(CitationView(Citation, manager.session, category='Provenance'))
     admin.add_view(EvidenceView(Evidence, manager.session, category='Provenance'))
     admin.add_view(ModelView(Author, manager.session, category='Provenance'))
-    admin.add_view(ReportView(Report, manager.session, category='Network'))
+    admin.add_view(ReportView(Report, manager, category='Network'))
     admin.add_view(ExperimentView(Experiment, manager.session))
     admin.add_view(QueryView(Query, manager.session, category='Query'))
     admin.add_view(ModelView(UserQuery, manager.session, category='Query'))
     admin.add_view(ModelView(Assembly, manager.session))
-    admin.add_view(ModelView(EdgeVote, manager.session, category='Edge'))
-    admin.add_view(ModelView(EdgeComment, manager.session, category='Edge'))
+    admin.add_view(EdgeVoteView(EdgeVote, manager, category='Edge'))
+    admin.add_view(EdgeCommentView(EdgeComment, manager, category='Edge'))
     admin.add_view(ModelView(NetworkOverlap, manager.session, category='Network'))
     admin.add_view(build_project_view(manager=manager))
 
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+"""Pre-rendered exports of networks that are served directly from files.
+
+Networks don't change after they're uploaded, so each of their exports is rendered once, either by a Celery task
+right after the upload or on demand the first time it's requested, then stored in an :class:`ArtifactStore`.
+
+The store is content-addressed: each rendered file is named by the SHA-256 hash of its content, so identical exports
+share one file and the hash doubles as a strong ETag. An index entry for each network, version, and format points to
+the file. The version is the network's generation token in :class:`bel_commons.graph_cache.GraphCache`, so exports
+of a network that was replaced aren't served.
+
+:func:`serve_artifact` sends a file with its ETag and ``Last-Modified`` date and answers conditional requests from
+clients that already have it with ``304 Not Modified``.
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, Iterable, NamedTuple, Optional, Set, Tuple
+
+from flask import Response, current_app, request
+from werkzeug.http import is_resource_modified
+from werkzeug.wsgi import wrap_file
+
+from .graph_cache import KeyLock
+
+__all__ = [
+    'Artifact',
+    'ArtifactStore',
+    'serve_artifact',
+]
+
+logger = logging.getLogger(__name__)
+
+#: Files younger than this number of seconds aren't pruned, since their index entry might not have been written yet
+_PRUNE_GRACE_SECONDS = 60 * 60
+
+
+class Artifact(NamedTuple):
+    """A rendered export of a network stored in an :class:`ArtifactStore`."""
+
+    #: The SHA-256 hash of the content of the file
+    digest: str
+    #: The path to the file
+    path: str
+    #: The MIME type of the file
+    mimetype: str
+    #: The name of the file for the browser to download it as. If none, it's shown inline.
+    filename: Optional[str]
+    #: When the file was rendered, in UTC
+    created: datetime.datetime
+
+
+class ArtifactStore:
+    """A content-addressed store of the rendered exports of networks."""
+
+    def __init__(self, directory: str) -> None:
+        """Build an artifact store.
+
+        :param directory: The directory in which the files, index, and locks are stored. Is created if it does not
+         exist.
+        """
+        self.directory = directory
+        self.objects_directory = os.path.join(directory, 'objects')
+        self.index_directory = os.path.join(directory, 'index')
+        os.makedirs(self.objects_directory, exist_ok=True)
+        os.makedirs(self.index_directory, exist_ok=True)
+        self.lock = KeyLock(os.path.join(directory, 'locks'))
+
+    def get_object_path(self, digest: str) -> str:
+        """Get the path to the file with the given hash."""
+        return os.path.join(self.objects_directory, digest[:2], digest)
+
+    def get_index_path(self, network_id: int, version: str, serve_format: str) -> str:
+        """Get the path to the index entry for the export of the given version of a network in the given format."""
+        return os.path.join(self.index_directory, str(network_id), version, f'{serve_format}.json')
+
+    def get(self, network_id: int, version: str, serve_format: str) -> Optional[Artifact]:
+        """Get the export of the given version of a network in the given format, if it has been rendered."""
+        try:
+            with open(self.get_index_path(network_id, version, serve_format)) as file:
+                entry = json.load(file)
+        except FileNotFoundError:
+            return None
+
+        path = self.get_object_path(entry['digest'])
+        if not os.path.exists(path):
+            return None
+
+        return Artifact(
+            digest=entry['digest'],
+            path=path,
+            mimetype=entry['mimetype'],
+            filename=entry['filename'],
+            created=datetime.datetime.utcfromtimestamp(entry['created']),
+        )
+
+    def put(
+        self,
+        network_id: int,
+        version: str,
+        serve_format: str,
+        chunks: Iterable[bytes],
+        mimetype: str,
+        filename: Optional[str] = None,
+    ) -> Artifact:
+        """Store the export of the given version of a network in the given format.
+
+        The chunks are written to a temporary file while they're hashed, then the file is moved to its place in the
+        store, so the export is never held in memory all at once.
+        """
+        digest = hashlib.sha256()
+        fd, temporary_path = tempfile.mkstemp(dir=self.objects_directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    file.write(chunk)
+
+            path = self.get_object_path(digest.hexdigest())
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+        created = int(time.time())
+        _write_json_atomically(self.get_index_path(network_id, version, serve_format), {
+            'digest': digest.hexdigest(),
+            'mimetype': mimetype,
+            'filename': filename,
+            'created': created,
+        })
+        logger.debug('stored %s export of network [id=%s] as %s', serve_format, network_id, digest.hexdigest())
+
+        return Artifact(
+            digest=digest.hexdigest(),
+            path=path,
+            mimetype=mimetype,
+            filename=filename,
+            created=datetime.datetime.utcfromtimestamp(created),
+        )
+
+    def get_or_render(
+        self,
+        network_id: int,
+        version: str,
+        serve_format: str,
+        render: Callable[[], Tuple[Iterable[bytes], str, Optional[str]]],
+    ) -> Artifact:
+        """Get the export of the given version of a network in the given format, or render and store it.
+
+        Concurrent calls for the same export wait for the first one to render it instead of rendering it again.
+
+        :param network_id: The database identifier of the network
+        :param version: The version of the network
+        :param serve_format: The export format
+        :param render: A function that returns the chunks of the export, its MIME type, and its file name
+        """
+        artifact = self.get(network_id, version, serve_format)
+        if artifact is not None:
+            return artifact
+
+        with self.lock(f'{network_id}:{version}:{serve_format}'):
+            artifact = self.get(network_id, version, serve_format)
+            if artifact is not None:
+                return artifact
+
+            chunks, mimetype, filename = render()
+            return self.put(network_id, version, serve_format, chunks, mimetype=mimetype, filename=filename)
+
+    def remove_network(self, network_id: int) -> None:
+        """Remove the index entries for all versions of the network and the files no other entries point to."""
+        shutil.rmtree(os.path.join(self.index_directory, str(network_id)), ignore_errors=True)
+        self.prune()
+
+    def prune(self) -> None:
+        """Remove the files that no index entries point to."""
+        digests = self._get_indexed_digests()
+        threshold = time.time() - _PRUNE_GRACE_SECONDS
+
+        for directory, _, names in os.walk(self.objects_directory):
+            for name in names:
+                if name.endswith('.tmp') or name in digests:
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    if os.stat(path).st_mtime < threshold:
+                        os.remove(path)
+                except FileNotFoundError:  # removed by another process
+                    continue
+
+    def _get_indexed_digests(self) -> Set[str]:
+        digests = set()
+        for directory, _, names in os.walk(self.index_directory):
+            for name in names:
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(directory, name)) as file:
+                        digests.add(json.load(file)['digest'])
+                except FileNotFoundError:
+                    continue
+        return digests
+
+
+def serve_artifact(artifact: Artifact) -> Response:
+    """Send the file of an artifact, or an empty ``304 Not Modified`` response if the client already has it.
+
+    Since networks might be private, shared caches are told not to store the response and browsers are told to
+    check whether it changed before using their copy.
+    """
+    if not is_resource_modified(request.environ, etag=artifact.digest, last_modified=artifact.created):
+        response = current_app.response_class(status=304)
+    else:
+        file = open(artifact.path, 'rb')
+        response = current_app.response_class(
+            wrap_file(request.environ, file),
+            mimetype=artifact.mimetype,
+            direct_passthrough=True,
+        )
+        response.content_length = os.fstat(file.fileno()).st_size
+        if artifact.filename is not None:
+            response.headers.set('Content-Disposition', 'attachment', filename=artifact.filename)
+
+    response.set_etag(artifact.digest)
+    response.last_modified = artifact.created
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _write_json_atomically(path: str, value) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump(value, file)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
@@ -13,7 +13,7 @@ import logging
 import os
 import random
 import time
-from typing import Dict, Mapping, Optional
+from typing import Any, Dict, Mapping, Optional
 
 import requests.exceptions
 from celery import Celery
@@ -209,6 +209,7 @@ def parse(  # noqa: C901
 
     fill_out_report(graph=graph, network=network, report=report)
     report.time = time.time() - t
+    manager.bump_permission_version()
 
     celery_logger.info(f'Committing report={report_id} for network={network_id}')
     try:
@@ -221,6 +222,8 @@ def parse(  # noqa: C901
         return -1
     else:
         make_mail(report, 'Parsing succeeded', f'Parsing succeeded for {source_name}')
+        render_network_artifacts.delay(network_id)
+        update_network_overlaps.delay(network_id)
         return dict(network_id=network_id, report_id=report_id)
     finally:
         manager.session.close()
@@ -266,6 +269,95 @@ def run_heat_diffusion(connection: str, experiment_id: int) -> int:
     return experiment_id
 
 
+@celery_app.task(name='run-betweenness-centrality')
+def run_betweenness_centrality(query_id: int, error: float) -> Optional[Dict[str, Any]]:
+    """Calculate the betweenness centrality of the nodes in the result of a query.
+
+    The result is returned through the celery result backend since the graph cache of the worker might not be shared
+    with the web application. It's read by :func:`bel_commons.database_service.get_nodes_by_betweenness_centrality`.
+
+    :param query_id: The database identifier of the query
+    :param error: The maximum absolute error of the estimated betweenness centrality of any node
+    :return: A dictionary with the query's identifier, the error, the digest of the snapshot the betweenness
+     centrality was calculated on, and the betweenness centrality of each node in the order of the snapshot
+    """
+    from .core import manager
+
+    query = manager.get_query_by_id(query_id)
+    if query is None:
+        celery_logger.warning(f'query {query_id} does not exist')
+        return None
+
+    t = time.time()
+    betweenness = manager.get_betweenness_centrality_from_query(query, error)
+    if betweenness is None:
+        celery_logger.warning(f'query {query_id} has no result')
+        return None
+    celery_logger.info(f'calculated betweenness centrality for query {query_id} in {time.time() - t:.2f} seconds')
+
+    snapshot = manager.get_snapshot_from_query(query)
+    return dict(
+        query_id=query_id,
+        error=error,
+        digest=snapshot.get_digest(),
+        centralities=betweenness.tolist(),
+    )
+
+
+@celery_app.task(name='render-network-artifacts')
+def render_network_artifacts(network_id: int) -> int:
+    """Render the exports of a network in the formats from the configuration and store them.
+
+    :param network_id: The database identifier of the network
+    """
+    from .core import manager
+
+    network = manager.get_network_by_id(network_id)
+    if network is None:
+        celery_logger.warning(f'network {network_id} does not exist')
+        return -1
+
+    for serve_format in current_app.config.get('EXPORT_ARTIFACT_FORMATS', []):
+        t = time.time()
+        artifact = manager.get_network_artifact(network, serve_format)
+        if artifact is None:
+            celery_logger.info('no artifact store is configured')
+            return -2
+        celery_logger.info(f'rendered {serve_format} export of network {network_id} in {time.time() - t:.2f} seconds')
+
+    return network_id
+
+
+@celery_app.task(name='build-network-overlaps')
+def build_network_overlaps() -> int:
+    """Calculate the node overlaps between all pairs of recent networks."""
+    from .core import manager
+
+    t = time.time()
+    count = manager.build_network_overlaps()
+    celery_logger.info(f'stored {count} network overlaps in {time.time() - t:.2f} seconds')
+    return count
+
+
+@celery_app.task(name='update-network-overlaps')
+def update_network_overlaps(network_id: int) -> int:
+    """Calculate the node overlaps between a network and all recent networks.
+
+    :param network_id: The database identifier of the network
+    """
+    from .core import manager
+
+    network = manager.get_network_by_id(network_id)
+    if network is None:
+        celery_logger.warning(f'network {network_id} does not exist')
+        return -1
+
+    t = time.time()
+    count = manager.update_network_overlaps(network)
+    celery_logger.info(f'stored {count} overlaps for network {network_id} in {time.time() - t:.2f} seconds')
+    return count
+
+
 @celery_app.task(name='upload-json')
 def upload_json(connection: str, user_id: int, payload: Dict, public: bool = False):
     """Receive and process a JSON serialized BEL graph.
@@ -287,12 +379,14 @@ def upload_json(connection: str, user_id: int, payload: Dict, public: bool = Fal
     public = current_app.config.get('DISALLOW_PRIVATE') or public
 
     try:
-        insert_graph(manager=manager, graph=graph, user=user, public=public)
+        network = insert_graph(manager=manager, graph=graph, user=user, public=public)
     except Exception:
         celery_logger.exception('unable to insert graph')
         manager.session.rollback()
         return -2
 
+    render_network_artifacts.delay(network.id)
+    update_network_overlaps.delay(network.id)
     return 0
 
 
@@ -29,8 +29,9 @@ from pybel.version import get_version as pybel_version
 from .manager import WebManager
 from .manager_utils import insert_graph
 from .models import (
-    Assembly, EdgeComment, EdgeVote, Experiment, NetworkOverlap, Omic, Project, Query, Report, Role,
-    User, UserQuery, assembly_network, projects_networks, projects_users, users_networks,
+    Assembly, EdgeComment, EdgeFeedback, EdgeVote, Experiment, NetworkContents, NetworkOverlap, Omic, Project, Query,
+    Report, Role, User, UserQuery, assembly_network, network_contents_annotation, network_contents_citation,
+    projects_networks, projects_users, users_networks,
 )
 from .tools_compat import get_tools_version
 from .version import get_version as get_bel_commons_version
@@ -234,6 +235,7 @@ def freedom(manager: WebManager):
     # TODO: use update(Report).filter_by(public=False).values(public=True)
     for report in manager.session.query(Report).filter_by(public=False):
         report.public = True
+    manager.bump_permission_version()
     manager.session.commit()
 
 
@@ -277,6 +279,40 @@ def ls(manager: WebManager):
     ))
 
 
+@networks.command()
+@click.pass_obj
+def sketch(manager: WebManager):
+    """Add the networks that don't have MinHash signatures yet to the index of similar networks."""
+    t = time.time()
+    count = manager.ensure_network_sketches()
+    click.echo(f'Sketched {count} networks in {time.time() - t:.2f} seconds')
+
+
+@networks.command()
+@click.pass_obj
+def contents(manager: WebManager):
+    """List the citations and annotations of the networks that haven't been listed yet, for pagination."""
+    t = time.time()
+    count = manager.ensure_network_contents()
+    click.echo(f'Listed the contents of {count} networks in {time.time() - t:.2f} seconds')
+
+
+@networks.command()
+@click.option('-n', '--network-id', type=int, help='Only calculate the overlaps of the given network')
+@click.pass_obj
+def overlaps(manager: WebManager, network_id: Optional[int]):
+    """Calculate the node overlaps between networks."""
+    t = time.time()
+    if network_id is None:
+        count = manager.build_network_overlaps()
+    else:
+        network = manager.get_network_by_id(network_id)
+        if network is None:
+            raise click.BadParameter(f'network {network_id} does not exist', param_hint='--network-id')
+        count = manager.update_network_overlaps(network)
+    click.echo(f'Stored {count} overlaps in {time.time() - t:.2f} seconds')
+
+
 @manage.group()
 def users():
     """Manage users."""
@@ -543,6 +579,15 @@ def drop(manager: WebManager, omic_id: Optional[int], yes: bool):
         manager.session.commit()
 
 
+@manage.command()
+@click.pass_obj
+def recount(manager: WebManager):
+    """Recount the votes and comments on each edge."""
+    manager.refresh_edge_feedback()
+    click.echo(f'Votes: {manager.count_votes()}')
+    click.echo(f'Comments: {manager.count_comments()}')
+
+
 @manage.command()
 @click.pass_obj
 def summarize(manager: WebManager):
@@ -552,8 +597,8 @@ def summarize(manager: WebManager):
     click.echo('Projects: {}'.format(manager.session.query(Project).count()))
     click.echo('Reports: {}'.format(manager.session.query(Report).count()))
     click.echo('Assemblies: {}'.format(manager.session.query(Assembly).count()))
-    click.echo('Votes: {}'.format(manager.session.query(EdgeVote).count()))
-    click.echo('Comments: {}'.format(manager.session.query(EdgeComment).count()))
+    click.echo(f'Votes: {manager.count_votes()}')
+    click.echo(f'Comments: {manager.count_comments()}')
     click.echo('Queries: {}'.format(manager.session.query(Query).count()))
     click.echo('Omics: {}'.format(manager.session.query(Omic).count()))
     click.echo('Experiments: {}'.format(manager.session.query(Experiment).count()))
@@ -653,8 +698,10 @@ def wasteland(manager: WebManager, drop_most: bool, drop_all: bool):
     _drop_mn_table(manager, users_networks)
     _drop_mn_table(manager, projects_networks)
     _drop_mn_table(manager, projects_users)
+    _drop_mn_table(manager, network_contents_citation)
+    _drop_mn_table(manager, network_contents_annotation)
 
-    for table in [Assembly, Report, EdgeVote, EdgeComment, NetworkOverlap, Project]:
+    for table in [NetworkContents, Assembly, Report, EdgeFeedback, EdgeVote, EdgeComment, NetworkOverlap, Project]:
         _drop_table(manager, table)
 
     if drop_most or drop_all:
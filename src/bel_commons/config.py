@@ -9,13 +9,14 @@ Resources:
 """
 
 import logging
+import os
 from dataclasses import field
-from typing import Any, Mapping, Optional
+from typing import Any, List, Mapping, Optional
 
 from dataclasses_json import dataclass_json
 from easy_config import EasyConfig
 
-from pybel.config import CONFIG_FILE_PATHS
+from pybel.config import CACHE_DIRECTORY, CONFIG_FILE_PATHS
 from pybel.constants import get_cache_connection
 
 logger = logging.getLogger(__name__)
@@ -60,6 +61,39 @@ class BELCommonsConfig(EasyConfig):
     #: Should all endpoints require authentication?
     LOCKDOWN: bool = False
 
+    #: Directory in which the results of queries are cached. Shared by all workers on the same host. If set to
+    #: null, results are only cached in the memory of each worker.
+    GRAPH_CACHE_DIRECTORY: Optional[str] = os.path.join(CACHE_DIRECTORY, 'bel_commons', 'graphs')
+    #: Maximum size of the graph cache in bytes. Least recently used results are evicted beyond this size.
+    GRAPH_CACHE_MAX_SIZE: int = 2 * 1024 ** 3
+    #: Maximum size of the snapshots in the graph cache directory in bytes. They're memory-mapped, so the workers on
+    #: the same host share them. Least recently used snapshots are evicted beyond this size or half the size of the
+    #: file system it's on, whichever is smaller.
+    GRAPH_SNAPSHOT_MAX_SIZE: int = 1024 ** 3
+
+    #: Maximum number of paths returned by a search for all paths between two nodes
+    PATHS_MAX_PATHS: int = 1000
+    #: Maximum number of seconds a search for all paths between two nodes can run
+    PATHS_TIME_LIMIT: float = 10.0
+    #: Maximum size in bytes of the cache of responses from read-only API endpoints, in the memory of each worker
+    API_RESPONSE_CACHE_MAX_SIZE: int = 64 * 1024 ** 2
+    #: Number of seconds browsers can use cached responses from read-only API endpoints before revalidating them
+    API_RESPONSE_CACHE_MAX_AGE: int = 0
+    #: Should text exports of graphs be compressed with gzip while they're streamed, for clients that accept it?
+    EXPORT_COMPRESS: bool = True
+    #: Directory in which the exports of networks are stored after they're rendered. Shared by all workers on the
+    #: same host. If set to null, exports are rendered for each request.
+    ARTIFACT_DIRECTORY: Optional[str] = os.path.join(CACHE_DIRECTORY, 'bel_commons', 'artifacts')
+    #: Formats in which networks are exported by celery after they're uploaded. Other formats are rendered the first
+    #: time they're requested.
+    EXPORT_ARTIFACT_FORMATS: List[str] = field(default_factory=lambda: ['json', 'bel', 'graphml', 'csv', 'sif', 'cx'])
+    #: The smallest overlap in percent between two networks for which an edge is shown in the overview of all networks
+    NETWORK_OVERVIEW_CUTOFF: int = 25
+    #: Maximum absolute error of the betweenness centrality estimated from a sample of nodes. If zero, it's exact.
+    CENTRALITY_ERROR: float = 0.05
+    #: Minimum number of nodes in a query's result for its betweenness centrality to be calculated by celery
+    CENTRALITY_CELERY_MIN_NODES: int = 10000
+
     #: Should celery be used?
     USE_CELERY: bool = True
 
@@ -25,6 +25,7 @@ UNDIRECTED = 'undirected'
 FORMAT = 'format'
 PATHOLOGY_FILTER = 'pathology_filter'
 PATHS_METHOD = 'paths_method'
+MAX_PATHS = 'max_paths'
 QUERY = 'query'
 AND = 'and'
 RANDOM_PATH = 'random'
@@ -37,6 +38,7 @@ BLACK_LIST = {
     FORMAT,
     PATHOLOGY_FILTER,
     PATHS_METHOD,
+    MAX_PATHS,
     QUERY,
     AND,
 }
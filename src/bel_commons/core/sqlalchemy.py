@@ -11,6 +11,8 @@ from flask_security import SQLAlchemyUserDatastore
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.local import LocalProxy
 
+from ..artifacts import ArtifactStore
+from ..graph_cache import DEFAULT_MAX_SIZE, GraphCache
 from ..manager import WebManager
 from ..models import User
 
@@ -31,7 +33,18 @@ class PyBELSQLAlchemy(SQLAlchemy):
         super().init_app(app)
 
         with app.app_context():
-            _manager = app.extensions['manager'] = WebManager(engine=self.engine, session=self.session)
+            graph_cache = GraphCache.from_directory(
+                directory=app.config.get('GRAPH_CACHE_DIRECTORY'),
+                max_size=app.config.get('GRAPH_CACHE_MAX_SIZE', DEFAULT_MAX_SIZE),
+                snapshot_max_size=app.config.get('GRAPH_SNAPSHOT_MAX_SIZE', DEFAULT_MAX_SIZE),
+            )
+            artifact_directory = app.config.get('ARTIFACT_DIRECTORY')
+            _manager = app.extensions['manager'] = WebManager(
+                engine=self.engine,
+                session=self.session,
+                graph_cache=graph_cache,
+                artifact_store=ArtifactStore(artifact_directory) if artifact_directory else None,
+            )
             _manager.bind()
 
             _admin = _manager.user_datastore.find_or_create_role('admin')
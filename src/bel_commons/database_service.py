@@ -6,35 +6,37 @@ import csv
 import logging
 import pickle
 import time
-from functools import lru_cache
 from io import StringIO
-from operator import itemgetter
 from typing import Dict, Iterable, List, Mapping, Optional
 
-import networkx as nx
-from flask import Response, abort, current_app, flash, jsonify, make_response, redirect, request
+from flask import Response, abort, current_app, flash, jsonify, make_response, redirect, request, url_for
 from flask_security import current_user, login_required, roles_required
 from sqlalchemy import func, or_
+from sqlalchemy.orm import Query as SQLAlchemyQuery, joinedload
 
 from bel_resources import write_annotation, write_namespace
 from pybel import BELGraph, get_version as get_pybel_version
 from pybel.constants import NAMESPACE, NAMESPACE_DOMAIN_OTHER
 from pybel.manager.citation_utils import enrich_citation_model, get_pubmed_citation_response
-from pybel.manager.models import Author, Citation, Edge, NamespaceEntry, Network, Node, network_edge
-from pybel.struct import get_random_path, get_subgraph_by_annotations
-from pybel.struct.filters import not_pathology
-from pybel.struct.mutation import get_subgraph_by_node_filter
+from pybel.manager.models import Author, Citation, Edge, NamespaceEntry, Network, Node, network_edge, network_node
+from pybel.struct import get_subgraph_by_annotations
 from pybel.struct.pipeline.decorators import no_arguments_map
 from pybel.struct.pipeline.exc import MissingPipelineFunctionError
 from pybel.struct.query import Query
-from pybel.struct.summary import get_pubmed_identifiers
+from pybel.struct.summary import count_namespaces, get_pubmed_identifiers
 from . import models
-from .constants import AND, BLACK_LIST, PATHOLOGY_FILTER, PATHS_METHOD, RANDOM_PATH, UNDIRECTED
+from .artifacts import serve_artifact
+from .constants import AND, BLACK_LIST, MAX_PATHS, PATHOLOGY_FILTER, PATHS_METHOD, RANDOM_PATH, UNDIRECTED
 from .core import manager
 from .ext import bio2bel
+from .graph_snapshot import GraphSnapshot, PathSearch, get_top_indexes
+from .loaders import load_citations, load_edge_nodes
 from .manager_utils import fill_out_report, next_or_jsonify
-from .models import EdgeComment, Project, Report, User, UserQuery
-from .send_utils import serve_network, to_json_custom
+from .models import Project, Report, User, UserQuery, network_contents_annotation, network_contents_citation
+from .pagination import get_requested_page, jsonify_page
+from .response_cache import cache_response
+from .send_utils import EXPORT_FILE_TYPES, serve_network, to_json_custom_stream
+from .streaming import JSONArray, JSONObject, iter_chunks, iter_json, stream_json
 from .tools_compat import get_incorrect_names_by_namespace, get_naked_names, get_undefined_namespace_names
 from .utils import SecurityConfigurableBlueprint as Blueprint, add_edge_filter, get_tree_annotations
 
@@ -48,6 +50,45 @@ logger = logging.getLogger(__name__)
 api_blueprint = Blueprint('dbs', __name__)
 
 
+def _get_network_identity(network_id: int) -> str:
+    """Identify the current version of a network for :func:`cache_response`, without checking the user's rights."""
+    network = manager.get_network_by_id_or_404(network_id)
+    return manager.graph_cache.get_network_key(network.id)
+
+
+def _get_authenticated_network_identity(network_id: int) -> str:
+    """Identify the current version of a network for :func:`cache_response` if the user is allowed to see it."""
+    network = manager.cu_get_network_by_id_or_404(network_id)
+    return manager.graph_cache.get_network_key(network.id)
+
+
+def _get_query_identity(query_id: int) -> str:
+    """Identify the result of a query for :func:`cache_response` if the user is allowed to run it."""
+    query = manager.cu_get_query_by_id_or_404(query_id)
+    return manager.graph_cache.get_query_key(query)
+
+
+def _get_network_overview_identity() -> str:
+    """Identify the current versions of the recent networks and the overlaps between them for :func:`cache_response`."""
+    return f'{manager.get_permission_version()}:{manager.get_overlap_version()}'
+
+
+def _get_network_overlaps_identity(network_id: int) -> str:
+    """Identify the overlaps of a network with the networks the current user can see for :func:`cache_response`."""
+    network = manager.cu_get_network_by_id_or_404(network_id)
+    user_id = current_user.id if current_user.is_authenticated else None
+    return f'{network.id}:{user_id}:{manager.get_permission_version()}:{manager.get_overlap_version()}'
+
+
+def _get_citation_identity(citation_id: int) -> str:
+    """Identify the current version of a citation for :func:`cache_response`.
+
+    Citations are filled in when they're enriched from PubMed, so the identity is built from all of their columns.
+    """
+    citation = manager.get_citation_by_id_or_404(citation_id)
+    return repr([getattr(citation, column.key) for column in Citation.__table__.columns])
+
+
 ####################################
 # NAMESPACE
 ####################################
@@ -340,6 +381,7 @@ def suggest_network():
 
 
 @api_blueprint.route('/api/network/<int:network_id>/namespaces')
+@cache_response(_get_authenticated_network_identity)
 def namespaces_by_network(network_id: int):
     """Get all of the namespaces in a network.
 
@@ -356,13 +398,20 @@ def namespaces_by_network(network_id: int):
       200:
         description: The namespaces described in this network
     """
-    logger.info('network_id: %s', network_id)
-    abort(501)
+    graph = manager.cu_authenticated_get_graph_by_id_or_404(network_id)
+    return jsonify(
+        url=graph.namespace_url,
+        pattern=graph.namespace_pattern,
+        counts=count_namespaces(graph),
+    )
 
 
 @api_blueprint.route('/api/network/<int:network_id>/annotations')
 def annotations_by_network(network_id: int):
-    """Get all of the annotations in a network.
+    """Get the annotations in a network.
+
+    Paginated by continuation tokens. The response has the annotations in the page in ``items``, the token for the next
+    page in ``next`` (null on the last page), and an estimate of the total number of annotations in ``total``.
 
     ---
     tags:
@@ -373,17 +422,43 @@ def annotations_by_network(network_id: int):
         description: The database network identifier
         required: true
         type: integer
+
+      - name: cursor
+        in: query
+        required: false
+        type: string
+        description: The continuation token from the previous page. If not given, gets the first page.
+
+      - name: limit
+        in: query
+        required: false
+        type: integer
+        default: 100
+        description: The maximum number of annotations in the page, up to 1000
     responses:
       200:
-        description: The annotations referenced by the network
+        description: A page of the annotations referenced by the network
     """
-    logger.info('network_id: %s', network_id)
-    abort(501)
+    network = manager.cu_get_network_by_id_or_404(network_id)
+    contents = manager.get_or_create_network_contents(network)
+
+    entries = manager.session.query(NamespaceEntry). \
+        join(network_contents_annotation, network_contents_annotation.c.name_id == NamespaceEntry.id). \
+        filter(network_contents_annotation.c.network_id == network.id). \
+        options(joinedload(NamespaceEntry.namespace))
+
+    page = get_requested_page(entries, network_contents_annotation.c.name_id)
+    total = contents.number_annotation_entries
+
+    return jsonify_page(page, lambda entry: entry.to_json(include_id=True), total=total)
 
 
 @api_blueprint.route('/api/network/<int:network_id>/citations')
 def citations_by_network(network_id: int):
-    """Get all of the citations in a given network.
+    """Get the citations in a network.
+
+    Paginated by continuation tokens. The response has the citations in the page in ``items``, the token for the next
+    page in ``next`` (null on the last page), and an estimate of the total number of citations in ``total``.
 
     ---
     tags:
@@ -394,17 +469,45 @@ def citations_by_network(network_id: int):
         description: The database network identifier
         required: true
         type: integer
+
+      - name: cursor
+        in: query
+        required: false
+        type: string
+        description: The continuation token from the previous page. If not given, gets the first page.
+
+      - name: limit
+        in: query
+        required: false
+        type: integer
+        default: 100
+        description: The maximum number of citations in the page, up to 1000
     responses:
       200:
-        description: The citations referenced by the edges in the network
+        description: A page of the citations referenced by the edges in the network
     """
-    logger.info('network_id: %s', network_id)
-    abort(501)
+    network = manager.cu_get_network_by_id_or_404(network_id)
+
+    contents = manager.get_or_create_network_contents(network)
+
+    citations = manager.session.query(Citation). \
+        join(network_contents_citation, network_contents_citation.c.citation_id == Citation.id). \
+        filter(network_contents_citation.c.network_id == network.id)
+
+    page = get_requested_page(load_citations(citations), network_contents_citation.c.citation_id)
+    return jsonify_page(
+        page,
+        lambda citation: citation.to_json(include_id=True),
+        total=contents.number_citations,
+    )
 
 
 @api_blueprint.route('/api/network/<int:network_id>/edges')
 def edges_by_network(network_id: int):
-    """Get all of the edges in a network.
+    """Get the edges in a network.
+
+    Paginated by continuation tokens. The response has the edges in the page in ``items``, the token for the next
+    page in ``next`` (null on the last page), and an estimate of the total number of edges in ``total``.
 
     ---
     tags:
@@ -416,41 +519,40 @@ def edges_by_network(network_id: int):
         required: true
         type: integer
 
-      - name: offset
+      - name: cursor
         in: query
         required: false
-        type: integer
-        default: 0
-        description: The database offset
+        type: string
+        description: The continuation token from the previous page. If not given, gets the first page.
 
       - name: limit
         in: query
         required: false
         type: integer
         default: 100
-        description: The database limit
-
+        description: The maximum number of edges in the page, up to 1000
     responses:
       200:
-        description: The edges in the network
+        description: A page of the edges in the network
     """
-    # FIXME check user rights for network
+    network = manager.cu_get_network_by_id_or_404(network_id)
 
     edges = manager.session.query(Edge). \
-        join(network_edge).join(Network). \
-        filter(Network.id == network_id)
-
-    edges = add_edge_filter(edges, limit_default=100, offset_default=0)
+        join(network_edge, network_edge.c.edge_id == Edge.id). \
+        filter(network_edge.c.network_id == network.id)
 
-    return jsonify([
-        edge.to_json(include_id=True, include_hash=True)
-        for edge in edges
-    ])
+    page = get_requested_page(load_edge_nodes(edges), network_edge.c.edge_id)
+    return jsonify_page(page, lambda edge: edge.to_json(include_id=True), total=_get_report_count(
+        network, 'number_edges',
+    ))
 
 
 @api_blueprint.route('/api/network/<int:network_id>/nodes/')
 def nodes_by_network(network_id: int):
-    """Get all of the nodes in a network.
+    """Get the nodes in a network.
+
+    Paginated by continuation tokens. The response has the nodes in the page in ``items``, the token for the next
+    page in ``next`` (null on the last page), and an estimate of the total number of nodes in ``total``.
 
     ---
     tags:
@@ -461,12 +563,38 @@ def nodes_by_network(network_id: int):
         description: The database network identifier
         required: true
         type: integer
+
+      - name: cursor
+        in: query
+        required: false
+        type: string
+        description: The continuation token from the previous page. If not given, gets the first page.
+
+      - name: limit
+        in: query
+        required: false
+        type: integer
+        default: 100
+        description: The maximum number of nodes in the page, up to 1000
     responses:
       200:
-        description: The nodes referenced by the edges in the network
+        description: A page of the nodes in the network
     """
-    network = manager.get_network_by_id(network_id)
-    return jsonify_nodes(network.nodes)
+    network = manager.cu_get_network_by_id_or_404(network_id)
+
+    nodes = manager.session.query(Node). \
+        join(network_node, network_node.c.node_id == Node.id). \
+        filter(network_node.c.network_id == network.id)
+
+    page = get_requested_page(nodes, network_node.c.node_id)
+    return jsonify_page(page, Node.to_json, total=_get_report_count(network, 'number_nodes'))
+
+
+def _get_report_count(network: Network, name: str) -> Optional[int]:
+    """Get a count from the network's report, which is filled out when it's uploaded, as an estimate of the total."""
+    if network.report is None:
+        return None
+    return getattr(network.report, name)
 
 
 def drop_network_helper(network_id: int) -> Response:
@@ -532,8 +660,9 @@ def _help_claim_network(network: Network, user: User) -> Optional[Report]:
     if network.report:
         return
 
-    graph = network.as_bel()
+    graph = manager.get_graph_by_id(network.id)
     network.store_bel(graph)
+    manager.graph_cache.invalidate_network(network.id)
 
     manager.session.add(network)
     manager.session.commit()
@@ -547,6 +676,7 @@ def _help_claim_network(network: Network, user: User) -> Optional[Report]:
     fill_out_report(graph=graph, network=network, report=report)
 
     manager.session.add(report)
+    manager.bump_permission_version()
     manager.session.commit()
 
     return report
@@ -640,11 +770,21 @@ def export_network(network_id: int, serve_format: str) -> Response:
               - csv
               - gsea
     """
-    graph = manager.cu_authenticated_get_graph_by_id_or_404(network_id)
-    return serve_network(graph, serve_format=serve_format)
+    network = manager.cu_get_network_by_id_or_404(network_id)
+
+    if serve_format not in EXPORT_FILE_TYPES:
+        abort(400, f'unhandled serve_format: {serve_format}')
+
+    artifact = manager.get_network_artifact(network, serve_format)
+    if artifact is None:  # there's no artifact store, so the export is rendered for each request
+        graph = manager.get_graph_by_id(network.id)
+        return serve_network(graph, serve_format=serve_format)
+
+    return serve_artifact(artifact)
 
 
 @api_blueprint.route('/api/network/<int:network_id>/summarize')
+@cache_response(_get_network_identity)
 def get_graph_info_json(network_id: int) -> Response:
     """Get a summary of the given network.
 
@@ -661,10 +801,35 @@ def get_graph_info_json(network_id: int) -> Response:
       200:
         description: A summary of the network
     """
-    network = manager.get_network_by_id(network_id)
+    network = manager.get_network_by_id_or_404(network_id)
     return jsonify(network.report.as_info_json())
 
 
+@api_blueprint.route('/api/network/<int:network_id>/overlaps')
+@cache_response(_get_network_overlaps_identity)
+def get_network_overlaps(network_id: int) -> Response:
+    """Get the networks that overlap the most with the given network.
+
+    ---
+    tags:
+        - network
+    parameters:
+      - name: network_id
+        in: path
+        description: The database network identifier
+        required: true
+        type: integer
+    responses:
+      200:
+        description: Up to the top 10 networks the current user can see, by their overlap with the given network
+    """
+    network = manager.cu_get_network_by_id_or_404(network_id)
+    return jsonify([
+        dict(overlap=overlap, **other_network.to_json(include_id=True))
+        for other_network, overlap in manager.get_top_overlaps(user=current_user, network=network)
+    ])
+
+
 @api_blueprint.route('/api/network/<int:network_id>/name')
 def get_network_name_by_id(network_id: int) -> Response:
     """Return the name of the given network.
@@ -694,6 +859,7 @@ def update_network_status(network_id: int, public: bool) -> Response:
         abort(403, 'You do not have permission to modify that network')
 
     network.report.public = public
+    manager.bump_permission_version()
     manager.session.commit()
 
     return next_or_jsonify(
@@ -751,7 +917,6 @@ def download_query_json(query_id: int):
     return jsonify(query_json)
 
 
-@lru_cache(maxsize=256)
 def get_tree_from_query(query_id: int) -> Optional[List[Dict]]:
     """Get the tree json for the results of a given query.
 
@@ -766,6 +931,7 @@ def get_tree_from_query(query_id: int) -> Optional[List[Dict]]:
 
 
 @api_blueprint.route('/api/query/<int:query_id>/tree/')
+@cache_response(_get_query_identity)
 def get_tree_api(query_id: int):
     """Build the annotation tree data structure for a given graph.
 
@@ -852,7 +1018,12 @@ def download_network(query_id, serve_format):
     graph = manager.cu_get_graph_from_query_id_or_404(query_id)
     graph.name = f'query-{query_id}'
     graph.version = str(time.asctime())
-    return serve_network(graph, serve_format=serve_format)
+
+    query = manager.get_query_by_id(query_id)
+    canonical = manager.get_canonical_strings_from_query(query)
+    response = serve_network(graph, serve_format=serve_format, canonical=canonical)
+    manager.set_canonical_strings_from_query(query, canonical)
+    return response
 
 
 @api_blueprint.route('/api/query/<int:query_id>/relabel')
@@ -870,13 +1041,21 @@ def get_network(query_id):
         type: integer
     """
     graph = manager.cu_get_graph_from_query_id_or_404(query_id)
-    payload = to_json_custom(graph)
-    return jsonify(payload)
+    query = manager.get_query_by_id(query_id)
+    canonical = manager.get_canonical_strings_from_query(query)
+    payload = to_json_custom_stream(graph, canonical=canonical)
+    manager.set_canonical_strings_from_query(query, canonical)
+    return stream_json(payload)
 
 
 @api_blueprint.route('/api/query/<int:query_id>/paths/<source_id>/<target_id>/')
 def get_paths(query_id, source_id, target_id):
-    """Return an array of shortest/all paths given a source node and target node both belonging in the graph.
+    """Return the shortest path or all paths between a source node and target node both belonging in the graph.
+
+    The shortest path is returned as an array of node hashes. All paths are streamed as they are found in an object
+    like ``{"paths": [...], "truncated": false, "reason": null}``. The search for all paths stops after the maximum
+    number of paths or after a time limit, in which case it's truncated and the reason is either ``max_paths`` or
+    ``time_limit``.
 
     ---
     tags:
@@ -908,6 +1087,12 @@ def get_paths(query_id, source_id, target_id):
 
       - name: undirected
 
+      - name: max_paths
+        in: query
+        description: The maximum number of paths to find when getting all paths. Limited by the server's configuration.
+        required: false
+        type: integer
+
       - name: paths_method
         in: path
         description: The method by which paths are generated - either just the shortest path, or all paths
@@ -919,62 +1104,75 @@ def get_paths(query_id, source_id, target_id):
               - all
               - shortest
     """
-    source = manager.get_node_by_hash(source_id)
-    if source is None:
-        raise IndexError('Source missing from cache: %s', source_id)
-    source = source.as_bel()
-
-    target = manager.get_node_by_hash(target_id)
-    if target is None:
-        raise IndexError('target is missing from cache: %s', target_id)
-    target = target.as_bel()
-
-    network = manager.cu_get_graph_from_query_id_or_404(query_id)
+    snapshot = manager.cu_get_snapshot_from_query_id_or_404(query_id)
     method = request.args.get(PATHS_METHOD)
     undirected = UNDIRECTED in request.args
     remove_pathologies = PATHOLOGY_FILTER in request.args
     cutoff = request.args.get('cutoff', default=7, type=int)
 
-    if source not in network or target not in network:
+    source = snapshot.get_node_index(source_id)
+    target = snapshot.get_node_index(target_id)
+    if source is None or target is None:
         logger.info('Source/target node not in network')
-        logger.info('Nodes in network: %s', network.nodes())
         abort(500, 'Source/target node not in network')
 
-    if undirected:
-        network = network.to_undirected()
-
-    if remove_pathologies:
-        network = get_subgraph_by_node_filter(network, not_pathology)
-
     if method == 'all':
-        paths = nx.all_simple_paths(network, source=source, target=target, cutoff=cutoff)
-        return jsonify([
-            [
-                node.md5
-                for node in path
-            ]
-            for path in paths
-        ])
+        max_paths = current_app.config.get('PATHS_MAX_PATHS')
+        requested_max_paths = request.args.get(MAX_PATHS, type=int)
+        if requested_max_paths is not None and (max_paths is None or requested_max_paths < max_paths):
+            max_paths = requested_max_paths
+
+        search = PathSearch(
+            snapshot,
+            source,
+            target,
+            cutoff=cutoff,
+            undirected=undirected,
+            remove_pathologies=remove_pathologies,
+            max_paths=max_paths,
+            time_limit=current_app.config.get('PATHS_TIME_LIMIT'),
+        )
+        return Response(_stream_path_search(snapshot, search), mimetype='application/json')
 
-    try:
-        shortest_path = nx.shortest_path(network, source=source, target=target)
-    except nx.NetworkXNoPath:
-        logger.debug(f'No paths between {source} and {target}')
+    shortest_path = snapshot.get_shortest_path(
+        source,
+        target,
+        undirected=undirected,
+        remove_pathologies=remove_pathologies,
+    )
+    if shortest_path is None:
+        logger.debug(f'No paths between {source_id} and {target_id}')
 
         # Returns normal message if it is not a random call from graph_controller.js
         if RANDOM_PATH not in request.args:
             return 'No paths between the selected nodes'
 
+        neighbors = snapshot.get_neighbors(source, undirected=undirected, remove_pathologies=remove_pathologies)
+
         # In case the random node is an isolated one, returns it alone
-        if not network.neighbors(source)[0]:
-            return jsonify([source])
+        if not len(neighbors):
+            return jsonify(snapshot.get_node_hashes([source]))
 
-        shortest_path = nx.shortest_path(network, source=source, target=network.neighbors(source)[0])
+        shortest_path = [source, neighbors[0]]
+
+    return jsonify(snapshot.get_node_hashes(shortest_path))
 
-    return jsonify([
-        node.md5
-        for node in shortest_path
-    ])
+
+def _stream_path_search(snapshot: GraphSnapshot, search: PathSearch) -> Iterable[bytes]:
+    """Stream the paths of the search in a JSON object as they are found.
+
+    If the client disconnects, the server closes this generator so the search is stopped.
+    """
+    def iter_items():
+        yield 'paths', JSONArray(snapshot.get_node_hashes(path) for path in search)
+        # only known once all paths have been encoded
+        yield 'truncated', search.truncated
+        yield 'reason', search.reason
+
+    try:
+        yield from iter_chunks(iter_json(JSONObject(iter_items())))
+    finally:
+        search.cancel()
 
 
 @api_blueprint.route('/api/query/<int:query_id>/paths/random')
@@ -991,14 +1189,9 @@ def get_random_paths(query_id):
         required: true
         type: integer
     """
-    graph = manager.cu_get_graph_from_query_id_or_404(query_id)
-
-    path = get_random_path(graph)
-
-    return jsonify([
-        node.md5
-        for node in path
-    ])
+    snapshot = manager.cu_get_snapshot_from_query_id_or_404(query_id)
+    path = snapshot.get_random_path()
+    return jsonify(snapshot.get_node_hashes(path))
 
 
 @api_blueprint.route('/api/query/<int:query_id>/centrality/<int:node_number>')
@@ -1021,21 +1214,84 @@ def get_nodes_by_betweenness_centrality(query_id, node_number):
         required: true
         type: integer
 
-    """
-    graph = manager.cu_get_graph_from_query_id_or_404(query_id)
-
-    if node_number > graph.number_of_nodes():
-        node_number = graph.number_of_nodes()
-
-    bw_dict = nx.betweenness_centrality(graph)
+      - name: task
+        in: query
+        description: The identifier of the task that calculated the betweenness centrality, once it has succeeded
+        required: false
+        type: string
 
-    return jsonify([
-        node.md5
-        for node, score in sorted(bw_dict.items(), key=itemgetter(1), reverse=True)[:node_number]
-    ])
+    responses:
+      200:
+        description: The hashes of the top nodes, in descending order of betweenness centrality
+      202:
+        description: The betweenness centrality is being calculated by the task with the given identifier. Poll it,
+         then make the same request again with the task's identifier once it has succeeded.
+    """
+    query = manager.cu_get_query_by_id_or_404(query_id)
+    error = current_app.config.get('CENTRALITY_ERROR', 0.0)
+
+    betweenness = manager.get_cached_betweenness_centrality_from_query(query, error)
+    snapshot = manager.get_snapshot_from_query(query)
+
+    if betweenness is None:
+        min_nodes = current_app.config.get('CENTRALITY_CELERY_MIN_NODES')
+        if current_app.config.get('USE_CELERY') and min_nodes is not None and snapshot.number_of_nodes() >= min_nodes:
+            task = _get_betweenness_centrality_task(query, error, request.args.get('task'))
+            if not task.successful():
+                return jsonify(task_id=task.id, status_url=url_for('task.check', uuid=task.id)), 202
+
+            result = task.result
+            if not result or result['query_id'] != query.id or result['error'] != error:
+                abort(400, f'task {task.id} did not calculate the betweenness centrality of query {query.id}')
+            betweenness = manager.set_betweenness_centrality_from_query(
+                query, error, result['centralities'], result['digest'],
+            )
+            manager.graph_cache.delete_task_id(manager.graph_cache.get_betweenness_centrality_task_key(query, error))
+            if betweenness is None:
+                logger.warning(f'task {task.id} calculated the betweenness centrality of query {query.id} on a'
+                               f' snapshot with another order of nodes. Calculating it again.')
+
+        if betweenness is None:
+            betweenness = manager.get_betweenness_centrality_from_query(query, error)
+
+    top_nodes = get_top_indexes(betweenness, node_number)
+    return jsonify(snapshot.get_node_hashes(top_nodes))
+
+
+def _get_betweenness_centrality_task(query: models.Query, error: float, task_id: Optional[str] = None):
+    """Get the celery task calculating the betweenness centrality of the result of the query.
+
+    The identifier of the running task is kept in the graph cache next to the result of the query, so concurrent
+    requests for the same result share the task instead of each starting their own.
+
+    :param query: A query
+    :param error: The maximum absolute error of the estimated betweenness centrality of any node
+    :param task_id: The identifier of the task, if it's known. Otherwise, the running task is looked up and one is
+     started if there is none or if it failed.
+    :rtype: celery.result.AsyncResult
+    """
+    from celery import states
+    from celery.result import AsyncResult
+    from .celery_worker import celery_app
+
+    if task_id is not None:
+        return AsyncResult(task_id, app=celery_app)
+
+    key = manager.graph_cache.get_betweenness_centrality_task_key(query, error)
+    with manager.graph_cache.lock(key):
+        task_id = manager.graph_cache.get_task_id(key)
+        if task_id is not None:
+            task = AsyncResult(task_id, app=celery_app)
+            if task.state not in states.PROPAGATE_STATES:
+                return task
+
+        task = celery_app.send_task('run-betweenness-centrality', args=[query.id, error])
+        manager.graph_cache.set_task_id(key, task.id)
+        return task
 
 
 @api_blueprint.route('/api/query/<int:query_id>/pmids/')
+@cache_response(_get_query_identity)
 def get_all_pmids(query_id):
     """Get a list of all PubMed identifiers in the network produced by the given URL parameters.
 
@@ -1103,6 +1359,7 @@ def list_citations():
 
 
 @api_blueprint.route('/api/citation/<int:citation_id>')
+@cache_response(_get_citation_identity)
 def get_citation_by_id(citation_id):
     """Get a citation by its identifier.
 
@@ -1285,13 +1542,17 @@ def get_edges():
         description: The number of edges to return
         required: false
         type: integer
+      - name: sort
+        in: query
+        description: Set to "consensus" to sort the edges from the most agreed with to the most disagreed with
+        required: false
+        type: string
     """
-    edge_query = manager.session.query(Edge)
+    edge_query = load_edge_nodes(manager.session.query(Edge))
+    if request.args.get('sort') == 'consensus':
+        edge_query = manager.sort_edges_by_consensus(edge_query)
     edge_query = add_edge_filter(edge_query)
-    return jsonify([
-        manager._help_get_edge_entry(edge=edge, user=current_user)
-        for edge in edge_query.all()
-    ])
+    return jsonify(manager._help_get_edge_entries(edges=edge_query.all(), user=current_user))
 
 
 @api_blueprint.route('/api/edge/by_bel/statement/<bel>')
@@ -1411,7 +1672,7 @@ def search_edge_by_hash(edge_hash: str):
         required: true
         type: string
     """
-    edges = manager.session.query(Edge).filter(Edge.md5.startswith(edge_hash))
+    edges = load_edge_nodes(manager.session.query(Edge).filter(Edge.md5.startswith(edge_hash)))
 
     return jsonify([
         edge.to_json(include_id=True)
@@ -1481,15 +1742,8 @@ def store_comment(edge_hash: str):
     if comment is None:
         abort(403, 'Comment not found')  # FIXME put correct code
 
-    comment = EdgeComment(
-        user=current_user,
-        edge=edge,
-        comment=comment
-    )
-    manager.session.add(comment)
-    manager.session.commit()
-
-    return jsonify(comment.to_json())
+    edge_comment = manager.create_edge_comment(edge, current_user, comment)
+    return jsonify(edge_comment.to_json())
 
 
 ####################################
@@ -1506,6 +1760,9 @@ def jsonify_nodes(nodes: Iterable[Node]) -> Response:
 
 def jsonify_edges(edges: Iterable[Edge]) -> Response:
     """Convert a list of edges to JSON."""
+    if isinstance(edges, SQLAlchemyQuery):  # might be an empty list from manager.query_edges
+        edges = load_edge_nodes(edges)
+
     return jsonify([
         edge.to_json(include_id=True)
         for edge in edges
@@ -1720,7 +1977,8 @@ def get_pipeline_function_names():
 def drop_query_by_id(query_id: int):
     """Delete a query.
 
-    User must own the query to drop it.
+    User must own the query to drop it, in which case the query is only dropped for them unless no other users own it,
+    or be an admin, in which case it's dropped for all users.
 
     ---
     tags:
@@ -1734,12 +1992,13 @@ def drop_query_by_id(query_id: int):
     """
     query = manager.get_query_by_id_or_404(query_id)
 
-    if not current_user.is_admin or query.user != current_user:
+    if query.user_queries.filter(UserQuery.user_id == current_user.id).count():
+        manager.drop_query_by_user_id(query, current_user.id)
+    elif current_user.is_admin:
+        manager.drop_query_by_user_id(query)
+    else:
         abort(403)
 
-    manager.session.delete(query)
-    manager.session.commit()
-
     return next_or_jsonify(f'Dropped query {query_id}')
 
 
@@ -1763,6 +2022,20 @@ def drop_queries():
     return next_or_jsonify('Dropped all queries')
 
 
+@api_blueprint.route('/api/query/checkpoints')
+@roles_required('admin')
+def get_query_checkpoint_statistics():
+    """Get how often queries were resumed from cached pipeline prefixes by all workers, by number of pipeline steps.
+
+    User must be admin.
+
+    ---
+    tags:
+      - query
+    """
+    return jsonify(manager.graph_cache.get_checkpoint_statistics())
+
+
 @api_blueprint.route('/api/user/<int:user_id>/query', methods=['DELETE'])
 @login_required
 def drop_user_queries(user_id):
@@ -1805,8 +2078,10 @@ def query_to_network(query_id: int):
 
     rv = query.to_json(include_id=True)
 
-    if query.user_query and query.user_query.user:
-        rv['creator'] = str(query.user_query.user)
+    # the first user to run the query is its creator, since the times are updated when it's run again
+    user_query = query.user_queries.order_by(UserQuery.id).first()
+    if user_query is not None:
+        rv['creator'] = str(user_query.user)
 
     network_ids = rv['network_ids']
     rv['networks'] = [
@@ -2288,7 +2563,7 @@ def grant_network_to_project(network_id: int, project_id: int):
     network = manager.cu_owner_get_network_by_id_or_404(network_id=network_id)
     project = manager.cu_authenticated_get_project_by_id_or_404(project_id=project_id)
     project.networks.append(network)
-
+    manager.bump_permission_version()
     manager.session.commit()
 
     return next_or_jsonify(
@@ -2325,7 +2600,7 @@ def grant_network_to_user(network_id: int, user_id: int):
     network = manager.cu_owner_get_network_by_id_or_404(network_id=network_id)
     user = manager.get_user_by_id(user_id)
     user.networks.append(network)
-
+    manager.bump_permission_version()
     manager.session.commit()
 
     return next_or_jsonify(f'Added rights for {network} to {user}')
@@ -2388,6 +2663,7 @@ def drop_project_by_id(project_id: int):
     # FIXME cascade on project/users
 
     manager.session.delete(project)
+    manager.bump_permission_version()
     manager.session.commit()
 
     return next_or_jsonify(f'Dropped project {project.id}: {project.name}')
@@ -2421,12 +2697,12 @@ def summarize_project(project_id: int):
         csv_list_entry = network.name, network.version
         csv_list_entry += tuple(
             v
-            for _, v in network.as_bel()._describe_list()
+            for _, v in manager.get_graph_by_id(network.id)._describe_list()
         )
 
         csv_list.append(csv_list_entry)
 
-    csv_list.append(('Total', '') + tuple(v for _, v in project.as_bel()._describe_list()))
+    csv_list.append(('Total', '') + tuple(v for _, v in project.as_bel(manager)._describe_list()))
 
     cw.writerows(csv_list)
     output = make_response(si.getvalue())
@@ -2469,7 +2745,7 @@ def export_project_network(project_id: int, serve_format: str):
               - gsea
     """
     project = manager.cu_authenticated_get_project_by_id_or_404(project_id=project_id)
-    graph = project.as_bel()
+    graph = project.as_bel(manager)
     return serve_network(graph, serve_format=serve_format)
 
 
@@ -2505,40 +2781,19 @@ def get_recent_report():
 
 @api_blueprint.route('/api/network/overlap')
 @roles_required('admin')
+@cache_response(_get_network_overview_identity)
 def list_all_network_overview():
-    """Return a meta-network describing the overlaps of all networks."""
-    node_elements = []
-    edge_elements = []
-
-    cutoff = request.args.get('cutoff', type=int, default=25)
-
-    for source_network in manager.cu_list_networks():
-        overlap = manager.get_node_overlaps(source_network)
-
-        node_elements.append({
-            'data': {
-                'id': source_network.id,
-                'name': source_network.name,
-                'size': source_network.report.number_nodes,
-            }
-        })
-
-        for target_network_id, (target_network, overlap) in overlap.items():
-            overlap = int(100 * overlap)
-
-            if overlap < cutoff:
-                continue  # don't have a complete graph
+    """Return a meta-network describing the overlaps of all networks.
 
-            if source_network.id <= target_network_id:
-                continue  # no duplicates
-
-            edge_elements.append({
-                'data': {
-                    'id': f'edge{len(edge_elements)}',
-                    'source': source_network.id,
-                    'target': target_network_id,
-                    'weight': overlap,
-                }
-            })
-
-    return jsonify(node_elements + edge_elements)
+    ---
+    tags:
+      - network
+    parameters:
+      - name: cutoff
+        in: query
+        description: The smallest overlap in percent between two networks for which to include an edge
+        required: false
+        type: integer
+    """
+    cutoff = request.args.get('cutoff', type=int, default=current_app.config.get('NETWORK_OVERVIEW_CUTOFF', 25))
+    return jsonify(manager.get_network_overview(cutoff / 100))
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""Summaries of the BEL documents that networks were compiled from.
+
+The summary pages of a network show its namespace and annotation definitions and the warnings from compiling it. A
+:class:`DocumentSummary` holds them along with which definitions went unused, so it can be built from the graph once
+at upload time and stored in the network's report instead of deserializing the whole graph to render each page. The
+warnings in particular only exist on the freshly compiled graph, since they aren't stored with the network.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Set, Tuple
+
+from pybel import BELGraph
+from pybel.parser.exc import BELParserWarning
+from pybel.struct.summary import get_unused_annotations, get_unused_list_annotation_values, get_unused_namespaces
+
+__all__ = [
+    'WarningTuple',
+    'DocumentSummary',
+]
+
+#: A warning from compiling a BEL document, as its line number, the line, the exception, and the parser's context
+WarningTuple = Tuple[int, str, BELParserWarning, Mapping[str, Any]]
+
+
+@dataclass
+class DocumentSummary:
+    """The definitions and compilation warnings of a BEL document."""
+
+    #: The name of the document
+    name: str
+    #: The version of the document
+    version: str
+    #: A dictionary from the keywords of the namespaces defined by URL to their URLs
+    namespace_url: Dict[str, str]
+    #: A dictionary from the keywords of the annotations defined by URL to their URLs
+    annotation_url: Dict[str, str]
+    #: A dictionary from the keywords of the annotations defined as lists to their values
+    annotation_list: Dict[str, Set[str]]
+    #: The warnings from compiling the document
+    warnings: List[WarningTuple]
+    #: The keywords of the namespaces that are defined but never used
+    unused_namespaces: Set[str]
+    #: The keywords of the annotations that are defined but never used
+    unused_annotations: Set[str]
+    #: A dictionary from the keywords of the annotations defined as lists to their values that are never used
+    unused_list_annotation_values: Dict[str, Set[str]]
+
+    def __str__(self):  # noqa: D105
+        return f'{self.name} v{self.version}'
+
+    @classmethod
+    def from_graph(cls, graph: BELGraph) -> 'DocumentSummary':
+        """Summarize the document a graph was compiled from."""
+        return cls(
+            name=graph.name,
+            version=graph.version,
+            namespace_url=dict(graph.namespace_url),
+            annotation_url=dict(graph.annotation_url),
+            annotation_list={
+                keyword: set(values)
+                for keyword, values in graph.annotation_list.items()
+            },
+            warnings=[
+                (exc.line_number, exc.line, exc, context)
+                for _, exc, context in graph.warnings
+            ],
+            unused_namespaces=get_unused_namespaces(graph),
+            unused_annotations=get_unused_annotations(graph),
+            unused_list_annotation_values=dict(get_unused_list_annotation_values(graph)),
+        )
@@ -0,0 +1,774 @@
+# -*- coding: utf-8 -*-
+
+"""Caches for BEL graphs that are shared between the workers of BEL Commons.
+
+The :class:`GraphCache` stores serialized :class:`pybel.BELGraph` instances in a pluggable
+:class:`CacheBackend`. The :class:`DiskCacheBackend` keeps its entries on the local file system, so every gunicorn
+worker (and the Celery workers) on the same host see the same entries. Both backends evict the least recently used
+entries when they exceed their maximum size.
+
+Entries that depend on networks are keyed on a *generation token* for each network. Calling
+:meth:`GraphCache.invalidate_network` replaces the token, so all entries built from the old version of the network
+become unreachable and are eventually evicted.
+
+The result of a query is stored along with a *checkpoint* for each prefix of its pipeline, so a query that shares its
+assembly, seeding, and the first steps of its pipeline with a query that has already been run is resumed from the
+longest shared prefix instead of being run from scratch.
+
+:meth:`GraphCache.get_or_build_graph` makes sure that a graph missing from the cache is only built once even if it is
+requested concurrently: the first request builds and stores it while the others wait on a :class:`KeyLock` then read
+it from the cache. If the cache is stored on disk, the lock also holds across the processes on the same host.
+
+The compact :class:`bel_commons.graph_snapshot.GraphSnapshot` of the result of each query, which the analytical
+endpoints run on, is stored in a :class:`MmapCacheBackend` when the cache is on disk. Its arrays are stored raw and
+used directly from the memory-mapped file without being unpickled or copied, so all workers on the same host share a
+single copy of them in the page cache. Each process keeps the :data:`SNAPSHOTS_IN_MEMORY` snapshots it used most
+recently mapped, along with anything derived from them.
+
+Writing to the cache is best-effort: if a backend can't store an entry, for example because its file system is full,
+the error is logged and the graph is returned without being cached.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, Mapping, Optional, Set, TYPE_CHECKING, Tuple
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+from pybel import BELGraph, from_bytes, to_bytes
+from .graph_snapshot import GraphSnapshot
+
+if TYPE_CHECKING:
+    from .models import Query  # noqa: F401
+
+__all__ = [
+    'DEFAULT_MAX_SIZE',
+    'SNAPSHOTS_IN_MEMORY',
+    'CHECKPOINT_STORE_INTERVAL',
+    'CacheBackend',
+    'MemoryCacheBackend',
+    'DiskCacheBackend',
+    'MmapCacheBackend',
+    'KeyLock',
+    'GraphCache',
+]
+
+logger = logging.getLogger(__name__)
+
+#: The default maximum size of a cache in bytes (2 GiB)
+DEFAULT_MAX_SIZE = 2 * 1024 ** 3
+
+#: The number of snapshots each process keeps in memory, or mapped
+SNAPSHOTS_IN_MEMORY = 16
+
+_DEFAULT_GENERATION = '0'
+_NETWORK_KEY_PREFIX = 'network:'
+_CHECKPOINTS_KEY = 'checkpoints'
+_RETIRED_CHECKPOINTS_KEY = 'checkpoints:retired'
+
+#: How often the counts of the pipeline checkpoints in each process are stored for other processes, in seconds
+CHECKPOINT_STORE_INTERVAL = 10
+
+#: How often each process recounts the size of a disk cache to include the entries written by other processes, in
+#: seconds
+_DISK_CACHE_RECOUNT_INTERVAL = 60
+
+
+class CacheBackend(ABC):
+    """A size-bounded key/value store for bytes."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Get the value for the key, if it exists, and mark it as recently used."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes) -> None:
+        """Set the value for the key and evict the least recently used entries if the cache is too big."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Delete the key, if it exists."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Delete all keys."""
+
+    @contextmanager
+    def open(self, key: str) -> ContextManager[Optional[bytes]]:
+        """Get a bytes-like view of the value for the key, if it exists, that is only valid in the context."""
+        yield self.get(key)
+
+
+class MemoryCacheBackend(CacheBackend):
+    """A cache backend that lives in the memory of the current process."""
+
+    def __init__(self, max_size: Optional[int] = DEFAULT_MAX_SIZE) -> None:
+        """Build an in-memory cache backend.
+
+        :param max_size: The maximum total size of the stored values in bytes. If none, entries are never evicted.
+        """
+        self.max_size = max_size
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:  # noqa: D102
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:  # noqa: D102
+        with self._lock:
+            old_value = self._data.pop(key, None)
+            if old_value is not None:
+                self.size -= len(old_value)
+
+            self._data[key] = value
+            self.size += len(value)
+
+            while self.max_size is not None and self.size > self.max_size and len(self._data) > 1:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted)
+
+    def delete(self, key: str) -> None:  # noqa: D102
+        with self._lock:
+            value = self._data.pop(key, None)
+            if value is not None:
+                self.size -= len(value)
+
+    def clear(self) -> None:  # noqa: D102
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+
+class DiskCacheBackend(CacheBackend):
+    """A cache backend that stores each value in a file in the given directory.
+
+    Files are written atomically, so several processes can share the same directory. The modification time of a file
+    is bumped each time it is read and is used to find the least recently used entries during eviction.
+
+    Each process keeps a running total of the size of the directory, so it only lists the directory to evict entries
+    when its writes push the total over the maximum size, or every minute to add the entries written by other
+    processes to the total.
+    """
+
+    def __init__(self, directory: str, max_size: Optional[int] = DEFAULT_MAX_SIZE) -> None:
+        """Build a disk cache backend.
+
+        :param directory: The directory in which the values are stored. Is created if it does not exist.
+        :param max_size: The maximum total size of the stored values in bytes. It's capped at half the size of the
+         file system the directory is on. If none, entries are never evicted.
+        """
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+        if max_size is not None:
+            max_size = min(max_size, shutil.disk_usage(self.directory).total // 2)
+        self.max_size = max_size
+
+        self._size: Optional[int] = None  # counted when the first value is set
+        self._counted = 0.0
+        self._size_lock = threading.Lock()
+
+    def get_path(self, key: str) -> str:
+        """Get the path to the file that holds the value for the given key."""
+        name = hashlib.md5(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name[:2], name)
+
+    def get(self, key: str) -> Optional[bytes]:  # noqa: D102
+        path = self.get_path(key)
+        try:
+            with open(path, 'rb') as file:
+                value = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return value
+
+    def set(self, key: str, value: bytes) -> None:  # noqa: D102
+        path = self.get_path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(value)
+            replaced_size = _get_file_size(path)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+        if self.max_size is None:
+            return
+
+        with self._size_lock:
+            if self._size is not None:
+                self._size += len(value) - replaced_size
+            should_evict = (
+                self._size is None
+                or self.max_size < self._size
+                or _DISK_CACHE_RECOUNT_INTERVAL < time.monotonic() - self._counted
+            )
+        if should_evict:
+            self.evict()
+
+    def delete(self, key: str) -> None:  # noqa: D102
+        path = self.get_path(key)
+        size = _get_file_size(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        self._add_size(-size)
+
+    def clear(self) -> None:  # noqa: D102
+        for path, _, _ in self._iter_entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._size_lock:
+            self._size = 0
+
+    def _add_size(self, size: int) -> None:
+        with self._size_lock:
+            if self._size is not None:
+                self._size += size
+
+    def _iter_entries(self) -> Iterable:
+        """Iterate over triples of path, size, and modification time for the files in the cache."""
+        for sub_directory in os.scandir(self.directory):
+            if not sub_directory.is_dir():
+                continue
+            for entry in os.scandir(sub_directory.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # removed by another process
+                    continue
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def evict(self) -> None:
+        """Recount the size of the cache and remove the least recently used files until it fits in its maximum size."""
+        counted = time.monotonic()
+        entries = list(self._iter_entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+
+        if self.max_size < size:
+            for path, entry_size, _ in sorted(entries, key=lambda entry: entry[2]):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                size -= entry_size
+                if size <= self.max_size:
+                    break
+
+            logger.debug('evicted cache entries in %s down to %d bytes', self.directory, size)
+
+        with self._size_lock:
+            self._size = size
+            self._counted = counted
+
+
+class MmapCacheBackend(DiskCacheBackend):
+    """A disk cache backend whose values can be memory-mapped instead of being read into memory.
+
+    The mapped files are shared by all processes on the same host through the page cache, wherever they're stored.
+    """
+
+    def map(self, key: str) -> Optional[mmap.mmap]:
+        """Map the value for the key read-only, if it exists.
+
+        The mapping stays valid until it's closed or garbage collected, even if the value is replaced or evicted.
+        """
+        path = self.get_path(key)
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+
+        with file:
+            os.utime(path)
+            if not os.fstat(file.fileno()).st_size:  # empty files can't be mapped
+                return None
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class KeyLock:
+    """Mutual exclusion by key between the threads of this process and, optionally, the processes on this host."""
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        """Build a key lock.
+
+        :param directory: The directory in which the lock files that are shared between processes are created. If
+         none, or if :mod:`fcntl` is not available, only the threads of the current process are excluded.
+        """
+        self.directory = directory if fcntl is not None else None
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+
+        self._thread_locks: Dict[str, threading.Lock] = {}
+        self._thread_lock_users: Counter = Counter()
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def __call__(self, key: str):
+        """Hold the lock for the given key while in the context."""
+        with self._guard:
+            thread_lock = self._thread_locks.setdefault(key, threading.Lock())
+            self._thread_lock_users[key] += 1
+
+        try:
+            with thread_lock:
+                if self.directory is None:
+                    yield
+                else:
+                    with self._hold_file_lock(key):
+                        yield
+        finally:
+            with self._guard:
+                self._thread_lock_users[key] -= 1
+                if not self._thread_lock_users[key]:
+                    del self._thread_lock_users[key]
+                    del self._thread_locks[key]
+
+    @contextmanager
+    def _hold_file_lock(self, key: str):
+        """Hold an exclusive lock on the lock file for the given key, then remove it."""
+        name = hashlib.md5(key.encode('utf-8')).hexdigest()
+        path = os.path.join(self.directory, f'{name}.lock')
+
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:  # make sure the file wasn't removed by the previous holder while waiting on it
+                if os.stat(path).st_ino == os.fstat(fd).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+        try:
+            yield
+        finally:
+            os.remove(path)
+            os.close(fd)
+
+
+class GraphCache:
+    """Stores BEL graphs in a cache backend."""
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend] = None,
+        generations: Optional[CacheBackend] = None,
+        lock: Optional[KeyLock] = None,
+        snapshot_backend: Optional[MmapCacheBackend] = None,
+    ) -> None:
+        """Build a graph cache.
+
+        :param backend: The backend in which serialized graphs are stored. Defaults to a
+         :class:`MemoryCacheBackend`.
+        :param generations: The backend in which the generation tokens of networks and the statistics of the pipeline
+         checkpoints are stored. It should never evict its entries, otherwise stale graphs become reachable again.
+         Defaults to an unbounded :class:`MemoryCacheBackend`.
+        :param lock: The lock used to build each missing graph only once. Defaults to a :class:`KeyLock` that only
+         excludes the threads of the current process.
+        :param snapshot_backend: The backend in which snapshots are stored and memory-mapped. If none, they are
+         pickled and stored with the graphs.
+        """
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.generations = generations if generations is not None else MemoryCacheBackend(max_size=None)
+        self.lock = lock if lock is not None else KeyLock()
+        self.snapshot_backend = snapshot_backend
+
+        self._snapshots: Dict[str, GraphSnapshot] = OrderedDict()
+        self._snapshots_lock = threading.Lock()
+
+        self._checkpoint_lock = threading.Lock()
+        self._reset_checkpoint_counts()
+
+    @classmethod
+    def from_directory(
+        cls,
+        directory: Optional[str] = None,
+        max_size: int = DEFAULT_MAX_SIZE,
+        snapshot_max_size: int = DEFAULT_MAX_SIZE,
+    ) -> GraphCache:
+        """Build a graph cache that is stored on disk, or in memory if no directory is given.
+
+        :param directory: The directory in which graphs and snapshots are stored
+        :param max_size: The maximum size of the graphs stored in the directory in bytes
+        :param snapshot_max_size: The maximum size of the snapshots stored in the directory in bytes
+        """
+        if directory is None:
+            return cls(MemoryCacheBackend(max_size=max_size))
+
+        return cls(
+            backend=DiskCacheBackend(directory=os.path.join(directory, 'entries'), max_size=max_size),
+            generations=DiskCacheBackend(directory=os.path.join(directory, 'generations'), max_size=None),
+            lock=KeyLock(directory=os.path.join(directory, 'locks')),
+            snapshot_backend=MmapCacheBackend(
+                directory=os.path.join(directory, 'snapshots'),
+                max_size=snapshot_max_size,
+            ),
+        )
+
+    def get_graph(self, key: str) -> Optional[BELGraph]:
+        """Get a graph from the cache, if it exists."""
+        with self.backend.open(key) as value:
+            if value is None:
+                return None
+            return from_bytes(value)
+
+    def set_graph(self, key: str, graph: BELGraph) -> None:
+        """Store a graph in the cache, if it fits."""
+        for node in graph:  # the hashes of the nodes are kept on them when they're pickled, so calculate them first
+            node.md5
+        self._set(key, to_bytes(graph))
+
+    def get_object(self, key: str) -> Optional[Any]:
+        """Get a pickled object, like a :class:`bel_commons.graph_snapshot.GraphSnapshot`, from the cache."""
+        with self.backend.open(key) as value:
+            if value is None:
+                return None
+            return pickle.loads(value)
+
+    def set_object(self, key: str, value: Any) -> None:
+        """Pickle an object and store it in the cache, if it fits."""
+        self._set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def get_task_id(self, key: str) -> Optional[str]:
+        """Get the identifier of the celery task stored under the key, if there is one."""
+        value = self.backend.get(key)
+        if value is None:
+            return None
+        return value.decode('ascii')
+
+    def set_task_id(self, key: str, task_id: str) -> None:
+        """Store the identifier of a celery task, so other requests can share the task instead of starting another."""
+        self._set(key, task_id.encode('ascii'))
+
+    def delete_task_id(self, key: str) -> None:
+        """Forget the identifier of the celery task stored under the key, once its result has been used."""
+        self.backend.delete(key)
+
+    def get_snapshot(self, key: str) -> Optional[GraphSnapshot]:
+        """Get a snapshot from the ones used recently by this process, or from the cache."""
+        with self._snapshots_lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+                return snapshot
+
+        snapshot = self._load_snapshot(key)
+        if snapshot is not None:
+            self._keep_snapshot(key, snapshot)
+        return snapshot
+
+    def set_snapshot(self, key: str, snapshot: GraphSnapshot) -> None:
+        """Store a snapshot in the cache, if it fits.
+
+        If the snapshots are memory-mapped, this process keeps using the mapped copy instead of the given one, so that
+        its arrays are shared with the other processes.
+        """
+        if self.snapshot_backend is None:
+            self.set_object(key, snapshot)
+        else:
+            self._set(key, snapshot.to_bytes(), backend=self.snapshot_backend)
+            snapshot = self._load_snapshot(key) or snapshot
+        self._keep_snapshot(key, snapshot)
+
+    def get_or_build_snapshot(self, key: str, build: Callable[[], Optional[GraphSnapshot]]) -> Optional[GraphSnapshot]:
+        """Get a snapshot from the cache, or build and store it if it doesn't exist.
+
+        :param key: The key of the snapshot
+        :param build: A function that builds the snapshot. If it returns none, nothing is stored.
+        """
+        snapshot = self._get_or_build(key, build, self.get_snapshot, self.set_snapshot)
+        if snapshot is None:
+            return None
+        with self._snapshots_lock:
+            return self._snapshots.get(key, snapshot)
+
+    def _load_snapshot(self, key: str) -> Optional[GraphSnapshot]:
+        """Unpickle or map a snapshot from the cache, if it exists."""
+        if self.snapshot_backend is None:
+            return self.get_object(key)
+
+        mapping = self.snapshot_backend.map(key)
+        if mapping is None:
+            return None
+        return GraphSnapshot.from_buffer(mapping)
+
+    def _keep_snapshot(self, key: str, snapshot: GraphSnapshot) -> None:
+        """Keep a snapshot in this process, evicting the least recently used ones."""
+        with self._snapshots_lock:
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            while SNAPSHOTS_IN_MEMORY < len(self._snapshots):
+                self._snapshots.popitem(last=False)
+
+    def _set(self, key: str, value: bytes, backend: Optional[CacheBackend] = None) -> None:
+        """Store a value in the backend, logging instead of raising if the backend can't store it."""
+        try:
+            (backend if backend is not None else self.backend).set(key, value)
+        except OSError:
+            logger.warning('could not store %s (%d bytes) in the graph cache', key, len(value), exc_info=True)
+
+    def get_or_build_graph(self, key: str, build: Callable[[], Optional[BELGraph]]) -> Optional[BELGraph]:
+        """Get a graph from the cache, or build and store it if it doesn't exist.
+
+        Concurrent calls for the same key wait for the first one to build the graph instead of building it again.
+
+        :param key: The key of the graph
+        :param build: A function that builds the graph. If it returns none, nothing is stored.
+        """
+        return self._get_or_build(key, build, self.get_graph, self.set_graph)
+
+    def get_or_build_object(self, key: str, build: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """Get a pickled object from the cache, or build and store it if it doesn't exist.
+
+        :param key: The key of the object
+        :param build: A function that builds the object. If it returns none, nothing is stored.
+        """
+        return self._get_or_build(key, build, self.get_object, self.set_object)
+
+    def _get_or_build(
+        self,
+        key: str,
+        build: Callable[[], Any],
+        get: Callable[[str], Any],
+        set_: Callable[[str, Any], None],
+    ):
+        """Get a value with the given getter, or build it and store it with the given setter while holding the lock."""
+        value = get(key)
+        if value is not None:
+            return value
+
+        with self.lock(key):
+            value = get(key)  # it might have been built while waiting for the lock
+            if value is not None:
+                logger.debug('got %s built by a concurrent request', key)
+                return value
+
+            value = build()
+            if value is not None:
+                set_(key, value)
+
+        return value
+
+    def get_network_generation(self, network_id: int) -> str:
+        """Get the current generation token of the given network."""
+        value = self.generations.get(f'network:{network_id}')
+        if value is None:
+            return _DEFAULT_GENERATION
+        return value.decode('ascii')
+
+    def invalidate_network(self, network_id: int) -> None:
+        """Invalidate all entries that were built using the given network."""
+        logger.debug('invalidating graph cache entries for network [id=%s]', network_id)
+        self.generations.set(f'network:{network_id}', uuid.uuid4().hex.encode('ascii'))
+
+    def get_networks_key(self, network_ids: Iterable[int]) -> str:
+        """Build a key for the current generation of the given networks."""
+        return ','.join(
+            f'{network_id}.{self.get_network_generation(network_id)}'
+            for network_id in sorted(set(network_ids))
+        )
+
+    def get_network_key(self, network_id: int) -> str:
+        """Build a key for the given network."""
+        return f'{_NETWORK_KEY_PREFIX}{self.get_networks_key([network_id])}'
+
+    def get_universe_key(self, network_ids: Iterable[int]) -> str:
+        """Build a key for the union of the given networks.
+
+        The key contains the same hash as :data:`bel_commons.models.Assembly.md5`, so adding or removing a network
+        from an assembly or project leads to a new entry that is built the next time it's needed.
+        """
+        network_ids = sorted(set(network_ids))
+        assembly_md5 = hashlib.md5(pickle.dumps(tuple(network_ids))).hexdigest()
+        return f'universe:{assembly_md5}:{self.get_networks_key(network_ids)}'
+
+    def get_query_key(self, query: Query) -> str:
+        """Build a key for the result of the given query.
+
+        The key depends on the content of the query, so identical queries with different database identifiers share
+        the same entry, and on the generation of each network in the query's assembly.
+        """
+        return self.get_query_prefix_keys(query)[-1]
+
+    def get_snapshot_key(self, query: Query) -> str:
+        """Build a key for the snapshot of the result of the given query."""
+        return f'snapshot:{self.get_query_key(query)}'
+
+    def get_canonical_strings_key(self, query: Query) -> str:
+        """Build a key for the BEL strings of the nodes in the result of the given query."""
+        return f'canonical:{self.get_query_key(query)}'
+
+    def get_betweenness_centrality_key(self, query: Query, error: float) -> str:
+        """Build a key for the betweenness centrality of the nodes in the result of the given query."""
+        return f'betweenness:{error!r}:{self.get_query_key(query)}'
+
+    def get_betweenness_centrality_task_key(self, query: Query, error: float) -> str:
+        """Build a key for the identifier of the celery task calculating the betweenness centrality of the result."""
+        return f'task:{self.get_betweenness_centrality_key(query, error)}'
+
+    def get_query_prefix_keys(self, query: Query) -> List[str]:
+        """Build a key for the checkpoint after each prefix of the given query's pipeline.
+
+        The first key is for the seeded graph, before any pipeline steps are applied, and the last one is the same as
+        :meth:`get_query_key`.
+        """
+        networks_key = self.get_networks_key(query.network_ids)
+        return [
+            f'query:{prefix_hash}:{networks_key}'
+            for prefix_hash in query.get_prefix_hashes()
+        ]
+
+    def count_checkpoint(self, steps: int, hit: bool) -> None:
+        """Count a hit or a miss of the pipeline checkpoint after the given number of steps.
+
+        The counts are kept in the memory of each process and stored in the generations backend at most every
+        :data:`CHECKPOINT_STORE_INTERVAL` seconds, so counting doesn't write to the backend or wait on other processes.
+
+        :param steps: The number of pipeline steps of the checkpoint
+        :param hit: Was the query resumed from the checkpoint, or was the checkpoint computed and stored?
+        """
+        with self._checkpoint_lock:
+            if self._checkpoint_pid != os.getpid():  # the counts were inherited from the parent process
+                self._reset_checkpoint_counts()
+            (self.checkpoint_hits if hit else self.checkpoint_misses)[steps] += 1
+            if self._checkpoints_stored is None or CHECKPOINT_STORE_INTERVAL <= time.time() - self._checkpoints_stored:
+                self._store_checkpoint_counts()
+
+    def _reset_checkpoint_counts(self) -> None:
+        self._checkpoint_pid = os.getpid()
+        self._checkpoint_key = f'{_CHECKPOINTS_KEY}:{self._checkpoint_pid}:{uuid.uuid4().hex}'
+        self._checkpoints_stored = None
+        #: Counts how many times a query was resumed from the checkpoint after each number of pipeline steps
+        self.checkpoint_hits = Counter()
+        #: Counts how many times the checkpoint after each number of pipeline steps had to be computed
+        self.checkpoint_misses = Counter()
+
+    def _store_checkpoint_counts(self) -> None:
+        """Store the counts of this process, registering it the first time, while holding the checkpoint lock."""
+        try:
+            if self._checkpoints_stored is None:
+                with self.lock(_CHECKPOINTS_KEY):
+                    keys = self._get_checkpoint_keys()
+                    keys = self._retire_checkpoint_keys(keys)
+                    keys.add(self._checkpoint_key)
+                    self.generations.set(_CHECKPOINTS_KEY, pickle.dumps(keys, protocol=pickle.HIGHEST_PROTOCOL))
+            self._set_checkpoint_counts(self._checkpoint_key, self.checkpoint_hits, self.checkpoint_misses)
+        except OSError:
+            logger.warning('could not store the counts of the pipeline checkpoints', exc_info=True)
+        else:
+            self._checkpoints_stored = time.time()
+
+    def _retire_checkpoint_keys(self, keys: Set[str]) -> Set[str]:
+        """Add the counts of the processes on this host that have exited to the retired counts and unregister them."""
+        hits, misses = self._get_checkpoint_counts(_RETIRED_CHECKPOINTS_KEY)
+        rv = set()
+        for key in keys:
+            if _is_process_running(int(key.split(':')[1])):
+                rv.add(key)
+                continue
+            process_hits, process_misses = self._get_checkpoint_counts(key)
+            hits.update(process_hits)
+            misses.update(process_misses)
+            self.generations.delete(key)
+
+        if len(rv) < len(keys):
+            self._set_checkpoint_counts(_RETIRED_CHECKPOINTS_KEY, hits, misses)
+        return rv
+
+    def _get_checkpoint_keys(self) -> Set[str]:
+        """Get the keys of the counts of the pipeline checkpoints stored by each process."""
+        value = self.generations.get(_CHECKPOINTS_KEY)
+        if value is None:
+            return set()
+        return pickle.loads(value)
+
+    def _get_checkpoint_counts(self, key: str) -> Tuple[Counter, Counter]:
+        """Get the hits and misses of the pipeline checkpoints stored under the given key, by number of steps."""
+        value = self.generations.get(key)
+        if value is None:
+            return Counter(), Counter()
+        return pickle.loads(value)
+
+    def _set_checkpoint_counts(self, key: str, hits: Counter, misses: Counter) -> None:
+        self.generations.set(key, pickle.dumps((hits, misses), protocol=pickle.HIGHEST_PROTOCOL))
+
+    def get_checkpoint_statistics(self) -> Mapping[str, Any]:
+        """Summarize the hits and misses of the pipeline checkpoints in all processes, by number of pipeline steps.
+
+        The counts of other processes can be up to :data:`CHECKPOINT_STORE_INTERVAL` seconds old.
+        """
+        with self._checkpoint_lock:
+            if self._checkpoint_pid == os.getpid():
+                self._store_checkpoint_counts()
+
+        hits, misses = self._get_checkpoint_counts(_RETIRED_CHECKPOINTS_KEY)
+        for key in self._get_checkpoint_keys():
+            process_hits, process_misses = self._get_checkpoint_counts(key)
+            hits.update(process_hits)
+            misses.update(process_misses)
+
+        return {
+            'hits': sum(hits.values()),
+            'misses': sum(misses.values()),
+            'steps': [
+                {
+                    'steps': step,
+                    'hits': hits[step],
+                    'misses': misses[step],
+                }
+                for step in sorted(set(hits) | set(misses))
+            ],
+        }
+
+
+def _get_file_size(path: str) -> int:
+    """Get the size of a file, or zero if it doesn't exist."""
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _is_process_running(pid: int) -> bool:
+    """Check if a process with the given identifier is running on this host."""
+    if os.name == 'nt':  # signals can't be used to check, so assume it's running
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # it's running as another user
+        return True
+    return True
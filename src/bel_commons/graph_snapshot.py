@@ -0,0 +1,573 @@
+# -*- coding: utf-8 -*-
+
+"""Compact, read-only snapshots of the structure of BEL graphs for the analytical endpoints.
+
+A :class:`GraphSnapshot` keeps the nodes of a BEL graph as an array of their hashes and its edges in compressed sparse
+row (CSR) format. It's built once for the result of each
+query and cached alongside it by :class:`bel_commons.graph_cache.GraphCache`, so traversals like shortest paths and
+betweenness centrality run on :mod:`scipy.sparse` matrices instead of on the full :class:`pybel.BELGraph`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import random
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+from scipy.sparse.csgraph import breadth_first_order
+
+from pybel import BELGraph
+from pybel.constants import FUNCTION, PATHOLOGY
+
+__all__ = [
+    'GraphSnapshot',
+    'PathSearch',
+    'get_number_of_samples',
+    'get_top_indexes',
+]
+
+#: The maximum number of entries in each of the dense matrices used to calculate betweenness centrality
+_MAX_BATCH_ENTRIES = 2 ** 21
+
+#: The number of steps of the depth-first search for paths between checks of whether it should stop
+_STEPS_BETWEEN_CHECKS = 1024
+
+#: The names of the arrays of a snapshot, in the order they're serialized
+_ARRAY_NAMES = ('node_hashes', 'pathologies', 'offsets', 'neighbors')
+#: The number of bytes each serialized array is aligned to
+_ALIGNMENT = 64
+#: The format of the length of the header of a serialized snapshot
+_HEADER_LENGTH = struct.Struct('<Q')
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+class GraphSnapshot:
+    """The structure of a BEL graph in compressed sparse row format.
+
+    The out-edges of the node at index ``i`` are at the positions ``offsets[i]`` to ``offsets[i + 1]`` of
+    ``neighbors``. Parallel edges are kept, so the number of edges is the same as in the graph.
+
+    The adjacency matrices and the index of the node hashes are built the first time they're needed and kept on the
+    snapshot, so they're shared by all requests that use it. They're not pickled or serialized.
+    """
+
+    def __init__(
+        self,
+        node_hashes: np.ndarray,
+        pathologies: np.ndarray,
+        offsets: np.ndarray,
+        neighbors: np.ndarray,
+    ) -> None:
+        """Build a graph snapshot.
+
+        :param node_hashes: The MD5 hashes of the nodes, as ASCII bytes
+        :param pathologies: A boolean mask of the nodes that are pathologies
+        :param offsets: The offsets of the out-edges of each node, with one more entry than there are nodes
+        :param neighbors: The index of the target node of each edge
+        """
+        self.node_hashes = node_hashes
+        self.pathologies = pathologies
+        self.offsets = offsets
+        self.neighbors = neighbors
+
+        self._lock = threading.RLock()  # building a matrix can get the directed one first
+        self._node_index: Optional[Mapping[bytes, int]] = None
+        self._adjacencies: Dict[Tuple[bool, bool], csr_matrix] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:  # noqa: D105
+        return {name: getattr(self, name) for name in _ARRAY_NAMES}
+
+    def __setstate__(self, state: Mapping[str, Any]) -> None:  # noqa: D105
+        self.__init__(**state)
+
+    @classmethod
+    def from_graph(cls, graph: BELGraph) -> GraphSnapshot:
+        """Build a snapshot of the given BEL graph."""
+        nodes = list(graph)
+        node_index = {node: index for index, node in enumerate(nodes)}
+
+        number_edges = graph.number_of_edges()
+        sources = np.empty(number_edges, dtype=np.int32)
+        targets = np.empty(number_edges, dtype=np.int32)
+
+        for position, (source, target) in enumerate(graph.edges()):
+            sources[position] = node_index[source]
+            targets[position] = node_index[target]
+
+        order = np.argsort(sources, kind='stable')
+        offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(nodes)), out=offsets[1:])
+
+        return cls(
+            node_hashes=np.array([node.md5 for node in nodes], dtype='S32'),
+            pathologies=np.array([node[FUNCTION] == PATHOLOGY for node in nodes], dtype=bool),
+            offsets=offsets,
+            neighbors=targets[order],
+        )
+
+    def to_bytes(self) -> bytes:
+        """Serialize this snapshot so it can be read with :meth:`from_buffer` without copying its arrays.
+
+        The serialization starts with the length of a JSON header describing the arrays, then the header, then the
+        raw bytes of each array aligned to :data:`_ALIGNMENT` bytes.
+        """
+        arrays = [np.ascontiguousarray(getattr(self, name)) for name in _ARRAY_NAMES]
+
+        specifications = []
+        offset = 0
+        for array in arrays:
+            specifications.append([array.dtype.str, list(array.shape), offset])
+            offset = _align(offset + array.nbytes)
+
+        header = json.dumps({'arrays': specifications}).encode('utf-8')
+        start = _align(_HEADER_LENGTH.size + len(header))
+
+        rv = bytearray(start + offset)
+        _HEADER_LENGTH.pack_into(rv, 0, len(header))
+        rv[_HEADER_LENGTH.size:_HEADER_LENGTH.size + len(header)] = header
+        for array, (_, _, array_offset) in zip(arrays, specifications):
+            rv[start + array_offset:start + array_offset + array.nbytes] = array.tobytes()
+        return bytes(rv)
+
+    @classmethod
+    def from_buffer(cls, buffer) -> GraphSnapshot:
+        """Read a snapshot serialized with :meth:`to_bytes`.
+
+        The arrays are read-only views of the buffer, so a snapshot read from a memory-mapped file shares its memory
+        with all other processes that mapped the same file.
+        """
+        header_length, = _HEADER_LENGTH.unpack_from(buffer, 0)
+        header = json.loads(bytes(buffer[_HEADER_LENGTH.size:_HEADER_LENGTH.size + header_length]).decode('utf-8'))
+        start = _align(_HEADER_LENGTH.size + header_length)
+
+        arrays = {
+            name: np.frombuffer(
+                buffer,
+                dtype=np.dtype(dtype),
+                count=int(np.prod(shape, dtype=np.int64)),
+                offset=start + offset,
+            ).reshape(shape)
+            for name, (dtype, shape, offset) in zip(_ARRAY_NAMES, header['arrays'])
+        }
+        return cls(**arrays)
+
+    def number_of_nodes(self) -> int:
+        """Get the number of nodes."""
+        return len(self.node_hashes)
+
+    def number_of_edges(self) -> int:
+        """Get the number of edges, including parallel edges."""
+        return len(self.neighbors)
+
+    def get_digest(self) -> str:
+        """Get the MD5 hash of the node hashes in order, which identifies the order of the nodes of this snapshot."""
+        return hashlib.md5(self.node_hashes.tobytes()).hexdigest()
+
+    def get_node_index(self, node_hash: str) -> Optional[int]:
+        """Get the index of the node with the given hash, if it's in the snapshot."""
+        if self._node_index is None:
+            with self._lock:
+                if self._node_index is None:
+                    self._node_index = {
+                        node_hash: index
+                        for index, node_hash in enumerate(self.node_hashes.tolist())
+                    }
+        return self._node_index.get(node_hash.encode('ascii'))
+
+    def get_node_hashes(self, indexes: Iterable[int]) -> List[str]:
+        """Get the hashes of the nodes at the given indexes."""
+        return [
+            node_hash.decode('ascii')
+            for node_hash in self.node_hashes[list(indexes)]
+        ]
+
+    def get_adjacency(self, undirected: bool = False, remove_pathologies: bool = False) -> csr_matrix:
+        """Get the adjacency matrix of the nodes, in which parallel edges are collapsed.
+
+        It's built the first time it's needed and shared afterwards, so it must not be modified.
+
+        :param undirected: Should the edges be considered in both directions?
+        :param remove_pathologies: Should the edges from and to pathologies be removed?
+        """
+        remove_pathologies = remove_pathologies and bool(self.pathologies.any())
+        key = undirected, remove_pathologies
+
+        adjacency = self._adjacencies.get(key)
+        if adjacency is None:
+            with self._lock:
+                adjacency = self._adjacencies.get(key)
+                if adjacency is None:
+                    adjacency = self._adjacencies[key] = self._build_adjacency(undirected, remove_pathologies)
+        return adjacency
+
+    def _build_adjacency(self, undirected: bool, remove_pathologies: bool) -> csr_matrix:
+        if not undirected and not remove_pathologies:
+            number_nodes = self.number_of_nodes()
+            adjacency = csr_matrix(
+                (np.ones(len(self.neighbors)), self.neighbors, self.offsets),
+                shape=(number_nodes, number_nodes),
+                copy=True,  # summing duplicates sorts the indices in place
+            )
+            adjacency.sum_duplicates()
+            adjacency.data[:] = 1.0
+            return adjacency
+
+        adjacency = self.get_adjacency()
+
+        if undirected:
+            adjacency = adjacency.maximum(adjacency.T).tocsr()
+
+        if remove_pathologies:
+            keep = diags((~self.pathologies).astype(float))
+            adjacency = (keep @ adjacency @ keep).tocsr()
+            adjacency.eliminate_zeros()
+
+        return adjacency
+
+    def get_neighbors(self, node: int, undirected: bool = False, remove_pathologies: bool = False) -> np.ndarray:
+        """Get the sorted indexes of the neighbors of the given node.
+
+        They're read from the edges of the node instead of from an adjacency matrix.
+        """
+        if remove_pathologies and self.pathologies[node]:
+            return np.array([], dtype=self.neighbors.dtype)
+
+        neighbors = self.neighbors[self.offsets[node]:self.offsets[node + 1]]
+        if undirected:
+            positions = np.flatnonzero(self.neighbors == node)
+            sources = np.searchsorted(self.offsets, positions, side='right') - 1
+            neighbors = np.concatenate([neighbors, sources.astype(self.neighbors.dtype)])
+
+        neighbors = np.unique(neighbors)
+        if remove_pathologies:
+            neighbors = neighbors[~self.pathologies[neighbors]]
+        return neighbors
+
+    def get_shortest_path(
+        self,
+        source: int,
+        target: int,
+        undirected: bool = False,
+        remove_pathologies: bool = False,
+    ) -> Optional[List[int]]:
+        """Get the indexes of the nodes in a shortest path between the given nodes, if there is one."""
+        adjacency = self.get_adjacency(undirected=undirected, remove_pathologies=remove_pathologies)
+        return _get_shortest_path(adjacency, source, target)
+
+    def iter_all_simple_paths(
+        self,
+        source: int,
+        target: int,
+        cutoff: Optional[int] = None,
+        undirected: bool = False,
+        remove_pathologies: bool = False,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> Iterable[List[int]]:
+        """Iterate over the indexes of the nodes in all simple paths between the given nodes.
+
+        This is the same search as :func:`networkx.all_simple_paths`.
+
+        :param source: The index of the source node
+        :param target: The index of the target node
+        :param cutoff: The largest number of edges in the paths. Defaults to the number of nodes minus one.
+        :param undirected: Should the edges be considered in both directions?
+        :param remove_pathologies: Should the edges from and to pathologies be removed?
+        :param should_stop: A function that is called regularly during the search. The search stops early if it
+         returns true.
+        """
+        if cutoff is None:
+            cutoff = self.number_of_nodes() - 1
+        if cutoff < 1 or source == target:
+            return
+
+        adjacency = self.get_adjacency(undirected=undirected, remove_pathologies=remove_pathologies)
+        indptr, indices = adjacency.indptr.tolist(), adjacency.indices.tolist()
+
+        def iter_neighbors(node: int) -> Iterable[int]:
+            return iter(indices[indptr[node]:indptr[node + 1]])
+
+        visited = {source: None}  # used as an ordered set
+        stack = [iter_neighbors(source)]
+        steps = 0
+        while stack:
+            steps += 1
+            if should_stop is not None and not steps % _STEPS_BETWEEN_CHECKS and should_stop():
+                return
+
+            children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                visited.popitem()
+            elif len(visited) < cutoff:
+                if child == target:
+                    yield [*visited, target]
+                elif child not in visited:
+                    visited[child] = None
+                    stack.append(iter_neighbors(child))
+            else:
+                if child == target or target in children:
+                    yield [*visited, target]
+                stack.pop()
+                visited.popitem()
+
+    def get_random_path(self, tries: int = 5) -> List[int]:
+        """Get the indexes of the nodes in the shortest undirected path between a random pair of nodes.
+
+        Works like :func:`pybel.struct.get_random_path`: returns just a random node if no connected pair is found
+        after the given number of tries.
+        """
+        number_nodes = self.number_of_nodes()
+        if number_nodes < 2:
+            return list(range(number_nodes))
+
+        adjacency = self.get_adjacency(undirected=True)
+
+        for _ in range(tries):
+            source, target = random.sample(range(number_nodes), k=2)
+            path = _get_shortest_path(adjacency, source, target)
+            if path is not None:
+                return path
+
+        return [source]
+
+    def get_betweenness_centrality(self, sources: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Calculate the betweenness centrality of each node.
+
+        This gives the same results as :func:`networkx.betweenness_centrality` with normalization. Brandes' algorithm
+        runs for batches of sources at a time, with one sparse matrix product per level of the breadth-first search.
+
+        :param sources: The indexes of the nodes to use as sources. If given, the dependencies on them are scaled up
+         to estimate the betweenness centrality over all nodes like with the ``k`` argument of
+         :func:`networkx.betweenness_centrality`. Defaults to all nodes, for the exact betweenness centrality.
+        """
+        number_nodes = self.number_of_nodes()
+        betweenness = np.zeros(number_nodes)
+        if number_nodes < 3:
+            return betweenness
+
+        sources = np.arange(number_nodes) if sources is None else np.asarray(sources, dtype=np.int64)
+        if not len(sources):
+            return betweenness
+
+        adjacency = self.get_adjacency()
+        adjacency_transpose = adjacency.T.tocsr()
+
+        batch_size = max(1, _MAX_BATCH_ENTRIES // number_nodes)
+        for start in range(0, len(sources), batch_size):
+            betweenness += _get_dependencies(adjacency, adjacency_transpose, sources[start:start + batch_size])
+
+        return betweenness * number_nodes / (len(sources) * (number_nodes - 1) * (number_nodes - 2))
+
+    def get_approximate_betweenness_centrality(
+        self,
+        error: float,
+        failure_probability: float = 0.1,
+        seed: Optional[int] = None,
+    ) -> np.ndarray:
+        """Estimate the betweenness centrality of each node from a random sample of sources.
+
+        :param error: The maximum absolute error of the normalized betweenness centrality of any node
+        :param failure_probability: The probability that the error of any node is larger than the given error
+        :param seed: The seed for the random sample of sources
+
+        The number of sources is chosen with :func:`get_number_of_samples`. If it's at least the number of nodes, this
+        is the same as :meth:`get_betweenness_centrality`.
+        """
+        number_nodes = self.number_of_nodes()
+        number_samples = get_number_of_samples(number_nodes, error, failure_probability)
+        if number_samples >= number_nodes:
+            return self.get_betweenness_centrality()
+
+        sources = np.random.RandomState(seed).choice(number_nodes, size=number_samples, replace=False)
+        return self.get_betweenness_centrality(sources=np.sort(sources))
+
+
+def get_number_of_samples(number_nodes: int, error: float, failure_probability: float = 0.1) -> int:
+    """Get the number of sources needed to estimate the betweenness centrality of all nodes within the given error.
+
+    The normalized dependencies on a random source, scaled up by the number of nodes, are at most about one and are
+    on average the betweenness centrality. By Hoeffding's inequality and a union bound over the ``n`` nodes,
+    ``ceil(ln(2 * n / failure_probability) / (2 * error ** 2))`` sources are enough.
+
+    :param number_nodes: The number of nodes in the graph
+    :param error: The maximum absolute error of the normalized betweenness centrality of any node
+    :param failure_probability: The probability that the error of any node is larger than the given error
+    """
+    if number_nodes < 1:
+        return 0
+    if error <= 0:
+        return number_nodes
+    return min(number_nodes, math.ceil(math.log(2 * number_nodes / failure_probability) / (2 * error ** 2)))
+
+
+def get_top_indexes(values: np.ndarray, number: int) -> np.ndarray:
+    """Get the indexes of the largest values in descending order, with ties broken by the lowest index.
+
+    Only the top values are sorted, after partitioning them from the rest in linear time.
+    """
+    number = min(number, len(values))
+    if number <= 0:
+        return np.array([], dtype=np.int64)
+
+    if number < len(values):
+        threshold = np.partition(values, len(values) - number)[len(values) - number]
+        # keep all the values tied with the threshold so ties are broken the same way as in a full stable sort
+        candidates = np.flatnonzero(values >= threshold)
+    else:
+        candidates = np.arange(len(values))
+
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order[:number]]
+
+
+class PathSearch:
+    """A search for all simple paths between two nodes of a graph snapshot that stops at given bounds.
+
+    Iterating over the search yields the paths as they are found. Afterwards, :attr:`truncated` tells if the search
+    stopped before finding all paths and :attr:`reason` tells why. The search can be cancelled from another thread with
+    :meth:`cancel`.
+    """
+
+    #: The search found more than the maximum number of paths
+    MAX_PATHS = 'max_paths'
+    #: The search ran out of time
+    TIME_LIMIT = 'time_limit'
+    #: The search was cancelled
+    CANCELLED = 'cancelled'
+
+    def __init__(
+        self,
+        snapshot: GraphSnapshot,
+        source: int,
+        target: int,
+        cutoff: Optional[int] = None,
+        undirected: bool = False,
+        remove_pathologies: bool = False,
+        max_paths: Optional[int] = None,
+        time_limit: Optional[float] = None,
+    ) -> None:
+        """Build a path search.
+
+        :param snapshot: The graph snapshot to search
+        :param source: The index of the source node
+        :param target: The index of the target node
+        :param cutoff: The largest number of edges in the paths
+        :param undirected: Should the edges be considered in both directions?
+        :param remove_pathologies: Should the edges from and to pathologies be removed?
+        :param max_paths: The maximum number of paths to find. If none, finds all paths.
+        :param time_limit: The maximum number of seconds the search can run. If none, runs until it's done.
+        """
+        self.snapshot = snapshot
+        self.source = source
+        self.target = target
+        self.cutoff = cutoff
+        self.undirected = undirected
+        self.remove_pathologies = remove_pathologies
+        self.max_paths = max_paths
+        self.time_limit = time_limit
+
+        #: Why the search stopped early, if it did
+        self.reason: Optional[str] = None
+        self._cancelled = threading.Event()
+        self._deadline: Optional[float] = None
+
+    @property
+    def truncated(self) -> bool:
+        """Check if the search stopped before finding all paths."""
+        return self.reason is not None
+
+    def cancel(self) -> None:
+        """Stop the search the next time it checks."""
+        self._cancelled.set()
+
+    def _should_stop(self) -> bool:
+        if self._cancelled.is_set():
+            self.reason = self.CANCELLED
+        elif self._deadline is not None and self._deadline < time.monotonic():
+            self.reason = self.TIME_LIMIT
+        return self.reason is not None
+
+    def __iter__(self) -> Iterable[List[int]]:  # noqa: D105
+        if self.time_limit is not None:
+            self._deadline = time.monotonic() + self.time_limit
+
+        paths = self.snapshot.iter_all_simple_paths(
+            self.source,
+            self.target,
+            cutoff=self.cutoff,
+            undirected=self.undirected,
+            remove_pathologies=self.remove_pathologies,
+            should_stop=self._should_stop,
+        )
+        for number_paths, path in enumerate(paths, start=1):
+            if self.max_paths is not None and self.max_paths < number_paths:
+                self.reason = self.MAX_PATHS
+                return
+            if self._should_stop():
+                return
+            yield path
+
+
+def _get_shortest_path(adjacency: csr_matrix, source: int, target: int) -> Optional[List[int]]:
+    """Get the indexes of the nodes in a shortest path between the given nodes, if there is one."""
+    if source == target:
+        return [source]
+
+    _, predecessors = breadth_first_order(adjacency, source, directed=True, return_predecessors=True)
+    if predecessors[target] < 0:
+        return None
+
+    path = [target]
+    while path[-1] != source:
+        path.append(int(predecessors[path[-1]]))
+
+    return path[::-1]
+
+
+def _get_dependencies(adjacency: csr_matrix, adjacency_transpose: csr_matrix, sources: np.ndarray) -> np.ndarray:
+    """Sum the dependencies of the given sources on each node, as in Brandes' algorithm.
+
+    Each column of the dense matrices corresponds to one of the sources.
+    """
+    number_nodes = adjacency.shape[0]
+    columns = np.arange(len(sources))
+
+    distance = np.full((number_nodes, len(sources)), -1, dtype=np.int32)
+    distance[sources, columns] = 0
+
+    # count the shortest paths from the sources to each node, one level of the breadth-first search at a time
+    frontier = np.zeros((number_nodes, len(sources)))
+    frontier[sources, columns] = 1.0
+    sigma = frontier.copy()
+
+    depth = 0
+    while True:
+        reached = adjacency_transpose @ frontier
+        new = (reached > 0) & (distance < 0)
+        if not new.any():
+            break
+        depth += 1
+        distance[new] = depth
+        frontier = np.where(new, reached, 0.0)
+        sigma += frontier
+
+    # accumulate the dependencies from the deepest level back to the sources
+    delta = np.zeros((number_nodes, len(sources)))
+    for level in range(depth, 0, -1):
+        at_level = distance == level
+        coefficient = np.where(at_level, (1.0 + delta) / np.where(at_level, sigma, 1.0), 0.0)
+        delta += np.where(distance == level - 1, sigma * (adjacency @ coefficient), 0.0)
+
+    delta[sources, columns] = 0.0
+    return delta.sum(axis=1)
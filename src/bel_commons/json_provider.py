@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""Fast JSON serialization for the responses of BEL Commons.
+
+All responses made with :func:`flask.jsonify` go through :func:`dumps`, which uses :mod:`orjson` if it's installed
+and falls back to the standard library otherwise. Both handle:
+
+- PyBEL nodes and citations, which are dictionaries (:mod:`orjson` serializes subclasses of :class:`dict` natively)
+- numpy scalars and arrays, like the results of experiments and the betweenness centrality of nodes
+- dates and datetimes, in the same HTTP date format as Flask's own encoder
+- UUIDs, decimals, and dataclasses, like Flask's own encoder
+
+Responses from the API (routes starting with ``/api/``) are always compact. Other responses are indented if
+``JSONIFY_PRETTYPRINT_REGULAR`` is set or the app is in debug mode.
+
+Use :func:`init_json` to register it with the app. It sets :attr:`flask.Flask.json` to a
+:class:`BELCommonsJSONProvider` on Flask 2.2 and later, or :attr:`flask.Flask.json_encoder` to a
+:class:`BELCommonsJSONEncoder` on older versions.
+"""
+
+import dataclasses
+import datetime
+import decimal
+import json
+import uuid
+from typing import Any, Optional
+
+import numpy as np
+from flask import Flask, current_app, has_request_context, request
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional dependency
+    orjson = None
+
+try:
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:  # Flask<2.2
+    DefaultJSONProvider = None
+
+__all__ = [
+    'default',
+    'dumps',
+    'init_json',
+    'BELCommonsJSONEncoder',
+]
+
+#: The prefix of the routes whose responses are never indented
+API_PREFIX = '/api/'
+
+
+def default(o: Any) -> Any:
+    """Convert objects the JSON encoders don't handle natively."""
+    if isinstance(o, np.generic):
+        return o.item()
+
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+
+    if isinstance(o, datetime.date):
+        return http_date(o)
+
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+def dumps(value: Any, indent: Optional[int] = None, sort_keys: bool = False) -> str:
+    """Serialize the value as JSON with :mod:`orjson` if it's installed, or with the standard library otherwise.
+
+    :param value: The value to serialize
+    :param indent: If given, the output is indented, otherwise it's compact. :mod:`orjson` always indents with two
+     spaces.
+    :param sort_keys: Should the keys of dictionaries be sorted?
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(value, default=default, option=option).decode('utf-8')
+        except orjson.JSONEncodeError:
+            pass  # e.g., integers over 64 bits, which the standard library handles
+
+    return json.dumps(
+        value,
+        default=default,
+        indent=indent,
+        separators=(', ', ': ') if indent else (',', ':'),
+        sort_keys=sort_keys,
+        ensure_ascii=False,
+    )
+
+
+def _should_indent() -> bool:
+    """Check if a response should be indented."""
+    if has_request_context() and request.path.startswith(API_PREFIX):
+        return False
+    return bool(current_app.config.get('JSONIFY_PRETTYPRINT_REGULAR') or current_app.debug)
+
+
+class BELCommonsJSONEncoder(json.JSONEncoder):
+    """A JSON encoder for :attr:`flask.Flask.json_encoder` on Flask<2.2 that uses :func:`dumps`."""
+
+    def __init__(self, **kwargs) -> None:  # noqa: D107
+        if has_request_context() and request.path.startswith(API_PREFIX):
+            kwargs['indent'] = None
+            kwargs['separators'] = (',', ':')
+        super().__init__(**kwargs)
+
+    def default(self, o: Any) -> Any:  # noqa: D102
+        return default(o)
+
+    def encode(self, o: Any) -> str:  # noqa: D102
+        if self.skipkeys:  # only the standard library supports skipping keys
+            return super().encode(o)
+        return dumps(o, indent=self.indent, sort_keys=self.sort_keys)
+
+
+if DefaultJSONProvider is not None:
+    class BELCommonsJSONProvider(DefaultJSONProvider):
+        """A JSON provider for :attr:`flask.Flask.json` on Flask>=2.2 that uses :func:`dumps`."""
+
+        default = staticmethod(default)
+
+        def dumps(self, obj: Any, **kwargs) -> str:  # noqa: D102
+            if set(kwargs) <= {'indent', 'separators', 'sort_keys'}:
+                return dumps(obj, indent=kwargs.get('indent'), sort_keys=kwargs.get('sort_keys', self.sort_keys))
+            return super().dumps(obj, **kwargs)
+
+        def response(self, *args, **kwargs):  # noqa: D102
+            obj = self._prepare_response_obj(args, kwargs)
+            indent = 2 if _should_indent() else None
+            return self._app.response_class(
+                f'{dumps(obj, indent=indent, sort_keys=self.sort_keys)}\n',
+                mimetype=self.mimetype,
+            )
+
+    __all__.append('BELCommonsJSONProvider')
+
+
+def init_json(app: Flask) -> None:
+    """Use the fast JSON serialization for the app's responses."""
+    if DefaultJSONProvider is not None:
+        app.json = BELCommonsJSONProvider(app)
+        app.json.sort_keys = app.config.get('JSON_SORT_KEYS', app.json.sort_keys)
+    else:
+        app.json_encoder = BELCommonsJSONEncoder
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+"""Loader strategies for converting PyBEL's database models to JSON in a constant number of queries.
+
+By default, SQLAlchemy loads the relationships of each row the first time they're accessed, so converting a page of
+edges to JSON takes another query for the source and target of each edge, and another few for the evidence, citation,
+and authors of each one. These functions add loader options to queries that get all of them up front instead:
+many-to-one relationships are joined into the same query and collections are loaded with one extra ``SELECT ... IN``
+query each.
+"""
+
+from sqlalchemy.orm import Query, joinedload, selectinload
+
+from pybel.manager.models import Citation, Edge, Evidence
+
+__all__ = [
+    'load_edge_nodes',
+    'load_edge_evidences',
+    'load_citations',
+]
+
+
+def load_edge_nodes(edge_query: Query) -> Query:
+    """Eagerly load the sources and targets of edges, which are needed for :meth:`pybel.manager.models.Edge.to_json`.
+
+    This makes it take a single query.
+    """
+    return edge_query.options(
+        joinedload(Edge.source),
+        joinedload(Edge.target),
+    )
+
+
+def load_edge_evidences(edge_query: Query) -> Query:
+    """Eagerly load the evidences of edges along with their citations and the citations' authors.
+
+    This makes it take two queries, one more than :func:`load_edge_nodes`.
+    """
+    citation_loader = joinedload(Edge.evidence).joinedload(Evidence.citation)
+    return load_edge_nodes(edge_query).options(
+        citation_loader.joinedload(Citation.first),
+        citation_loader.joinedload(Citation.last),
+        citation_loader.selectinload(Citation.authors),
+    )
+
+
+def load_citations(citation_query: Query) -> Query:
+    """Eagerly load the authors of citations, which are needed for :meth:`pybel.manager.models.Citation.to_json`.
+
+    This makes it take two queries.
+    """
+    return citation_query.options(
+        joinedload(Citation.first),
+        joinedload(Citation.last),
+        selectinload(Citation.authors),
+    )
@@ -26,8 +26,9 @@ from .constants import SQLALCHEMY_DATABASE_URI
 from .core import manager
 from .explorer_toolbox import get_explorer_toolbox
 from .ext import bio2bel
+from .loaders import load_edge_evidences
 from .manager_utils import next_or_jsonify
-from .models import EdgeComment, EdgeVote, Experiment, Omic, Query, Report, User
+from .models import Experiment, Omic, Query, Report, User
 from .tools_compat import calculate_error_by_annotation, get_tools_version, summarize_completeness
 from .utils import SecurityConfigurableBlueprint as Blueprint, calculate_overlap_info
 from .version import get_version as get_bel_commons_version
@@ -85,8 +86,8 @@ def home():
             ('Citation', manager.count_citations(), url_for('.view_citations')),
             ('Evidence', manager.session.query(Evidence).count(), url_for('.view_evidences')),
             ('Assembly', manager.count_assemblies(), None),
-            ('Vote', manager.session.query(EdgeVote).count(), None),
-            ('Comment', manager.session.query(EdgeComment).count(), None),
+            ('Vote', manager.count_votes(), None),
+            ('Comment', manager.count_comments(), None),
         ]
         if 'analysis' in current_app.blueprints:
             hist.extend([
@@ -216,10 +217,10 @@ def view_relations(source_hash: str, target_hash: str):
     source = manager.get_node_by_hash_or_404(source_hash)
     target = manager.get_node_by_hash_or_404(target_hash)
 
-    edges = list(manager.query_edges(source=source, target=target))
+    edges = load_edge_evidences(manager.query_edges(source=source, target=target)).all()
 
     if 'undirected' in request.args:
-        edges.extend(manager.query_edges(source=target, target=source))
+        edges.extend(load_edge_evidences(manager.query_edges(source=target, target=source)))
 
     data = defaultdict(list)
     ev2cit = {}
@@ -249,6 +250,9 @@ def view_edges():
         flask.flash(f'Searched for "{search}"')
 
     count = edges.count()
+
+    if request.args.get('sort') == 'consensus':
+        edges = manager.sort_edges_by_consensus(edges)
     logger.info('found %d edges with %s', count, search)
 
     limit = request.args.get('limit', 10, type=int)
@@ -547,7 +551,7 @@ def view_summarize_biogrammar(network_id: int):
 def view_summarize_completeness(network_id: int):
     """Render a page with the summary of the completeness analysis of a BEL script."""
     network = manager.get_network_by_id(network_id)
-    graph = network.as_bel()
+    graph = manager.get_graph_by_id(network.id)
     entries = summarize_completeness(graph)
     return render_template(
         'network/summarize_completeness.html',
@@ -560,7 +564,7 @@ def view_summarize_completeness(network_id: int):
 def view_summarize_stratified(network_id: int, annotation: str):
     """Show stratified summary of graph's sub-graphs by annotation."""
     network = manager.cu_get_network_by_id_or_404(network_id)
-    graph = network.as_bel()
+    graph = manager.get_graph_by_id(network.id)
     graphs = get_subgraphs_by_annotation(graph, annotation)
 
     graph_summary = graph.summary_dict()
@@ -607,7 +611,7 @@ def view_network_comparison(network_1_id: int, network_2_id: int):
     """
     network_1 = manager.cu_get_network_by_id_or_404(network_1_id)
     network_2 = manager.cu_get_network_by_id_or_404(network_2_id)
-    data = calculate_overlap_info(network_1.as_bel(), network_2.as_bel())
+    data = calculate_overlap_info(manager.get_graph_by_id(network_1.id), manager.get_graph_by_id(network_2.id))
     return render_template(
         'network/network_comparison.html',
         network_1=network_1,
@@ -705,6 +709,7 @@ def freedom():
     """Do what is right and just - make all networks public."""
     for report in manager.session.query(Report).filter_by(public=False):
         report.public = True
+    manager.bump_permission_version()
     manager.session.commit()
     return redirect(url_for('.home'))
 
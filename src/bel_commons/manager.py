@@ -4,7 +4,6 @@
 
 import logging
 import time
-from functools import lru_cache
 from typing import Iterable, List, Optional, Union
 
 import networkx
@@ -15,10 +14,10 @@ from tqdm import tqdm
 import pybel.struct.query
 from pybel import BELGraph
 from pybel.manager.models import Author, Citation, Edge, Evidence, Namespace, Network, Node
-from .manager_base import WebManagerBase, iter_recent_public_networks, iter_unique_networks
+from .graph_snapshot import GraphSnapshot
+from .manager_base import WebManagerBase
 from .manager_utils import fill_out_report
 from .models import Experiment, Project, Query, Report, User, UserQuery
-from .tools_compat import BELGraphSummary
 from .utils import return_or_404
 
 __all__ = [
@@ -154,18 +153,13 @@ class _WebManager(WebManagerBase):
 
         abort(403, f'{user} does not have access to network {network_id} ')
 
-    @lru_cache(maxsize=256)
     def authenticated_query_from_network_by_id_or_404(self, user: User, network_id: int) -> Query:
-        """Make a query from the given network."""
+        """Get the query for the given network, and build it if it doesn't exist yet."""
         network = self.authenticated_get_network_by_id_or_404(user=user, network_id=network_id)
 
+        rv = self.get_or_create_query([network])
         if isinstance(user, User):
-            user_query = UserQuery.from_network(network, user=user if isinstance(user, User) else None)
-            self.session.add(user_query)
-            rv = user_query.query
-        else:
-            rv = Query.from_network(network)
-            self.session.add(rv)
+            self.get_or_create_user_query(query=rv, user=user)
 
         self.session.commit()
 
@@ -174,7 +168,7 @@ class _WebManager(WebManagerBase):
     def authenticated_get_graph_by_id_or_404(self, user: User, network_id: int) -> BELGraph:
         """Get the network as a BEL graph or aborts if the user does not have permission to view."""
         network = self.authenticated_get_network_by_id_or_404(user=user, network_id=network_id)
-        return network.as_bel()
+        return self.get_graph_by_id(network.id)
 
     def owner_get_network_by_id_or_404(self, user: User, network_id: int) -> Network:
         """Get a network and abort if the user does not have super rights.
@@ -189,12 +183,18 @@ class _WebManager(WebManagerBase):
         abort(403, f'User {user} does own to network {network_id}')
 
     def authenticated_render_network_summary(self, user: User, network: Network, template: str) -> Response:
-        """Render the graph summary page."""
-        graph = network.as_bel()
+        """Render the graph summary page.
+
+        The page is rendered from the summaries stored in the network's report, so the graph is only deserialized
+        once for reports from before the summary of the document was stored. The overlaps with other networks are
+        loaded by the page afterwards from :func:`bel_commons.database_service.get_network_overlaps`.
+        """
         report: Report = network.report
-        context: BELGraphSummary = report.get_calculations()
+        context, document = report.get_calculations_and_document_summary()
+        if document is None:
+            document = report.add_document_summary(self.get_graph_by_id(network.id))
+            self.session.commit()
 
-        overlaps = self.get_top_overlaps(user=user, network=network)
         network_versions = self.get_networks_by_name(network.name)
 
         return render_template(
@@ -202,9 +202,11 @@ class _WebManager(WebManagerBase):
             blueprints=set(current_app.blueprints),
             current_user=user,
             network=network,
-            graph=graph,
+            document=document,
             network_versions=network_versions,
-            overlaps=overlaps,
+            unused_namespaces=document.unused_namespaces,
+            unused_annotations=document.unused_annotations,
+            unused_list_annotation_values=document.unused_list_annotation_values,
             chart_1_data=context.prepare_c3_for_function_count(),
             chart_2_data=context.prepare_c3_for_relation_count(),
             chart_3_data=context.prepare_c3_for_error_count(),
@@ -270,10 +272,12 @@ class _WebManager(WebManagerBase):
         if not any(network.id not in permissive_network_ids for network in query.assembly.networks):
             return query
 
-    @lru_cache(maxsize=256)
     def authenticated_get_graph_from_query_id_or_404(self, user: User, query_id: int) -> BELGraph:
         """Process the GET request returning the filtered network.
 
+        The result is looked up in the graph cache by the content of the query, so it is shared between all workers
+        and all identical queries.
+
         :raises: werkzeug.exceptions.HTTPException
         """
         logger.debug(f'getting query [id={query_id}] from database')
@@ -284,7 +288,7 @@ class _WebManager(WebManagerBase):
         logger.debug(f'running query [id={query_id}]')
         t = time.time()
         try:
-            result = query.run(self)
+            result = self.get_graph_from_query(query)
             logger.debug(f'ran query [id={query_id}] in {time.time() - t:.2f} seconds')
         except networkx.exception.NetworkXError as e:
             logger.warning(f'query [id={query_id}] failed after {time.time() - t:.2f} seconds')
@@ -292,6 +296,14 @@ class _WebManager(WebManagerBase):
 
         return result
 
+    def authenticated_get_snapshot_from_query_id_or_404(self, user: User, query_id: int) -> Optional[GraphSnapshot]:
+        """Get a compact snapshot of the result of the query for read-only analyses.
+
+        :raises: werkzeug.exceptions.HTTPException
+        """
+        query = self.authenticated_get_query_by_id_or_404(user=user, query_id=query_id)
+        return self.get_snapshot_from_query(query)
+
     def get_node_by_hash_or_404(self, node_hash: str) -> Node:
         """Get a node if it exists or send a 404.
 
@@ -380,6 +392,10 @@ class WebManager(_WebManager):
         """Get a BEL graph from the query or 404 if it doesn't exist while authenticated as the current user."""
         return self.authenticated_get_graph_from_query_id_or_404(user=current_user, query_id=query_id)
 
+    def cu_get_snapshot_from_query_id_or_404(self, query_id: int) -> Optional[GraphSnapshot]:
+        """Get a snapshot of a query's result or 404 if it doesn't exist while authenticated as the current user."""
+        return self.authenticated_get_snapshot_from_query_id_or_404(user=current_user, query_id=query_id)
+
     def cu_authenticated_get_project_by_id_or_404(self, project_id: int) -> Project:
         """Get a project or 404 if it doesn't exist while authenticated as the current user."""
         return self.authenticated_get_project_by_id_or_404(user=current_user, project_id=project_id)
@@ -393,13 +409,7 @@ class WebManager(_WebManager):
 
         :return: A list of all networks tagged as public or uploaded by the current user
         """
-        if not user.is_authenticated:
-            return list(iter_recent_public_networks(self))
-
-        if user.is_admin:
-            return self.list_recent_networks()
-
-        return list(iter_unique_networks(self.iter_networks_with_permission(user)))
+        return self.iter_networks_with_permission(user).all()
 
     # FIXME needs more logic for what logged in users/admins/anonymous users see
     def list_queries(self) -> List[Query]:
@@ -413,24 +423,25 @@ class WebManager(_WebManager):
         return q.all()
 
     def build_query(self, q: pybel.struct.query.Query) -> Query:
-        """Build a query model from a PyBEL query."""
+        """Build a query model from a PyBEL query, or get it if an identical one already exists."""
+        rv = self.get_or_create_query(
+            networks=self.get_networks_by_ids(q.network_ids),
+            seeding=q.seeding.dumps(),
+            pipeline=q.pipeline.dumps(),
+        )
         if isinstance(current_user, User):
-            user_query = UserQuery.from_query(manager=self, query=q, user=current_user)
-            self.session.add(user_query)
-            rv = user_query.query
-        else:
-            rv = Query.from_query(manager=self, query=q)
-            self.session.add(rv)
+            self.get_or_create_user_query(query=rv, user=current_user)
         self.session.commit()
         return rv
 
     def build_query_from_project(self, project: Project) -> Query:
-        """Build a query from a project."""
-        user_query = UserQuery.from_project(project=project, user=current_user)
-        user_query.query.assembly.name = f'{time.asctime()} query of {project.name}'
-        self.session.add(user_query)
+        """Build a query from a project, or get it if one already exists for the project's networks."""
+        rv = self.get_or_create_query(networks=project.networks)
+        if rv.assembly.name is None:
+            rv.assembly.name = f'{time.asctime()} query of {project.name}'
+        self.get_or_create_user_query(query=rv, user=current_user)
         self.session.commit()
-        return user_query.query
+        return rv
 
     def build_query_from_node(self, node: Node) -> Query:
         """Build a query from a node model."""
@@ -458,6 +469,7 @@ class WebManager(_WebManager):
             fill_out_report(network=network, report=report)
             self.session.add(report)
 
+        self.bump_permission_version()
         self.session.commit()
 
     def _iter_unreported_networks(self) -> Iterable[Network]:
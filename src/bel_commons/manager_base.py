@@ -5,21 +5,36 @@
 import datetime
 import itertools as itt
 import logging
+import threading
 import time
-from collections import defaultdict
-from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+from collections import OrderedDict, defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
 
+import numpy as np
 import werkzeug.datastructures
 from flask_security import SQLAlchemyUserDatastore
-from sqlalchemy import and_, func
-
-from pybel import Manager
-from pybel.manager.models import Edge, Namespace, Network
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query as SQLAlchemyQuery, Session, joinedload
+
+from pybel import BELGraph, Manager, union
+from pybel.manager.models import Edge, Evidence, Namespace, Network, edge_annotation, network_edge, network_node
+from pybel.struct.pipeline import Pipeline
+from pybel.struct.pipeline.decorators import universe_map
+from .artifacts import Artifact, ArtifactStore
 from .constants import AND
+from .graph_cache import GraphCache
+from .graph_snapshot import GraphSnapshot
+from .minhash import (
+    CONTAINMENT_SIZE_RATIO, estimate_overlap, get_buckets, get_containment_buckets, get_signature, signature_to_bytes,
+)
 from .models import (
-    Assembly, EdgeComment, EdgeVote, Experiment, NetworkOverlap, Omic, Project, Query, Report, Role,
-    User,
+    Assembly, CacheVersion, EdgeComment, EdgeFeedback, EdgeVote, Experiment, NetworkContents, NetworkOverlap,
+    NetworkSketch, NetworkSketchBucket, Omic, Project, Query, Report, Role, User, UserQuery,
+    network_contents_annotation, network_contents_citation, projects_networks, projects_users, users_networks,
 )
+from .overlaps import Incidence, build_incidence, calculate_network_overlaps, calculate_overlaps
+from .send_utils import CanonicalStrings, EXPORT_FILE_TYPES, iter_network_bytes
 from .tools_compat import min_tanimoto_set_similarity
 
 __all__ = [
@@ -30,6 +45,11 @@ __all__ = [
 
 logger = logging.getLogger(__name__)
 
+#: The name of the version of the rights to networks
+PERMISSION_VERSION = 'permissions'
+#: The name of the version of the overlaps between networks
+OVERLAP_VERSION = 'overlaps'
+
 
 def sanitize_annotation(annotation_list: List[str]) -> Mapping[str, List[str]]:
     """Convert an annotation (annotation:value) to tuple."""
@@ -42,6 +62,13 @@ def sanitize_annotation(annotation_list: List[str]) -> Mapping[str, List[str]]:
     return dict(annotation_dict)
 
 
+def _count_vote(agreed: Optional[bool]) -> Tuple[int, int]:
+    """Get the number of votes up and down that a vote adds to the counts on its edge."""
+    if agreed is None:
+        return 0, 0
+    return (1, 0) if agreed else (0, 1)
+
+
 def iter_unique_networks(networks: Iterable[Network]) -> Iterable[Network]:
     """Yield only unique networks from an iterator."""
     seen_ids = set()
@@ -60,41 +87,461 @@ def to_snake_case(function_name: str) -> str:
     return function_name.replace(" ", "_").lower()
 
 
+#: The maximum number of identifiers in an ``IN`` clause, which is limited by some databases like SQLite
+_MAX_IN_CLAUSE = 500
+
+#: The number of users whose sets of networks they have rights to are cached in each process
+_PERMISSION_CACHE_SIZE = 1024
+
+#: The number of times to try replacing the cached overlaps of networks while requests are caching them too
+_REPLACE_OVERLAPS_TRIES = 3
+
+#: The smallest overlap estimated from MinHash signatures for which the exact overlap with a network is calculated
+_MIN_ESTIMATED_OVERLAP = 0.1
+
+
+def _iter_id_chunks(models: Iterable) -> Iterable[List[int]]:
+    """Split the database identifiers of the models into chunks that fit in an ``IN`` clause."""
+    ids = [model.id for model in models]
+    for start in range(0, len(ids), _MAX_IN_CLAUSE):
+        yield ids[start:start + _MAX_IN_CLAUSE]
+
+
 class PyBELSQLAlchemyUserDataStore(SQLAlchemyUserDatastore):
-    """Wraps :class:`flask_security.SQLAlchemyUserDatastore` with the BEL Commons User and Role models."""
+    """Wraps :class:`flask_security.SQLAlchemyUserDatastore` with the BEL Commons User and Role models.
 
-    def __init__(self, db) -> None:  # noqa:D107
+    Roles grant rights to networks, so changing them bumps the version of the rights to networks.
+    """
+
+    def __init__(self, db: 'WebManagerBase') -> None:  # noqa:D107
         super().__init__(db=db, user_model=User, role_model=Role)
 
+    def add_role_to_user(self, *args, **kwargs) -> bool:  # noqa: D102
+        rv = super().add_role_to_user(*args, **kwargs)
+        if rv:
+            self.db.bump_permission_version()
+        return rv
+
+    def remove_role_from_user(self, *args, **kwargs) -> bool:  # noqa: D102
+        rv = super().remove_role_from_user(*args, **kwargs)
+        if rv:
+            self.db.bump_permission_version()
+        return rv
+
 
 class WebManagerBase(Manager):
     """Extensions to the PyBEL manager and :class:`SQLAlchemyUserDataStore` to support PyBEL-Web."""
 
-    def __init__(self, *args, **kwargs) -> None:  # noqa:D107
+    def __init__(  # noqa:D107
+        self,
+        *args,
+        graph_cache: Optional[GraphCache] = None,
+        artifact_store: Optional[ArtifactStore] = None,
+        **kwargs
+    ) -> None:
         super().__init__(*args, **kwargs)
         self.user_datastore = PyBELSQLAlchemyUserDataStore(self)
+        self.graph_cache = graph_cache if graph_cache is not None else GraphCache()
+        self.artifact_store = artifact_store
+        self._permission_cache: Dict[Optional[int], Tuple[int, FrozenSet[int]]] = OrderedDict()
+        self._permission_cache_lock = threading.Lock()
 
     def iter_networks_with_permission(self, user: User) -> Iterable[Network]:
-        """Get an iterator over all the networks from all the sources."""
+        """Get an iterator over all the networks the user has permission to see."""
+        logger.debug(f'getting all networks for user [{user}]')
+        return self.session.query(Network).filter(Network.id.in_(self._query_network_ids_with_permission(user)))
+
+    def get_network_ids_with_permission(self, user: User) -> FrozenSet[int]:
+        """Get the set of identifiers of networks tagged as public or that the user has rights to.
+
+        The set is cached for each user until the rights to networks change, as tracked by
+        :meth:`bump_permission_version`. Only the sets of the :data:`_PERMISSION_CACHE_SIZE` most recently seen users
+        are kept.
+        """
+        key = user.id if user.is_authenticated else None
+        # read the version before the rights so a change committed in between can't be cached under the new version
+        version = self.get_permission_version()
+
+        with self._permission_cache_lock:
+            cached = self._permission_cache.get(key)
+            if cached is not None and cached[0] == version:
+                self._permission_cache.move_to_end(key)
+                return cached[1]
+
+        network_ids = frozenset(network_id for network_id, in self._query_network_ids_with_permission(user))
+
+        with self._permission_cache_lock:
+            self._permission_cache[key] = version, network_ids
+            self._permission_cache.move_to_end(key)
+            while _PERMISSION_CACHE_SIZE < len(self._permission_cache):
+                self._permission_cache.popitem(last=False)
+
+        return network_ids
+
+    def _query_network_ids_with_permission(self, user: User) -> SQLAlchemyQuery:
+        """Build a query for the identifiers of the networks the user has rights to.
+
+        - Anonymous users have rights to the recent networks that are public
+        - Administrators have rights to all recent networks
+        - Other users also have rights to all networks they own, that have been shared with them, or that have been
+          shared with their projects
+        """
         if not user.is_authenticated:
-            logger.debug('getting only public networks for anonymous user')
-            yield from iter_recent_public_networks(self)
+            return _query_recent_public_network_ids(self.session)
+
+        if user.is_admin:
+            return _query_recent_network_ids(self.session)
+
+        owned = self.session. \
+            query(Report.network_id). \
+            filter(Report.user_id == user.id, Report.network_id.isnot(None))
+        shared = self.session. \
+            query(users_networks.c.network_id). \
+            filter(users_networks.c.user_id == user.id)
+        project = self.session. \
+            query(projects_networks.c.network_id). \
+            join(projects_users, projects_users.c.project_id == projects_networks.c.project_id). \
+            filter(projects_users.c.user_id == user.id)
+
+        return owned.union(shared, project, _query_recent_public_network_ids(self.session))
+
+    def get_cache_version(self, name: str) -> int:
+        """Get the version of the cached data with the given name."""
+        return self.session.query(CacheVersion.version).filter(CacheVersion.name == name).scalar() or 0
+
+    def bump_cache_version(self, name: str) -> None:
+        """Increment the version of the cached data with the given name, without committing."""
+        updated = self.session. \
+            query(CacheVersion). \
+            filter(CacheVersion.name == name). \
+            update({CacheVersion.version: CacheVersion.version + 1}, synchronize_session=False)
+
+        if not updated:
+            self.session.add(CacheVersion(name=name, version=1))
+
+    def get_permission_version(self) -> int:
+        """Get the version of the rights to networks."""
+        return self.get_cache_version(PERMISSION_VERSION)
+
+    def bump_permission_version(self) -> None:
+        """Increment the version of the rights to networks, without committing.
+
+        This has to be called in the same transaction as every change to which networks users have rights to, or after
+        it's committed, so the cached sets from :meth:`get_network_ids_with_permission` are recalculated.
+        """
+        self.bump_cache_version(PERMISSION_VERSION)
+
+    def get_overlap_version(self) -> int:
+        """Get the version of the overlaps between networks."""
+        return self.get_cache_version(OVERLAP_VERSION)
+
+    def bump_overlap_version(self) -> None:
+        """Increment the version of the overlaps between networks, without committing.
+
+        This has to be called every time networks or their overlaps are added or removed, so the cached overview of
+        the overlaps of all networks from :meth:`get_network_overview` is recalculated.
+        """
+        self.bump_cache_version(OVERLAP_VERSION)
+
+    def insert_graph(self, graph: BELGraph, **kwargs) -> Network:
+        """Insert a graph, index it, and bump the versions of the rights to and overlaps of networks.
+
+        It's added to the LSH index and its citations and annotations are listed for pagination.
+
+        The versions are bumped since it might be the most recent version of the network.
+        """
+        network = super().insert_graph(graph, **kwargs)
+        self.add_network_sketches([network])
+        self.add_network_contents([network])
+        self.bump_permission_version()
+        self.bump_overlap_version()
+        self.session.commit()
+        return network
+
+    def drop_network(self, network: Network) -> None:
+        """Drop a network, invalidate all cached graphs that were built from it, and remove its exports."""
+        self.graph_cache.invalidate_network(network.id)
+        if self.artifact_store is not None:
+            self.artifact_store.remove_network(network.id)
+        self.bump_permission_version()
+        self.bump_overlap_version()
+        # the network is deleted in bulk, so its indexes and overlaps aren't deleted through the relationships
+        self.session.query(NetworkSketchBucket).filter(NetworkSketchBucket.network_id == network.id).delete()
+        self.session.query(NetworkSketch).filter(NetworkSketch.network_id == network.id).delete()
+        for table in (network_contents_citation, network_contents_annotation):
+            self.session.execute(table.delete().where(table.c.network_id == network.id))
+        self.session.query(NetworkContents).filter(NetworkContents.network_id == network.id).delete()
+        self.session. \
+            query(NetworkOverlap). \
+            filter(or_(NetworkOverlap.left_id == network.id, NetworkOverlap.right_id == network.id)). \
+            delete(synchronize_session=False)
+        super().drop_network(network)
+
+    def get_network_artifact(self, network: Network, serve_format: str) -> Optional[Artifact]:
+        """Get the export of a network in the given format, rendering and storing it if it hasn't been yet.
+
+        Returns none if there's no artifact store, in which case exports have to be rendered for each request.
+
+        :raises TypeError: If the format isn't in :data:`bel_commons.send_utils.EXPORT_FILE_TYPES`
+        """
+        if serve_format not in EXPORT_FILE_TYPES:
+            raise TypeError(f'unhandled serve_format: {serve_format}')
+
+        if self.artifact_store is None:
+            return None
+
+        def render():
+            mimetype, suffix = EXPORT_FILE_TYPES[serve_format]
+            filename = None if suffix is None else f'{network.name}{suffix}'
+            graph = self.get_graph_by_id(network.id)
+            return iter_network_bytes(graph, serve_format=serve_format), mimetype, filename
+
+        version = self.graph_cache.get_network_generation(network.id)
+        return self.artifact_store.get_or_render(network.id, version, serve_format, render)
+
+    def get_graph_by_id(self, network_id: int) -> BELGraph:
+        """Get a network as a BEL graph, from the graph cache if it has already been loaded.
+
+        Concurrent requests for the same network wait for the first one to load it instead of loading it again.
+        """
+        key = self.graph_cache.get_network_key(network_id)
+        return self.graph_cache.get_or_build_graph(key, lambda: super(WebManagerBase, self).get_graph_by_id(network_id))
+
+    def get_graph_by_ids(self, network_ids: List[int]) -> BELGraph:
+        """Get the union of the given networks, from the graph cache if it has already been built.
 
-        elif user.is_admin:
-            logger.debug('getting all recent networks for admin')
-            yield from self.list_recent_networks()
+        This is also used by :meth:`pybel.struct.query.Query.run` to build the universe of a query.
+        """
+        network_ids = sorted(set(network_ids))
+        if len(network_ids) == 1:
+            return self.get_graph_by_id(network_ids[0])
+
+        key = self.graph_cache.get_universe_key(network_ids)
+        return self.graph_cache.get_or_build_graph(key, lambda: union(
+            self.get_graph_by_id(network_id)
+            for network_id in network_ids
+        ))
+
+    def get_graph_from_query(self, query: Query) -> Optional[BELGraph]:
+        """Run the query, resuming from the longest prefix of its pipeline whose result is in the graph cache.
+
+        The seeded graph and the graph after each pipeline step are stored in the graph cache, so other queries that
+        share the same assembly, seeding, and first pipeline steps (e.g., the queries derived from this one with
+        :meth:`Query.build_appended`) don't have to run them again. Concurrent requests for the same query wait for
+        the first one to finish instead of running it again.
+        """
+        keys = self.graph_cache.get_query_prefix_keys(query)
+
+        graph = self.graph_cache.get_graph(keys[-1])
+        if graph is not None:
+            self.graph_cache.count_checkpoint(len(keys) - 1, hit=True)
+            return graph
+
+        return self.graph_cache.get_or_build_graph(keys[-1], lambda: self._run_query(query, keys))
+
+    def get_snapshot_from_query(self, query: Query) -> Optional[GraphSnapshot]:
+        """Get a compact snapshot of the result of the query, from the graph cache if it has already been built."""
+        def build() -> Optional[GraphSnapshot]:
+            graph = self.get_graph_from_query(query)
+            if graph is None:
+                return None
+            return GraphSnapshot.from_graph(graph)
+
+        return self.graph_cache.get_or_build_snapshot(self.graph_cache.get_snapshot_key(query), build)
 
+    def get_canonical_strings_from_query(self, query: Query) -> CanonicalStrings:
+        """Get a memo of the BEL strings of the nodes in the result of the query with the ones stored in the cache."""
+        return CanonicalStrings(self.graph_cache.get_object(self.graph_cache.get_canonical_strings_key(query)))
+
+    def set_canonical_strings_from_query(self, query: Query, canonical: CanonicalStrings) -> None:
+        """Store the memo of the BEL strings of the nodes in the result of the query, if any were added to it."""
+        if canonical.changed:
+            self.graph_cache.set_object(self.graph_cache.get_canonical_strings_key(query), canonical.bels)
+
+    def get_betweenness_centrality_from_query(self, query: Query, error: float) -> Optional[np.ndarray]:
+        """Get the betweenness centrality of each node in the snapshot of the result of the query.
+
+        It's cached along with the result of the query, so it's only calculated once for each error.
+
+        :param query: A query
+        :param error: The maximum absolute error of the estimated betweenness centrality of any node. If zero, the
+         exact betweenness centrality is calculated.
+        """
+        def build() -> Optional[np.ndarray]:
+            snapshot = self.get_snapshot_from_query(query)
+            if snapshot is None:
+                return None
+            return snapshot.get_approximate_betweenness_centrality(error, seed=query.id)
+
+        key = self.graph_cache.get_betweenness_centrality_key(query, error)
+        return self.graph_cache.get_or_build_object(key, build)
+
+    def get_cached_betweenness_centrality_from_query(self, query: Query, error: float) -> Optional[np.ndarray]:
+        """Get the betweenness centrality of each node in the result of the query, if it's been calculated already."""
+        return self.graph_cache.get_object(self.graph_cache.get_betweenness_centrality_key(query, error))
+
+    def set_betweenness_centrality_from_query(
+        self,
+        query: Query,
+        error: float,
+        centralities: Sequence[float],
+        digest: str,
+    ) -> Optional[np.ndarray]:
+        """Store the betweenness centrality of each node in the result of the query, like it's calculated by celery.
+
+        :param query: A query
+        :param error: The maximum absolute error of the estimated betweenness centrality of any node
+        :param centralities: The betweenness centrality of each node, in the order of the snapshot it was calculated on
+        :param digest: The digest of the snapshot it was calculated on, from :meth:`GraphSnapshot.get_digest`
+        :return: The betweenness centrality, or none if the snapshot it was calculated on has its nodes in another
+         order than the one of this process, e.g., because it was built by a worker on another host
+        """
+        snapshot = self.get_snapshot_from_query(query)
+        if snapshot is None or snapshot.get_digest() != digest:
+            return None
+
+        betweenness = np.array(centralities, dtype=float)
+        self.graph_cache.set_object(self.graph_cache.get_betweenness_centrality_key(query, error), betweenness)
+        return betweenness
+
+    def _run_query(self, query: Query, keys: List[str]) -> Optional[BELGraph]:
+        """Run the query and store a checkpoint after each of its intermediate pipeline steps.
+
+        The steps are applied one at a time to a single working copy of the graph, with the universe passed in
+        explicitly, so storing a checkpoint after each step doesn't copy the graph for each step.
+
+        :param query: The query to run
+        :param keys: The keys of the query's pipeline prefixes, from :meth:`GraphCache.get_query_prefix_keys`
+        """
+        pipeline = query.get_pipeline()
+        protocol = pipeline.protocol if pipeline is not None else []
+
+        universe = None
+        graph, start = self._get_longest_cached_prefix(keys)
+        if graph is not None:
+            logger.debug('resuming query [id=%s] after %d/%d pipeline steps', query.id, start, len(protocol))
+            self.graph_cache.count_checkpoint(start, hit=True)
         else:
-            logger.debug(f'getting all networks for user [{user}]')
-            yield from user.iter_available_networks()
-            yield from iter_recent_public_networks(self)
-
-    def get_network_ids_with_permission(self, user: User) -> Set[int]:
-        """Get the set of networks ids tagged as public or uploaded by the user."""
-        return {
-            network.id
-            for network in self.iter_networks_with_permission(user)
-        }
+            universe = self.get_graph_by_ids(query.network_ids)
+            seeding = query.get_seeding()
+            if seeding is None:
+                if not protocol:  # the universe is the result, which is stored by the caller
+                    self.graph_cache.count_checkpoint(0, hit=False)
+                    return universe
+                graph = universe.copy()  # the pipeline mustn't change the universe
+            else:
+                graph = seeding.run(universe)
+                if graph is None:
+                    return None
+                if protocol:  # the final result is stored by the caller
+                    self.graph_cache.set_graph(keys[0], graph)
+                self.graph_cache.count_checkpoint(0, hit=False)
+
+        if start == len(protocol):
+            return graph
+
+        # the graph is either unpickled from the cache or built above, so the steps can change it in place
+        pipeline = Pipeline(protocol)
+        pipeline.universe = universe
+        for steps, entry in enumerate(protocol[start:], start=start + 1):
+            if pipeline.universe is None and ('meta' in entry or entry['function'] in universe_map):
+                pipeline.universe = self.get_graph_by_ids(query.network_ids)
+            graph = pipeline._run_helper(graph, [entry])
+            if steps < len(protocol):
+                self.graph_cache.set_graph(keys[steps], graph)
+            self.graph_cache.count_checkpoint(steps, hit=False)
+
+        return graph
+
+    def _get_longest_cached_prefix(self, keys: List[str]) -> Tuple[Optional[BELGraph], int]:
+        """Get the graph for the last of the given pipeline prefix keys that is in the graph cache and its position."""
+        for steps in reversed(range(len(keys))):
+            graph = self.graph_cache.get_graph(keys[steps])
+            if graph is not None:
+                return graph, steps
+        return None, 0
+
+    def get_assembly_by_md5(self, md5: str) -> Optional[Assembly]:
+        """Get the oldest assembly with the given hash of its networks' identifiers, if it exists."""
+        return self.session.query(Assembly).filter(Assembly.md5 == md5).order_by(Assembly.id).first()
+
+    def get_or_create_assembly(self, networks: List[Network]) -> Assembly:
+        """Get the assembly of the given networks, or build a new one if it doesn't exist.
+
+        The new assembly is flushed in a savepoint, so if it fails only the savepoint is rolled back and not the rest
+        of the session.
+        """
+        md5 = Assembly.get_network_list_md5(networks)
+        assembly = self.get_assembly_by_md5(md5)
+        if assembly is not None:
+            return assembly
+
+        try:
+            with self.session.begin_nested():
+                assembly = Assembly.from_networks(networks)
+                self.session.add(assembly)
+        except IntegrityError:  # another worker built the same assembly in the meantime
+            return self.get_assembly_by_md5(md5)
+
+        return assembly
+
+    def get_query_by_canonical_hash(self, canonical_hash: str) -> Optional[Query]:
+        """Get the shared query with the given canonical hash, if it exists."""
+        return self.session.query(Query).filter(Query.canonical_hash == canonical_hash).one_or_none()
+
+    def get_or_create_query(
+        self,
+        networks: List[Network],
+        seeding: Optional[str] = None,
+        pipeline: Optional[str] = None,
+    ) -> Query:
+        """Get the shared query with the given content, or build a new one if it doesn't exist.
+
+        The new query is flushed in a savepoint, so if another worker built the same query in the meantime only the
+        savepoint is rolled back and the caller's pending changes are kept.
+
+        :param networks: The networks in the query's assembly
+        :param seeding: The stringified seeding
+        :param pipeline: The stringified pipeline
+        """
+        canonical_hash = Query.build_canonical_hash(Assembly.get_network_list_md5(networks), seeding, pipeline)
+        query = self.get_query_by_canonical_hash(canonical_hash)
+        if query is not None:
+            return query
+
+        try:
+            with self.session.begin_nested():
+                query = Query(
+                    assembly=self.get_or_create_assembly(networks),
+                    seeding=seeding,
+                    pipeline=pipeline,
+                    canonical_hash=canonical_hash,
+                )
+                self.session.add(query)
+        except IntegrityError:  # another worker built the same query in the meantime
+            return self.get_query_by_canonical_hash(canonical_hash)
+
+        return query
+
+    def get_or_create_user_query(self, query: Query, user: User) -> UserQuery:
+        """Record that the given user ran the given query.
+
+        If it's already recorded, its time is updated so the query moves to the top of the user's recent queries.
+        """
+        user_query = query.user_queries.filter(UserQuery.user_id == user.id).one_or_none()
+
+        if user_query is None:
+            try:
+                with self.session.begin_nested():
+                    user_query = UserQuery(query=query, user=user)
+                    self.session.add(user_query)
+            except IntegrityError:  # the same user ran the same query in another request in the meantime
+                user_query = query.user_queries.filter(UserQuery.user_id == user.id).one()
+            else:
+                return user_query
+
+        user_query.created = datetime.datetime.utcnow()
+        return user_query
 
     def get_project_by_id(self, project_id) -> Optional[Project]:
         """Get a project by its database identifier, if it exists."""
@@ -136,15 +583,61 @@ class WebManagerBase(Manager):
         """Count the assemblies in the database."""
         return self._count_model(Assembly)
 
+    def count_votes(self) -> int:
+        """Count the votes in the database that agree or disagree with an edge.
+
+        This sums the counts kept for each edge instead of counting the votes themselves, so it reads one row for each
+        edge with feedback rather than one for each vote.
+        """
+        return self._sum_edge_feedback(EdgeFeedback.up + EdgeFeedback.down)
+
+    def count_comments(self) -> int:
+        """Count the comments in the database.
+
+        This sums the counts kept for each edge instead of counting the comments themselves, so it reads one row for
+        each edge with feedback rather than one for each comment.
+        """
+        return self._sum_edge_feedback(EdgeFeedback.comments)
+
+    def _sum_edge_feedback(self, column) -> int:
+        return self.session.query(func.coalesce(func.sum(column), 0)).scalar()
+
     def get_namespace_by_id(self, namespace_id) -> Optional[Namespace]:
         """Get a namespace by its identifier, if it exists."""
         return self.session.query(Namespace).get(namespace_id)
 
-    def drop_queries_by_user_id(self, user_id: int) -> None:  # FIXME
-        """Drop queries associated with the given user."""
-        self.session.query(Query).filter(Query.user_id == user_id).delete()
+    def drop_query_by_user_id(self, query: Query, user_id: Optional[int] = None) -> None:
+        """Drop the ownership of the query by the given user, then the query itself if no other users own it.
+
+        :param query: The query to drop
+        :param user_id: The database identifier of the user. If none, the query is dropped for all users.
+        """
+        user_queries = self.session.query(UserQuery).filter(UserQuery.query_id == query.id)
+        if user_id is not None:
+            user_queries = user_queries.filter(UserQuery.user_id == user_id)
+        user_queries.delete()
+
+        self._drop_unowned_queries([query.id])
         self.session.commit()
 
+    def drop_queries_by_user_id(self, user_id: int) -> None:
+        """Drop the ownership of all queries by the given user, then the queries that no other users own."""
+        user_queries = self.session.query(UserQuery).filter(UserQuery.user_id == user_id)
+        query_ids = [user_query.query_id for user_query in user_queries]
+        user_queries.delete()
+
+        self._drop_unowned_queries(query_ids)
+        self.session.commit()
+
+    def _drop_unowned_queries(self, query_ids: List[int]) -> None:
+        """Drop the given queries if no users own them."""
+        if not query_ids:
+            return
+
+        queries = self.session.query(Query).filter(Query.id.in_(query_ids), ~Query.user_queries.any())
+        for query in queries:  # deleted one by one so they cascade to their children
+            self.session.delete(query)
+
     def _network_has_permission(self, user: User, network_id: int) -> bool:
         return network_id in self.get_network_ids_with_permission(user)
 
@@ -160,6 +653,8 @@ class WebManagerBase(Manager):
     def get_or_create_vote(self, edge: Edge, user: User, agreed: Optional[bool] = None) -> EdgeVote:
         """Get a vote for the given edge and user.
 
+        The counts of votes on the edge are updated in the same transaction.
+
         :param edge: The edge that is being evaluated
         :param user: The user making the vote
         :param agreed: Optional value of agreement to put into vote
@@ -173,51 +668,201 @@ class WebManagerBase(Manager):
                 agreed=agreed,
             )
             self.session.add(vote)
+            up, down = _count_vote(agreed)
+            self._update_edge_feedback(edge, up=up, down=down)
             self.session.commit()
 
         # If there was already a vote, and it's being changed
         elif agreed is not None:
+            old_up, old_down = _count_vote(vote.agreed)
+            new_up, new_down = _count_vote(agreed)
+            self._update_edge_feedback(edge, up=new_up - old_up, down=new_down - old_down)
             vote.agreed = agreed
             vote.changed = datetime.datetime.utcnow()
             self.session.commit()
 
         return vote
 
+    def create_edge_comment(self, edge: Edge, user: User, comment: str) -> EdgeComment:
+        """Make a comment on the given edge.
+
+        The count of comments on the edge is updated in the same transaction.
+
+        :param edge: The edge that is being commented on
+        :param user: The user making the comment
+        :param comment: The text of the comment
+        """
+        edge_comment = EdgeComment(
+            edge=edge,
+            user=user,
+            comment=comment,
+        )
+        self.session.add(edge_comment)
+        self._update_edge_feedback(edge, comments=1)
+        self.session.commit()
+        return edge_comment
+
+    def uncount_edge_vote(self, vote: EdgeVote) -> None:
+        """Remove a vote that's being deleted from the counts of votes on its edge, without committing."""
+        if vote.edge is None or vote.agreed is None:
+            return
+        self._increment_edge_feedback(vote.edge, up=-1 if vote.agreed else 0, down=0 if vote.agreed else -1, comments=0)
+
+    def uncount_edge_comment(self, comment: EdgeComment) -> None:
+        """Remove a comment that's being deleted from the counts of comments on its edge, without committing."""
+        if comment.edge is None:
+            return
+        self._increment_edge_feedback(comment.edge, up=0, down=0, comments=-1)
+
+    def _update_edge_feedback(self, edge: Edge, up: int = 0, down: int = 0, comments: int = 0) -> None:
+        """Add to the counts of votes and comments on the given edge, without committing.
+
+        The counts are incremented in SQL so concurrent updates to the same edge aren't lost. If the edge doesn't have
+        counts yet, they're added in a savepoint, so if another worker adds them first only the savepoint is rolled
+        back and they're incremented instead.
+        """
+        if not (up or down or comments):
+            return
+
+        if self._increment_edge_feedback(edge, up=up, down=down, comments=comments):
+            return
+
+        try:
+            with self.session.begin_nested():
+                self.session.add(EdgeFeedback(edge_id=edge.id, up=up, down=down, comments=comments))
+        except IntegrityError:
+            logger.debug('counts of the feedback on edge [id=%s] were added concurrently', edge.id)
+            self._increment_edge_feedback(edge, up=up, down=down, comments=comments)
+
+    def _increment_edge_feedback(self, edge: Edge, up: int, down: int, comments: int) -> bool:
+        """Increment the counts of votes and comments on the given edge in SQL, if it has any.
+
+        :return: If the edge had counts to increment
+        """
+        updated = self.session. \
+            query(EdgeFeedback). \
+            filter(EdgeFeedback.edge_id == edge.id). \
+            update({
+                EdgeFeedback.up: EdgeFeedback.up + up,
+                EdgeFeedback.down: EdgeFeedback.down + down,
+                EdgeFeedback.comments: EdgeFeedback.comments + comments,
+            })
+        return bool(updated)
+
+    def refresh_edge_feedback(self) -> None:
+        """Recount the votes and comments on all edges."""
+        counts = defaultdict(lambda: [0, 0, 0])
+
+        vote_counts = self.session. \
+            query(EdgeVote.edge_id, EdgeVote.agreed, func.count(EdgeVote.id)). \
+            filter(EdgeVote.agreed.isnot(None)). \
+            group_by(EdgeVote.edge_id, EdgeVote.agreed)
+        for edge_id, agreed, count in vote_counts:
+            counts[edge_id][0 if agreed else 1] = count
+
+        comment_counts = self.session. \
+            query(EdgeComment.edge_id, func.count(EdgeComment.id)). \
+            filter(EdgeComment.edge_id.isnot(None)). \
+            group_by(EdgeComment.edge_id)
+        for edge_id, count in comment_counts:
+            counts[edge_id][2] = count
+
+        self.session.query(EdgeFeedback).delete(synchronize_session=False)
+        self.session.add_all(
+            EdgeFeedback(edge_id=edge_id, up=up, down=down, comments=comments)
+            for edge_id, (up, down, comments) in counts.items()
+        )
+        self.session.commit()
+
+    @staticmethod
+    def sort_edges_by_consensus(edge_query: SQLAlchemyQuery) -> SQLAlchemyQuery:
+        """Sort a query for edges from the most agreed with to the most disagreed with, using the counts of votes."""
+        consensus = func.coalesce(EdgeFeedback.up, 0) - func.coalesce(EdgeFeedback.down, 0)
+        return edge_query. \
+            outerjoin(EdgeFeedback, EdgeFeedback.edge_id == Edge.id). \
+            order_by(consensus.desc(), Edge.id)
+
+    def get_edge_votes_by_user(self, edges: Iterable[Edge], user: User) -> Dict[int, EdgeVote]:
+        """Look up the user's votes on the given edges with one query for each chunk of edges.
+
+        :param edges: The edges that are being evaluated
+        :param user: The user who made the votes
+        :return: A dictionary from the database identifiers of the edges the user voted on to their votes
+        """
+        rv = {}
+        for edge_ids in _iter_id_chunks(edges):
+            votes = self.session.query(EdgeVote).filter(EdgeVote.user == user, EdgeVote.edge_id.in_(edge_ids))
+            rv.update((vote.edge_id, vote) for vote in votes)
+        return rv
+
+    def get_edge_comments(self, edges: Iterable[Edge]) -> Dict[int, List[EdgeComment]]:
+        """Look up the comments on the given edges, and the users who made them, with one query for each chunk of edges.
+
+        :return: A dictionary from the database identifiers of the edges to their comments, in the order they were made
+        """
+        rv = defaultdict(list)
+        for edge_ids in _iter_id_chunks(edges):
+            comments = self.session.query(EdgeComment). \
+                filter(EdgeComment.edge_id.in_(edge_ids)). \
+                options(joinedload(EdgeComment.user)). \
+                order_by(EdgeComment.id)
+            for comment in comments:
+                rv[comment.edge_id].append(comment)
+        return rv
+
     def _help_get_edge_entry(self, edge: Edge, user: User) -> Mapping:
         """Get edge information by edge identifier."""
-        data = edge.to_json()
+        return self._help_get_edge_entries([edge], user)[0]
 
-        data['comments'] = [
-            {
-                'user': {
-                    'id': edge_comment.user_id,
-                    'email': edge_comment.user.email
-                },
-                'comment': edge_comment.comment,
-                'created': edge_comment.created,
-            }
-            for edge_comment in self.session.query(EdgeComment).filter(EdgeComment.edge == edge)
-        ]
+    def _help_get_edge_entries(self, edges: List[Edge], user: User) -> List[Mapping]:
+        """Get the information for a list of edges, including the user's votes, without writing to the database.
 
-        if user.is_authenticated:
-            edge_vote = self.get_or_create_vote(edge, user)
-            data['vote'] = (
-                0 if (edge_vote is None or edge_vote.agreed is None) else
-                1 if edge_vote.agreed else
-                -1  # noqa: W503
-            )
+        The comments and votes for all of the edges are looked up together, so this takes a constant number of
+        queries for a page of edges. If the user hasn't voted on an edge, the vote is neutral.
+        """
+        comments = self.get_edge_comments(edges)
+        votes = self.get_edge_votes_by_user(edges, user) if user.is_authenticated else None
+
+        rv = []
+        for edge in edges:
+            data = edge.to_json()
+
+            data['comments'] = [
+                {
+                    'user': {
+                        'id': edge_comment.user_id,
+                        'email': edge_comment.user.email
+                    },
+                    'comment': edge_comment.comment,
+                    'created': edge_comment.created,
+                }
+                for edge_comment in comments.get(edge.id, [])
+            ]
+
+            if votes is not None:
+                edge_vote = votes.get(edge.id)
+                data['vote'] = (
+                    0 if (edge_vote is None or edge_vote.agreed is None) else
+                    1 if edge_vote.agreed else
+                    -1  # noqa: W503
+                )
+
+            rv.append(data)
 
-        return data
+        return rv
 
     def get_node_overlaps(self, network: Network) -> Mapping[int, Tuple[Network, float]]:
-        """Calculate overlaps to all other networks in the database.
+        """Calculate overlaps to the networks in the database that are similar to the given network.
+
+        Similar networks are found with the LSH buckets of the networks' MinHash signatures, and networks that are
+        much bigger or smaller with their containment buckets. The candidates whose overlaps estimated from their
+        signatures are at least :data:`_MIN_ESTIMATED_OVERLAP` have their exact overlaps calculated and cached.
+        Networks that aren't similar enough to share a bucket are left out.
 
-        :return: A dictionary from {int network_id: (network, float similarity)} for this network to all other networks
+        :return: A dictionary from {int network_id: (network, float similarity)} for this network to similar networks
         """
         t = time.time()
 
-        nodes = set(node.id for node in network.nodes)
-
         incoming_overlaps = (
             (ol.left_id, ol.left, ol.overlap)
             for ol in network.incoming_overlaps
@@ -232,28 +877,288 @@ class WebManagerBase(Manager):
             for other_network_id, other_network, overlap in itt.chain(incoming_overlaps, outgoing_overlaps)
         }
 
-        uncached_networks = list(
+        sketch = self.get_or_create_network_sketch(network)
+        similar_network_ids = self.session. \
+            query(NetworkSketchBucket.network_id). \
+            filter(NetworkSketchBucket.bucket.in_(sketch.get_buckets()))
+        # networks of very different sizes have low Jaccard indexes even if one contains the other
+        nested_network_ids = self.session. \
+            query(NetworkSketchBucket.network_id). \
+            join(NetworkSketch). \
+            filter(NetworkSketchBucket.bucket.in_(sketch.get_containment_buckets())). \
+            filter(or_(
+                NetworkSketch.number_nodes > sketch.number_nodes * CONTAINMENT_SIZE_RATIO,
+                NetworkSketch.number_nodes * CONTAINMENT_SIZE_RATIO < sketch.number_nodes,
+            ))
+
+        candidates = self.session. \
+            query(Network, NetworkSketch). \
+            join(NetworkSketch). \
+            filter(Network.id != network.id). \
+            filter(Network.id.in_(similar_network_ids.union(nested_network_ids))). \
+            filter(Network.id.in_(_query_recent_network_ids(self.session)))
+
+        signature = sketch.get_signature()
+        uncached_networks = [
             other_network
-            for other_network in self.list_recent_networks()
-            if other_network.id != network.id and other_network.id not in rv
-        )
+            for other_network, other_sketch in candidates
+            if other_network.id not in rv and _MIN_ESTIMATED_OVERLAP <= estimate_overlap(
+                signature, sketch.number_nodes, other_sketch.get_signature(), other_sketch.number_nodes,
+            )
+        ]
 
         if uncached_networks:
             logger.debug('caching overlaps for network [id=%s]', network)
 
+            nodes = self._get_node_ids_by_network_id([network])[network.id]
+            other_nodes = self._get_node_ids_by_network_id(uncached_networks)
+
+            overlaps = []
             for other_network in uncached_networks:
-                other_network_nodes = set(node.id for node in other_network.nodes)
-                overlap = min_tanimoto_set_similarity(nodes, other_network_nodes)
+                overlap = min_tanimoto_set_similarity(nodes, other_nodes[other_network.id])
                 rv[other_network.id] = other_network, overlap
-                no = NetworkOverlap.build(left=network, right=other_network, overlap=overlap)
-                self.session.add(no)
-
+                left_id, right_id = max(network.id, other_network.id), min(network.id, other_network.id)
+                overlaps.append((left_id, right_id, overlap))
+
+            try:
+                with self.session.begin_nested():
+                    self._insert_network_overlaps(overlaps)
+            except IntegrityError:
+                # The task updating the overlaps stored some of them in the meantime. They're the same as the ones
+                # calculated here, so those are still returned and only the caching is skipped.
+                logger.debug('overlaps for network [id=%s] were cached concurrently', network)
+            else:
+                self.bump_overlap_version()
             self.session.commit()
 
             logger.debug('cached overlaps for network [id=%s] in %.2f seconds', network, time.time() - t)
 
         return rv
 
+    def _get_node_ids_by_network_id(self, networks: Iterable[Network]) -> Dict[int, Set[int]]:
+        """Look up the database identifiers of the nodes in each network without loading the nodes."""
+        rv = {network.id: set() for network in networks}
+        for network_ids in _iter_id_chunks(networks):
+            node_ids = self.session. \
+                query(network_node.c.network_id, network_node.c.node_id). \
+                filter(network_node.c.network_id.in_(network_ids))
+            for network_id, node_id in node_ids:
+                rv[network_id].add(node_id)
+        return rv
+
+    def get_or_create_network_sketch(self, network: Network) -> NetworkSketch:
+        """Get the MinHash signature of the nodes in the network, and calculate it if it doesn't exist yet."""
+        if network.sketch is not None:
+            return network.sketch
+
+        self.add_network_sketches([network])
+        self.session.commit()
+        return network.sketch
+
+    def add_network_sketches(self, networks: Iterable[Network]) -> None:
+        """Calculate the MinHash signatures of the nodes in the networks and add them to the LSH index.
+
+        This doesn't commit.
+        """
+        networks = list(networks)
+        node_ids_by_network_id = self._get_node_ids_by_network_id(networks)
+        for network in networks:
+            node_ids = node_ids_by_network_id[network.id]
+            signature = get_signature(node_ids)
+            network.sketch = NetworkSketch(
+                number_nodes=len(node_ids),
+                signature=signature_to_bytes(signature),
+                buckets=[
+                    NetworkSketchBucket(bucket=bucket)
+                    for bucket in itt.chain(get_buckets(signature), get_containment_buckets(signature))
+                ],
+            )
+
+    def ensure_network_sketches(self) -> int:
+        """Calculate the MinHash signatures for all networks that don't have one yet.
+
+        :return: The number of signatures that were calculated
+        """
+        networks = self.session. \
+            query(Network). \
+            outerjoin(NetworkSketch). \
+            filter(NetworkSketch.network_id.is_(None)). \
+            all()
+        self.add_network_sketches(networks)
+        self.session.commit()
+        return len(networks)
+
+    def get_or_create_network_contents(self, network: Network) -> NetworkContents:
+        """Get the index of the citations and annotations of the network, and build it if it doesn't exist yet."""
+        if network.contents is not None:
+            return network.contents
+
+        self.add_network_contents([network])
+        self.session.commit()
+        return network.contents
+
+    def add_network_contents(self, networks: Iterable[Network]) -> None:
+        """List the citations referenced by the edges in the networks and the entries of the edges' annotations.
+
+        This goes through all edges of each network once, so paginating them afterwards doesn't have to. This doesn't
+        commit.
+        """
+        for network in networks:
+            citation_ids = self.session. \
+                query(Evidence.citation_id). \
+                join(Edge, Edge.evidence_id == Evidence.id). \
+                join(network_edge, network_edge.c.edge_id == Edge.id). \
+                filter(network_edge.c.network_id == network.id, Evidence.citation_id.isnot(None)). \
+                distinct()
+            citation_ids = [citation_id for citation_id, in citation_ids]
+
+            name_ids = self.session. \
+                query(edge_annotation.c.name_id). \
+                join(network_edge, network_edge.c.edge_id == edge_annotation.c.edge_id). \
+                filter(network_edge.c.network_id == network.id). \
+                distinct()
+            name_ids = [name_id for name_id, in name_ids]
+
+            network.contents = NetworkContents(
+                number_citations=len(citation_ids),
+                number_annotation_entries=len(name_ids),
+            )
+            self.session.flush()  # the rows of the contents reference it
+
+            if citation_ids:
+                self.session.execute(network_contents_citation.insert(), [
+                    dict(network_id=network.id, citation_id=citation_id)
+                    for citation_id in citation_ids
+                ])
+            if name_ids:
+                self.session.execute(network_contents_annotation.insert(), [
+                    dict(network_id=network.id, name_id=name_id)
+                    for name_id in name_ids
+                ])
+
+    def ensure_network_contents(self) -> int:
+        """List the citations and annotations of all networks whose contents haven't been listed yet.
+
+        :return: The number of networks that were indexed
+        """
+        networks = self.session. \
+            query(Network). \
+            outerjoin(NetworkContents). \
+            filter(NetworkContents.network_id.is_(None)). \
+            all()
+        self.add_network_contents(networks)
+        self.session.commit()
+        return len(networks)
+
+    def _get_network_incidence(self, network: Optional[Network] = None) -> Incidence:
+        """Build the network by node incidence matrix of the recent networks, and optionally the given network."""
+        network_ids = _query_recent_network_ids(self.session)
+        network_filter = network_node.c.network_id.in_(network_ids)
+        if network is not None:
+            network_ids = network_ids.union(self.session.query(Network.id).filter(Network.id == network.id))
+            network_filter = or_(network_filter, network_node.c.network_id == network.id)
+
+        pairs = self.session.query(network_node.c.network_id, network_node.c.node_id).filter(network_filter)
+        return build_incidence((network_id for network_id, in network_ids), pairs)
+
+    def build_network_overlaps(self) -> int:
+        """Calculate the overlaps between all pairs of recent networks at once and replace the cached overlaps.
+
+        :return: The number of pairs of networks that overlap
+        """
+        overlaps = calculate_overlaps(self._get_network_incidence())
+        self._replace_network_overlaps(self.session.query(NetworkOverlap), overlaps)
+        self.bump_overlap_version()
+        self.session.commit()
+        return len(overlaps)
+
+    def update_network_overlaps(self, network: Network) -> int:
+        """Calculate the overlaps between the given network and all recent networks and replace its cached overlaps.
+
+        :return: The number of networks that overlap with the given network
+        """
+        overlaps = calculate_network_overlaps(self._get_network_incidence(network), network.id)
+        old_overlaps = self.session. \
+            query(NetworkOverlap). \
+            filter(or_(NetworkOverlap.left_id == network.id, NetworkOverlap.right_id == network.id))
+        self._replace_network_overlaps(old_overlaps, overlaps)
+        self.bump_overlap_version()
+        self.session.commit()
+        return len(overlaps)
+
+    def _replace_network_overlaps(self, old_overlaps, overlaps: List[Tuple[int, int, float]]) -> None:
+        """Delete the overlaps from the given query and insert the new ones in a savepoint.
+
+        If :meth:`get_node_overlaps` caches some of the same overlaps in between, the savepoint is rolled back and it's
+        tried again, so the overlaps cached by the request are deleted this time.
+        """
+        for attempt in range(1, _REPLACE_OVERLAPS_TRIES + 1):
+            try:
+                with self.session.begin_nested():
+                    old_overlaps.delete(synchronize_session=False)
+                    self._insert_network_overlaps(overlaps)
+            except IntegrityError:
+                if attempt == _REPLACE_OVERLAPS_TRIES:
+                    raise
+                logger.debug('overlaps were cached concurrently, replacing them again')
+            else:
+                return
+
+    def _insert_network_overlaps(self, overlaps: List[Tuple[int, int, float]]) -> None:
+        if not overlaps:
+            return
+        self.session.execute(NetworkOverlap.__table__.insert(), [
+            dict(left_id=left_id, right_id=right_id, overlap=overlap)
+            for left_id, right_id, overlap in overlaps
+        ])
+
+    def get_network_overview(self, cutoff: float) -> List[Mapping]:
+        """Get a meta-network of the recent networks in which the edges are the cached overlaps between them.
+
+        The overlaps are kept up to date by :meth:`update_network_overlaps` when networks are uploaded, so this takes
+        two queries instead of calculating the overlaps of all pairs of networks.
+
+        :param cutoff: The smallest overlap between two networks for which to include an edge
+        :return: The nodes then the edges of the meta-network, as Cytoscape.js elements
+        """
+        recent_network_ids = _query_recent_network_ids(self.session)
+
+        networks = self.session. \
+            query(Network.id, Network.name, Report.number_nodes). \
+            outerjoin(Report, Report.network_id == Network.id). \
+            filter(Network.id.in_(recent_network_ids)). \
+            order_by(Network.id)
+
+        overlaps = self.session. \
+            query(NetworkOverlap.left_id, NetworkOverlap.right_id, NetworkOverlap.overlap). \
+            filter(NetworkOverlap.overlap >= cutoff). \
+            filter(NetworkOverlap.left_id.in_(recent_network_ids)). \
+            filter(NetworkOverlap.right_id.in_(recent_network_ids)). \
+            order_by(NetworkOverlap.left_id, NetworkOverlap.right_id)
+
+        node_elements = [
+            {
+                'data': {
+                    'id': network_id,
+                    'name': name,
+                    'size': number_nodes,
+                },
+            }
+            for network_id, name, number_nodes in networks
+        ]
+        edge_elements = [
+            {
+                'data': {
+                    'id': f'edge{i}',
+                    'source': left_id,
+                    'target': right_id,
+                    'weight': int(100 * overlap),
+                },
+            }
+            for i, (left_id, right_id, overlap) in enumerate(overlaps)
+        ]
+        return node_elements + edge_elements
+
     def get_top_overlaps(self, network: Network, user: User, n: Optional[int] = 10) -> List[Tuple[Network, float]]:
         """Get the top n most overlapping networks with the given network."""
         overlap_counter = self.get_node_overlaps(network)
@@ -366,6 +1271,26 @@ class WebManagerBase(Manager):
 
 def iter_recent_public_networks(manager: Manager) -> Iterable[Network]:
     """Iterate over the recent networks from that have been made public."""
-    for network in manager.list_recent_networks():
-        if network.report and network.report.public:
-            yield network
+    return manager.session.query(Network).filter(Network.id.in_(_query_recent_public_network_ids(manager.session)))
+
+
+def _query_recent_network_ids(session: Session) -> SQLAlchemyQuery:
+    """Build a query for the identifiers of the most recent version of each network, by name."""
+    most_recent_times = session. \
+        query(Network.name.label('network_name'), func.max(Network.created).label('max_created')). \
+        group_by(Network.name). \
+        subquery('most_recent_times')
+
+    and_condition = and_(
+        most_recent_times.c.network_name == Network.name,
+        most_recent_times.c.max_created == Network.created,
+    )
+
+    return session.query(Network.id).join(most_recent_times, and_condition)
+
+
+def _query_recent_public_network_ids(session: Session) -> SQLAlchemyQuery:
+    """Build a query for the identifiers of the most recent version of each network that have been made public."""
+    return _query_recent_network_ids(session). \
+        join(Report, Report.network_id == Network.id). \
+        filter(Report.public)
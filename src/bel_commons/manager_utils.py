@@ -21,6 +21,7 @@ from pybel.constants import GENE
 from pybel.manager.models import Network
 from pybel.struct import collapse_to_genes
 from .constants import LABEL
+from .manager_base import WebManagerBase
 from .models import Experiment, Omic, Report, User
 from .tools_compat import (
     calculate_average_scores_on_subgraphs, generate_bioprocess_mechanisms, overlay_type_data,
@@ -64,7 +65,7 @@ def fill_out_report(*, network: Network, report: Report, graph: Optional[BELGrap
 
 
 def insert_graph(
-    manager: Manager,
+    manager: WebManagerBase,
     graph: BELGraph,
     user: User,
     public: bool = True,
@@ -72,7 +73,7 @@ def insert_graph(
 ) -> Network:
     """Insert a graph and also make a report.
 
-    :param manager: A PyBEL manager
+    :param manager: A BEL Commons manager
     :param graph: A BEL graph
     :param user: The identifier of the user to report. Defaults to 1. Can also give a user object.
     :param public: Should the network be public? Defaults to False.
@@ -90,6 +91,7 @@ def insert_graph(
     fill_out_report(graph=graph, network=network, report=report)
 
     manager.session.add(report)
+    manager.bump_permission_version()
     manager.session.commit()
 
     return network
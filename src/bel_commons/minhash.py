@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""MinHash signatures of the sets of nodes in networks and locality-sensitive hashing (LSH) to find similar networks.
+
+The signature of a network is the minimum of each of :data:`NUMBER_PERMUTATIONS` random hash functions over the
+database identifiers of its nodes. The fraction of positions in which two signatures agree estimates the Jaccard index
+of the two sets of nodes. Each signature is split into :data:`NUMBER_BANDS` bands that are used as keys of buckets, so
+two networks that share at least one bucket are likely to be similar and can be found with an index lookup instead of
+comparing against every network.
+
+With two rows per band, networks with a Jaccard index of 0.1 share a bucket about half of the time and networks with
+a Jaccard index of 0.2 almost always do.
+
+Networks are ranked by the overlap of their nodes relative to the smaller network, which can be high when the Jaccard
+index is low: a network with 20 nodes that is contained in a network with 1000 nodes has a Jaccard index of 0.02. The
+Jaccard index of two networks whose sizes differ by more than :data:`CONTAINMENT_SIZE_RATIO` times is at most the
+inverse of that ratio, so those networks are also found with *containment buckets* that have a single row per band,
+like in LSH Ensemble. A network with 20 nodes contained in a network with 1000 nodes shares one of them about 92% of
+the time. The overlap of each candidate is then estimated from the signatures and the sizes of the networks with
+:func:`estimate_overlap` to leave out the ones that only share a few nodes before their exact overlaps are calculated.
+"""
+
+from typing import Iterable, List
+
+import numpy as np
+
+__all__ = [
+    'NUMBER_PERMUTATIONS',
+    'NUMBER_BANDS',
+    'get_signature',
+    'CONTAINMENT_SIZE_RATIO',
+    'get_buckets',
+    'get_containment_buckets',
+    'estimate_jaccard',
+    'estimate_overlap',
+    'signature_to_bytes',
+    'signature_from_bytes',
+]
+
+#: The number of hash functions in a signature
+NUMBER_PERMUTATIONS = 128
+#: The number of bands that signatures are split into for LSH
+NUMBER_BANDS = 64
+#: How many times bigger one network has to be than another to look for it in the containment buckets
+CONTAINMENT_SIZE_RATIO = 2
+
+#: A Mersenne prime that's the modulus of the hash functions, so products of two reduced numbers fit in 64 bits
+_PRIME = (1 << 31) - 1
+#: The number of nodes to hash at once, which bounds the memory used for large networks
+_CHUNK_SIZE = 4096
+
+# The hash functions have to be the same in every process, so they're generated with a fixed seed
+_random_state = np.random.RandomState(0)
+_A = _random_state.randint(1, _PRIME, size=NUMBER_PERMUTATIONS, dtype=np.int64)
+_B = _random_state.randint(0, _PRIME, size=NUMBER_PERMUTATIONS, dtype=np.int64)
+
+_DTYPE = np.dtype('<u4')
+
+
+def get_signature(node_ids: Iterable[int]) -> np.ndarray:
+    """Calculate the MinHash signature of a set of database identifiers of nodes.
+
+    The signature of an empty set is all :data:`_PRIME`, which doesn't agree with the signature of any other set.
+    """
+    x = np.fromiter(node_ids, dtype=np.int64) % _PRIME
+
+    signature = np.full(NUMBER_PERMUTATIONS, _PRIME, dtype=np.int64)
+    for start in range(0, len(x), _CHUNK_SIZE):
+        hashes = (np.outer(x[start:start + _CHUNK_SIZE], _A) + _B) % _PRIME
+        np.minimum(signature, hashes.min(axis=0), out=signature)
+
+    return signature.astype(_DTYPE)
+
+
+def get_buckets(signature: np.ndarray) -> List[str]:
+    """Get the keys of the LSH buckets for each band of the signature."""
+    rows = len(signature) // NUMBER_BANDS
+    return [
+        f'{band}:{signature[band * rows:(band + 1) * rows].tobytes().hex()}'
+        for band in range(NUMBER_BANDS)
+    ]
+
+
+def get_containment_buckets(signature: np.ndarray) -> List[str]:
+    """Get the keys of the LSH buckets for each value of the signature, which are used to find containment."""
+    return [
+        f'c{band}:{value:08x}'
+        for band, value in enumerate(signature.tolist())
+    ]
+
+
+def estimate_jaccard(left: np.ndarray, right: np.ndarray) -> float:
+    """Estimate the Jaccard index of two sets from their signatures."""
+    return float(np.mean(left == right))
+
+
+def estimate_overlap(left: np.ndarray, left_size: int, right: np.ndarray, right_size: int) -> float:
+    """Estimate the overlap of two sets relative to the smaller one from their signatures and sizes.
+
+    The size of the intersection of sets :math:`A` and :math:`B` is :math:`J(|A| + |B|) / (1 + J)`, where :math:`J` is
+    their Jaccard index.
+    """
+    smaller_size = min(left_size, right_size)
+    if not smaller_size:
+        return 0.0
+    jaccard = estimate_jaccard(left, right)
+    intersection_size = jaccard * (left_size + right_size) / (1 + jaccard)
+    return min(1.0, intersection_size / smaller_size)
+
+
+def signature_to_bytes(signature: np.ndarray) -> bytes:
+    """Serialize a signature for storage in the database."""
+    return signature.astype(_DTYPE).tobytes()
+
+
+def signature_from_bytes(data: bytes) -> np.ndarray:
+    """Deserialize a signature from the database."""
+    return np.frombuffer(data, dtype=_DTYPE)
@@ -10,9 +10,9 @@ import hashlib
 import itertools as itt
 import json
 import pickle
-from operator import attrgetter
 from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
 
+import numpy as np
 from flask_security import RoleMixin, UserMixin
 from pandas import DataFrame
 from sqlalchemy import (
@@ -25,11 +25,13 @@ import pybel.struct
 import pybel.struct.query
 from pybel import BELGraph, Manager, Pipeline
 from pybel.dsl import BaseEntity
-from pybel.manager.models import Base, Edge, LONGBLOB, Network
+from pybel.manager.models import Base, Citation, Edge, LONGBLOB, NamespaceEntry, Network
 from pybel.struct import union
 from pybel.struct.query import SEED_DATA, SEED_METHOD, Seeding
 from pybel.struct.query.constants import NODE_SEED_TYPES
 from pybel.tokens import parse_result_to_dsl
+from .document_summary import DocumentSummary
+from .minhash import get_buckets, get_containment_buckets, signature_from_bytes
 from .tools_compat import BELGraphSummary
 
 ASSEMBLY_TABLE_NAME = 'pybel_assembly'
@@ -48,7 +50,14 @@ PROJECT_NETWORK_TABLE_NAME = 'pybel_project_network'
 USER_NETWORK_TABLE_NAME = 'pybel_user_network'
 COMMENT_TABLE_NAME = 'pybel_comment'
 VOTE_TABLE_NAME = 'pybel_vote'
+FEEDBACK_TABLE_NAME = 'pybel_edge_feedback'
+CACHE_VERSION_TABLE_NAME = 'pybel_cache_version'
 OVERLAP_TABLE_NAME = 'pybel_overlap'
+SKETCH_TABLE_NAME = 'pybel_network_sketch'
+SKETCH_BUCKET_TABLE_NAME = 'pybel_network_sketch_bucket'
+CONTENTS_TABLE_NAME = 'pybel_network_contents'
+CONTENTS_CITATION_TABLE_NAME = 'pybel_network_contents_citation'
+CONTENTS_ANNOTATION_TABLE_NAME = 'pybel_network_contents_annotation'
 OMICS_TABLE_NAME = 'pybel_omic'
 
 USER_QUERY_TABLE_NAME = 'pybel_user_query'
@@ -74,8 +83,14 @@ class Assembly(Base):
 
     networks = relationship(Network, secondary=assembly_network, backref=backref('assemblies', lazy='dynamic'))
 
-    def as_bel(self) -> BELGraph:
-        """Return a merged instance of all of the contained networks."""
+    def as_bel(self, manager: Optional[Manager] = None) -> BELGraph:
+        """Return a merged instance of all of the contained networks.
+
+        :param manager: If given, uses :meth:`pybel.Manager.get_graph_by_ids` so the merged graph can be served from
+         the manager's cache.
+        """
+        if manager is not None:
+            return manager.get_graph_by_ids([network.id for network in self.networks])
         return union(network.as_bel() for network in self.networks)
 
     @classmethod
@@ -136,6 +151,9 @@ class Query(Base):
     seeding = Column(Text, doc="The stringified JSON of the list representation of the seeding")
     pipeline = Column(Text, doc="Protocol list")
 
+    canonical_hash = Column(String(32), nullable=True, unique=True, index=True,
+                            doc='The hash of the content of the query, if it is shared by all users who run it')
+
     parent_id = Column(Integer, ForeignKey('{}.id'.format(__tablename__)), nullable=True)
     parent = relationship('Query', remote_side=[id],
                           backref=backref('children', lazy='dynamic', cascade="all, delete-orphan"))
@@ -212,6 +230,41 @@ class Query(Base):
 
         return self._query
 
+    def get_canonical_hash(self) -> str:
+        """Hash the content of this query, i.e., its assembly, seeding, and pipeline.
+
+        Two queries with the same content have the same hash, regardless of their database identifiers.
+        """
+        return self.get_prefix_hashes()[-1]
+
+    def get_prefix_hashes(self) -> List[str]:
+        """Hash the content of this query for each prefix of its pipeline, from the empty pipeline to the full one.
+
+        The first hash stands for the seeded graph and the last one is the same as :meth:`get_canonical_hash`. Queries
+        that share the assembly, seeding, and the first steps of their pipelines share the first hashes.
+        """
+        if self.assembly is None:
+            assembly_md5 = None
+        else:
+            assembly_md5 = self.assembly.md5 or Assembly.get_network_list_md5(self.assembly.networks)
+
+        seeding = _loads_protocol(self.seeding)
+        pipeline = _loads_protocol(self.pipeline)
+        return [
+            _hash_query_content(assembly_md5, seeding, pipeline[:length])
+            for length in range(len(pipeline) + 1)
+        ]
+
+    @staticmethod
+    def build_canonical_hash(assembly_md5: Optional[str], seeding: Optional[str], pipeline: Optional[str]) -> str:
+        """Hash the content of a query without building it.
+
+        :param assembly_md5: The :data:`Assembly.md5` of the query's assembly
+        :param seeding: The stringified seeding
+        :param pipeline: The stringified pipeline
+        """
+        return _hash_query_content(assembly_md5, _loads_protocol(seeding), _loads_protocol(pipeline))
+
     def to_json(self, include_id: bool = True) -> Dict:
         """Serialize this object to JSON.
 
@@ -311,6 +364,21 @@ class Query(Base):
         return self
 
 
+def _loads_protocol(s: Optional[str]) -> List[Dict[str, Any]]:
+    """Load a stringified seeding or pipeline, which is empty if not set."""
+    return json.loads(s) if s else []
+
+
+def _hash_query_content(
+    assembly_md5: Optional[str],
+    seeding: List[Dict[str, Any]],
+    pipeline: List[Dict[str, Any]],
+) -> str:
+    """Hash the content of a query."""
+    canonical = json.dumps([assembly_md5, seeding, pipeline], sort_keys=True, separators=(',', ':'))
+    return hashlib.md5(canonical.encode('utf-8')).hexdigest()
+
+
 roles_users = Table(
     ROLE_USER_TABLE_NAME,
     Base.metadata,
@@ -417,9 +485,11 @@ class User(Base, UserMixin):
         )
 
     def get_sorted_queries(self) -> List[Query]:
-        """Get a list of sorted queries for this user."""
-        queries = (user_query.query for user_query in self.queries)
-        return sorted(queries, key=attrgetter('created'), reverse=True)
+        """Get a list of the queries of this user, sorted by when this user last ran them."""
+        return [
+            user_query.query
+            for user_query in self.queries.order_by(UserQuery.created.desc())
+        ]
 
     def pending_reports(self) -> List[Report]:
         """Get a list of pending reports for this user."""
@@ -492,7 +562,7 @@ class UserQuery(Base):
 
     query_id = Column(Integer, ForeignKey(f'{Query.__tablename__}.id'), nullable=False,
                       doc='The user who created the query')
-    query = relationship(Query, backref=backref('user_query', uselist=False))
+    query = relationship(Query, backref=backref('user_queries', lazy='dynamic'))
 
     public = Column(Boolean, nullable=False, default=False, doc='Should the query be public? Note: users still need'
                                                                 'appropriate rights to all networks in assembly')
@@ -568,8 +638,14 @@ class Project(Base):
             for u in self.users
         )
 
-    def as_bel(self) -> BELGraph:
-        """Return a merged instance of all of the contained networks."""
+    def as_bel(self, manager: Optional[Manager] = None) -> BELGraph:
+        """Return a merged instance of all of the contained networks.
+
+        :param manager: If given, uses :meth:`pybel.Manager.get_graph_by_ids` so the merged graph can be served from
+         the manager's cache.
+        """
+        if manager is not None:
+            return manager.get_graph_by_ids([network.id for network in self.networks])
         return union(network.as_bel() for network in self.networks)
 
     def __str__(self):  # noqa: D105
@@ -788,13 +864,41 @@ class Report(Base):
         return codecs.decode(self.source, self.encoding or 'utf-8').split('\n')
 
     def dump_calculations(self, graph: BELGraph) -> None:
-        """Store a summary calculations dictionary."""
-        calculations = BELGraphSummary.from_graph(graph)
+        """Store the summary calculations and the summary of the document of the graph."""
+        self._dump_calculations({
+            'summary': BELGraphSummary.from_graph(graph),
+            'document': DocumentSummary.from_graph(graph),
+        })
+
+    def _dump_calculations(self, calculations: Mapping[str, Any]) -> None:
         self.calculations = pickle.dumps(calculations, protocol=pickle.HIGHEST_PROTOCOL)
 
+    def _load_calculations(self) -> Dict[str, Any]:
+        calculations = pickle.loads(self.calculations)
+        # reports from before the document summary was stored only have the summary calculations
+        if isinstance(calculations, BELGraphSummary):
+            return {'summary': calculations}
+        return calculations
+
     def get_calculations(self) -> BELGraphSummary:
         """Get the summary calculations dictionary from this network."""
-        return pickle.loads(self.calculations)
+        return self._load_calculations()['summary']
+
+    def get_document_summary(self) -> Optional[DocumentSummary]:
+        """Get the summary of the document of this network, if it was stored."""
+        return self._load_calculations().get('document')
+
+    def get_calculations_and_document_summary(self) -> Tuple[BELGraphSummary, Optional[DocumentSummary]]:
+        """Get the summary calculations and the summary of the document, if it was stored, unpickling them once."""
+        calculations = self._load_calculations()
+        return calculations['summary'], calculations.get('document')
+
+    def add_document_summary(self, graph: BELGraph) -> DocumentSummary:
+        """Store the summary of the document of the graph, keeping the stored summary calculations."""
+        calculations = self._load_calculations()
+        calculations['document'] = document_summary = DocumentSummary.from_graph(graph)
+        self._dump_calculations(calculations)
+        return document_summary
 
     @property
     def is_displayable(self) -> bool:
@@ -915,6 +1019,48 @@ class EdgeComment(Base):
         }
 
 
+class EdgeFeedback(Base):
+    """Describes the number of votes and comments on an edge.
+
+    These are kept in sync with the :class:`EdgeVote` and :class:`EdgeComment` models by the manager so they don't
+    have to be counted for each edge.
+    """
+
+    __tablename__ = FEEDBACK_TABLE_NAME
+
+    edge_id = Column(Integer, ForeignKey(f'{Edge.__tablename__}.id', ondelete='CASCADE'), primary_key=True)
+    edge = relationship(Edge, backref=backref('feedback', uselist=False, cascade="all, delete-orphan"))
+
+    up = Column(Integer, nullable=False, default=0, doc='The number of votes agreeing with the edge')
+    down = Column(Integer, nullable=False, default=0, doc='The number of votes disagreeing with the edge')
+    comments = Column(Integer, nullable=False, default=0, doc='The number of comments on the edge')
+
+    @property
+    def consensus(self) -> int:
+        """Get the number of votes agreeing with the edge minus the number disagreeing."""
+        return self.up - self.down
+
+    def to_json(self) -> Dict[str, int]:
+        """Convert these counts to JSON."""
+        return {
+            'up': self.up,
+            'down': self.down,
+            'comments': self.comments,
+        }
+
+
+class CacheVersion(Base):
+    """Describes the version of some data that's cached, like the rights to networks or the overlaps between them.
+
+    Each version is incremented every time its data changes, so caches in all processes know when they're outdated.
+    """
+
+    __tablename__ = CACHE_VERSION_TABLE_NAME
+
+    name = Column(String(255), primary_key=True, doc='The name of the data')
+    version = Column(Integer, nullable=False, default=0)
+
+
 class NetworkOverlap(Base):
     """Describes the network overlap based on nodes."""
 
@@ -937,3 +1083,84 @@ class NetworkOverlap(Base):
             left, right = right, left
 
         return NetworkOverlap(left=left, right=right, overlap=overlap)
+
+
+class NetworkSketch(Base):
+    """Describes the MinHash signature of the nodes in a network, used to find similar networks."""
+
+    __tablename__ = SKETCH_TABLE_NAME
+
+    network_id = Column(Integer, ForeignKey(f'{Network.__tablename__}.id', ondelete='CASCADE'), primary_key=True)
+    network = relationship(Network, backref=backref('sketch', uselist=False, cascade="all, delete-orphan"))
+
+    number_nodes = Column(Integer, nullable=False, doc='The number of nodes in the network')
+    signature = Column(LargeBinary, nullable=False, doc='The MinHash signature of the nodes in the network')
+
+    buckets = relationship('NetworkSketchBucket', cascade="all, delete-orphan")
+
+    def get_signature(self) -> np.ndarray:
+        """Get the MinHash signature as an array."""
+        return signature_from_bytes(self.signature)
+
+    def get_buckets(self) -> List[str]:
+        """Get the keys of the LSH buckets of the signature."""
+        return get_buckets(self.get_signature())
+
+    def get_containment_buckets(self) -> List[str]:
+        """Get the keys of the LSH buckets of each value of the signature."""
+        return get_containment_buckets(self.get_signature())
+
+
+class NetworkSketchBucket(Base):
+    """Describes the LSH buckets and containment buckets that each network is in."""
+
+    __tablename__ = SKETCH_BUCKET_TABLE_NAME
+
+    bucket = Column(String(255), primary_key=True, doc='The key of the bucket, from a band of the signature')
+    network_id = Column(
+        Integer,
+        ForeignKey(f'{NetworkSketch.__tablename__}.network_id', ondelete='CASCADE'),
+        primary_key=True,
+    )
+
+
+class NetworkContents(Base):
+    """Describes that the citations and annotations of a network have been indexed, and how many there are.
+
+    The network's citations and the entries of the annotations on its edges are listed in
+    :data:`network_contents_citation` and :data:`network_contents_annotation`, whose primary keys start with the
+    network, so they can be paginated by keyset without going through all of the network's edges for each page.
+    """
+
+    __tablename__ = CONTENTS_TABLE_NAME
+
+    network_id = Column(Integer, ForeignKey(f'{Network.__tablename__}.id', ondelete='CASCADE'), primary_key=True)
+    network = relationship(Network, backref=backref('contents', uselist=False, cascade="all, delete-orphan"))
+
+    number_citations = Column(Integer, nullable=False, doc='The number of citations referenced by the edges')
+    number_annotation_entries = Column(Integer, nullable=False, doc='The number of annotation entries on the edges')
+
+
+network_contents_citation = Table(
+    CONTENTS_CITATION_TABLE_NAME,
+    Base.metadata,
+    Column(
+        'network_id',
+        Integer,
+        ForeignKey(f'{NetworkContents.__tablename__}.network_id', ondelete='CASCADE'),
+        primary_key=True,
+    ),
+    Column('citation_id', Integer, ForeignKey(f'{Citation.__tablename__}.id', ondelete='CASCADE'), primary_key=True),
+)
+
+network_contents_annotation = Table(
+    CONTENTS_ANNOTATION_TABLE_NAME,
+    Base.metadata,
+    Column(
+        'network_id',
+        Integer,
+        ForeignKey(f'{NetworkContents.__tablename__}.network_id', ondelete='CASCADE'),
+        primary_key=True,
+    ),
+    Column('name_id', Integer, ForeignKey(f'{NamespaceEntry.__tablename__}.id', ondelete='CASCADE'), primary_key=True),
+)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+"""Vectorized calculation of the node overlaps between networks.
+
+The networks are the rows of a sparse incidence matrix whose columns are nodes, so the sizes of the intersections of
+the sets of nodes of all pairs of networks are the entries of the product of the matrix with its transpose. Only the
+pairs of networks that share at least one node are stored by the product, so it stays sparse.
+"""
+
+from typing import Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+from scipy import sparse
+
+__all__ = [
+    'Incidence',
+    'build_incidence',
+    'calculate_overlaps',
+    'calculate_network_overlaps',
+]
+
+
+class Incidence(NamedTuple):
+    """A sparse network by node incidence matrix."""
+
+    #: The database identifiers of the networks in the rows of the matrix
+    network_ids: np.ndarray
+    #: The matrix, with a one where the network of the row has the node of the column
+    matrix: sparse.csr_matrix
+
+    @property
+    def sizes(self) -> np.ndarray:
+        """Get the number of nodes in each network."""
+        return np.asarray(self.matrix.sum(axis=1)).ravel()
+
+
+def build_incidence(network_ids: Iterable[int], pairs: Iterable[Tuple[int, int]]) -> Incidence:
+    """Build the incidence matrix of the given networks.
+
+    :param network_ids: The database identifiers of the networks, which become the rows of the matrix
+    :param pairs: Pairs of database identifiers of networks and the nodes they contain. Pairs from other networks are
+     skipped.
+    """
+    network_ids = np.unique(np.fromiter(network_ids, dtype=np.int64))
+    pairs = np.array(list(pairs), dtype=np.int64).reshape(-1, 2)
+    pairs = pairs[np.isin(pairs[:, 0], network_ids)]
+
+    rows = np.searchsorted(network_ids, pairs[:, 0])
+    node_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.int64), (rows, columns.ravel())),
+        shape=(len(network_ids), len(node_ids)),
+    )
+    # duplicate pairs are summed when building the matrix
+    matrix.data[:] = 1
+
+    return Incidence(network_ids=network_ids, matrix=matrix)
+
+
+def _get_overlaps(
+    left_ids: np.ndarray,
+    left_sizes: np.ndarray,
+    right_ids: np.ndarray,
+    right_sizes: np.ndarray,
+    intersections: sparse.coo_matrix,
+) -> List[Tuple[int, int, float]]:
+    overlaps = intersections.data / np.minimum(left_sizes[intersections.row], right_sizes[intersections.col])
+    return list(zip(
+        left_ids[intersections.row].tolist(),
+        right_ids[intersections.col].tolist(),
+        overlaps.tolist(),
+    ))
+
+
+def calculate_overlaps(incidence: Incidence) -> List[Tuple[int, int, float]]:
+    """Calculate the overlaps between all pairs of networks that share nodes.
+
+    :return: Triples of the database identifiers of the two networks, the larger first, and their overlap, which is
+     the size of the intersection of their nodes divided by the size of the smaller network
+    """
+    intersections = sparse.tril(incidence.matrix @ incidence.matrix.T, k=-1, format='coo')
+    sizes = incidence.sizes
+    return _get_overlaps(incidence.network_ids, sizes, incidence.network_ids, sizes, intersections)
+
+
+def calculate_network_overlaps(incidence: Incidence, network_id: int) -> List[Tuple[int, int, float]]:
+    """Calculate the overlaps between one network in the incidence matrix and all others that share nodes with it.
+
+    :return: Triples like from :func:`calculate_overlaps`
+    """
+    row = np.searchsorted(incidence.network_ids, network_id)
+    if row == len(incidence.network_ids) or incidence.network_ids[row] != network_id:
+        raise ValueError(f'network {network_id} is not in the incidence matrix')
+
+    intersections = (incidence.matrix[row] @ incidence.matrix.T).tocoo()
+    mask = intersections.col != row
+    intersections = sparse.coo_matrix(
+        (intersections.data[mask], (intersections.row[mask], intersections.col[mask])),
+        shape=intersections.shape,
+    )
+
+    sizes = incidence.sizes
+    return [
+        (left_id, right_id, overlap) if left_id > right_id else (right_id, left_id, overlap)
+        for left_id, right_id, overlap in _get_overlaps(
+            incidence.network_ids[row:row + 1], sizes[row:row + 1], incidence.network_ids, sizes, intersections,
+        )
+    ]
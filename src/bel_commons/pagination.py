@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""Keyset pagination for API endpoints that list the contents of large networks.
+
+Instead of skipping rows with ``OFFSET``, which gets slower the deeper the page, each page is the next rows after the
+key of the last row of the previous page, ordered by that key. If the key is indexed, every page costs the same no
+matter how deep it is. The key of the last row is sent to the client in an opaque continuation token, which it sends
+back to get the next page.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from flask import Response, abort, jsonify, request
+from sqlalchemy.orm import Query
+
+__all__ = [
+    'Page',
+    'encode_cursor',
+    'decode_cursor',
+    'get_page',
+    'get_requested_page',
+    'jsonify_page',
+]
+
+#: The default number of rows in a page
+DEFAULT_PAGE_SIZE = 100
+#: The maximum number of rows in a page
+MAX_PAGE_SIZE = 1000
+
+
+class Page(NamedTuple):
+    """A page of rows."""
+
+    #: The rows in the page
+    items: List[Any]
+    #: The continuation token for the next page. If none, this is the last page.
+    next_cursor: Optional[str]
+
+
+def encode_cursor(key: int) -> str:
+    """Encode the key of the last row of a page as a continuation token."""
+    return base64.urlsafe_b64encode(json.dumps([key]).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode the key of the last row of the previous page from a continuation token.
+
+    :raises: werkzeug.exceptions.HTTPException
+    """
+    try:
+        key, = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        abort(400, f'invalid cursor: {cursor}')
+
+    if not isinstance(key, int):
+        abort(400, f'invalid cursor: {cursor}')
+
+    return key
+
+
+def get_page(query: Query, key, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+    """Get the page of rows after the continuation token.
+
+    :param query: A query for all the rows
+    :param key: The column by which the rows are ordered, which should be unique and indexed
+    :param cursor: The continuation token from the previous page. If none, gets the first page.
+    :param limit: The maximum number of rows in the page
+    """
+    if cursor is not None:
+        query = query.filter(key > decode_cursor(cursor))
+
+    # get one more row than needed to check if there's a next page
+    rows = query.add_columns(key).order_by(key).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return Page(items=[row[0] for row in rows], next_cursor=None)
+
+    rows = rows[:limit]
+    return Page(items=[row[0] for row in rows], next_cursor=encode_cursor(rows[-1][-1]))
+
+
+def get_requested_page(query: Query, key) -> Page:
+    """Get the page of rows requested with the ``cursor`` and ``limit`` arguments of the current request."""
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', type=int, default=DEFAULT_PAGE_SIZE)
+    if limit < 1:
+        abort(400, f'invalid limit: {limit}')
+    return get_page(query, key, cursor=cursor, limit=min(limit, MAX_PAGE_SIZE))
+
+
+def jsonify_page(page: Page, to_json: Callable[[Any], Any], total: Optional[int] = None) -> Response:
+    """Convert a page of rows to JSON.
+
+    :param page: A page of rows
+    :param to_json: A function that converts a row to JSON
+    :param total: An estimate of the total number of rows in all pages, if it's known
+    """
+    return jsonify(
+        items=[to_json(item) for item in page.items],
+        next=page.next_cursor,
+        total=total,
+    )
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+"""A cache for the responses of read-only API endpoints.
+
+Many endpoints only depend on data that doesn't change once it's stored, like the summary of a network or the
+PubMed identifiers in the result of a query, but recompute their response for each request. Decorating them with
+:func:`cache_response` computes an ETag from the *identity* of the data instead, which is much cheaper:
+
+1. If the client sends the ETag in ``If-None-Match``, it gets an empty ``304 Not Modified`` response.
+2. If the body for the ETag is in the :class:`ResponseCache`, it's sent without calling the view.
+3. Otherwise, the view is called and its body is stored in the cache.
+
+The identity functions are called for every request, so they're also where the current user's rights are checked.
+"""
+
+import hashlib
+import logging
+import pickle
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from flask import Response, current_app, make_response, request
+
+from .graph_cache import MemoryCacheBackend
+
+__all__ = [
+    'ResponseCache',
+    'cache_response',
+    'get_response_cache',
+]
+
+logger = logging.getLogger(__name__)
+
+#: The default maximum size of the response cache in bytes (64 MiB)
+DEFAULT_MAX_SIZE = 64 * 1024 ** 2
+
+
+class ResponseCache:
+    """Stores the bodies of responses by their ETags in a bounded, in-memory cache."""
+
+    def __init__(self, max_size: Optional[int] = DEFAULT_MAX_SIZE) -> None:
+        """Build a response cache.
+
+        :param max_size: The maximum total size of the stored bodies in bytes. The least recently used are evicted
+         beyond this size. If none, bodies are never evicted.
+        """
+        self.backend = MemoryCacheBackend(max_size=max_size)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag: str) -> Optional[Tuple[str, bytes]]:
+        """Get the MIME type and body of the response with the given ETag, if it's stored."""
+        value = self.backend.get(etag)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pickle.loads(value)
+
+    def set(self, etag: str, mimetype: str, body: bytes) -> None:
+        """Store the MIME type and body of the response with the given ETag."""
+        self.backend.set(etag, pickle.dumps((mimetype, body), protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the response cache of the current application, building it the first time it's needed."""
+    response_cache = current_app.extensions.get('response_cache')
+    if response_cache is None:
+        response_cache = current_app.extensions['response_cache'] = ResponseCache(
+            max_size=current_app.config.get('API_RESPONSE_CACHE_MAX_SIZE', DEFAULT_MAX_SIZE),
+        )
+    return response_cache
+
+
+def cache_response(get_identity: Callable[..., str]):
+    """Build a decorator that caches the responses of a read-only view.
+
+    :param get_identity: A function that takes the same arguments as the view and returns a string that changes
+     whenever the view's response would, like the graph cache key of a query. It has to abort if the current user
+     isn't allowed to see the response, since cached responses are sent without calling the view.
+
+    .. code-block:: python
+
+        @api_blueprint.route('/api/query/<int:query_id>/pmids/')
+        @cache_response(get_query_identity)
+        def get_all_pmids(query_id: int):
+            ...
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs) -> Response:
+            identity = get_identity(*args, **kwargs)
+            etag = hashlib.md5(f'{request.full_path}\n{identity}'.encode('utf-8')).hexdigest()
+
+            if etag in request.if_none_match:
+                return _set_cache_headers(current_app.response_class(status=304), etag)
+
+            response_cache = get_response_cache()
+            entry = response_cache.get(etag)
+            if entry is not None:
+                mimetype, body = entry
+                return _set_cache_headers(current_app.response_class(body, mimetype=mimetype), etag)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+
+            response_cache.set(etag, response.mimetype, response.get_data())
+            return _set_cache_headers(response, etag)
+
+        return wrapped
+
+    return decorator
+
+
+def _set_cache_headers(response: Response, etag: str) -> Response:
+    """Set the ETag and tell caches to revalidate the response, which only the current user is allowed to see."""
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config.get('API_RESPONSE_CACHE_MAX_AGE', 0)
+    return response
@@ -2,34 +2,95 @@
 
 """Utilities for rendering BEL graphs via the response."""
 
-from io import BytesIO, StringIO
-from operator import methodcaller
-from typing import Optional
+import json
+import time
+from collections import defaultdict
+from io import BytesIO
+from itertools import chain
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
 
-from flask import Response, jsonify, send_file
+from flask import Response, current_app, jsonify, send_file
 
 from pybel import (
-    BELGraph, to_bel_script_lines, to_bytes, to_csv, to_cx, to_graphdati, to_graphml, to_gsea, to_indra_statements_json,
-    to_jgif, to_nodelink, to_sif, to_umbrella_nodelink,
+    BELGraph, get_version as get_pybel_version, to_bel_script_lines, to_bytes, to_graphdati, to_graphml,
+    to_indra_statements_json, to_umbrella_nodelink,
 )
-from pybel.canonicalize import edge_to_bel
+from pybel.canonicalize import calculate_canonical_name, edge_to_bel
 from pybel.constants import (
-    CAUSAL_DECREASE_RELATIONS, CAUSAL_INCREASE_RELATIONS, DECREASES, FUSION, INCREASES, MEMBERS, RELATION,
-    TWO_WAY_RELATIONS, VARIANTS,
+    ANNOTATIONS, CAUSAL_DECREASE_RELATIONS, CAUSAL_INCREASE_RELATIONS, CITATION, DECREASES, EVIDENCE, FUSION,
+    GRAPH_ANNOTATION_LIST, GRAPH_ANNOTATION_PATTERN, GRAPH_ANNOTATION_URL, GRAPH_NAMESPACE_PATTERN, GRAPH_NAMESPACE_URL,
+    INCREASES, MEMBERS, NAME, OBJECT, PRODUCTS, REACTANTS, RELATION, SUBJECT, TWO_WAY_RELATIONS, VARIANTS,
 )
+from pybel.dsl import BaseAbundance, BaseEntity, CentralDogma
+from pybel.io.cx import CX_NODE_NAME, NDEX_SOURCE_FORMAT, _cleanse_fusion_dict
+from pybel.io.nodelink import _augment_node
 from pybel.struct.summary import get_pubmed_identifiers
+from pybel.typing import EdgeData
+from pybel.utils import flatten_dict
+from .streaming import JSONArray, JSONObject, iter_chunks, iter_json, stream_json, stream_lines
 
 __all__ = [
+    'CanonicalStrings',
     'to_json_custom',
+    'to_json_custom_stream',
+    'to_nodelink_stream',
+    'to_jgif_stream',
+    'to_cx_stream',
+    'iter_sif_lines',
+    'iter_csv_lines',
+    'iter_gsea_lines',
+    'EXPORT_FILE_TYPES',
+    'iter_network_bytes',
     'serve_network',
 ]
 
 
+class CanonicalStrings:
+    """A memo of the canonical BEL string of each node in a graph.
+
+    PyBEL builds a node's BEL string again each time the node is hashed or compared, so serializers look nodes up by
+    their identity here instead. The strings are also kept by the MD5 hashes of the nodes, which are stored on the
+    nodes when they are pickled, so they can be stored alongside a graph in the cache and reused when it's loaded.
+    """
+
+    def __init__(self, bels: Optional[Mapping[str, str]] = None) -> None:
+        """Initialize the memo.
+
+        :param bels: A dictionary from the MD5 hashes of nodes to their BEL strings from a previous memo
+        """
+        self.bels: Dict[str, str] = dict(bels or {})
+        #: Whether any BEL strings have been added since the memo was initialized
+        self.changed = False
+        # keep a reference to each node so its identifier isn't reused while it's in the memo
+        self._bels_by_id: Dict[int, Tuple[BaseEntity, str]] = {}
+
+    def get_bel(self, node: BaseEntity) -> str:
+        """Get the BEL string of the node."""
+        entry = self._bels_by_id.get(id(node))
+        if entry is not None:
+            return entry[1]
+
+        bel = self.bels.get(node.md5)
+        if bel is None:
+            bel = self.bels[node.md5] = node.as_bel()
+            self.changed = True
+
+        self._bels_by_id[id(node)] = node, bel
+        return bel
+
+    def get_edge_bel(self, u: BaseEntity, v: BaseEntity, data: EdgeData, sep: str = ' ') -> str:
+        """Get the BEL string of the edge, like :func:`pybel.canonicalize.edge_to_bel`."""
+        if SUBJECT in data or OBJECT in data:  # the modifiers of the nodes are written with them
+            return edge_to_bel(u, v, data, sep=sep)
+        return sep.join((self.get_bel(u), data[RELATION], self.get_bel(v)))
+
+
 def to_json_custom(
     graph: BELGraph,
     id_key: str = 'id',
     source_key: str = 'source',
     target_key: str = 'target',
+    canonical: Optional[CanonicalStrings] = None,
 ):
     """Prepare JSON for the biological network explorer.
 
@@ -37,67 +98,494 @@ def to_json_custom(
     :param id_key: The key to use for the identifier of a node, which is calculated with an enumeration
     :param source_key: The key to use for the source node
     :param target_key: The key to use for the target node
+    :param canonical: A memo of the BEL strings of the nodes in the graph. If none, a new one is used.
     :rtype: dict
     """
-    result = {}
-    mapping = {}
+    stream = to_json_custom_stream(
+        graph,
+        id_key=id_key,
+        source_key=source_key,
+        target_key=target_key,
+        canonical=canonical,
+    )
+    return {
+        key: list(value.elements)
+        for key, value in stream.items
+    }
+
+
+def to_json_custom_stream(
+    graph: BELGraph,
+    id_key: str = 'id',
+    source_key: str = 'source',
+    target_key: str = 'target',
+    canonical: Optional[CanonicalStrings] = None,
+) -> JSONObject:
+    """Prepare JSON for the biological network explorer like :func:`to_json_custom` that's built while it's streamed.
 
-    result['nodes'] = []
-    for i, node in enumerate(sorted(graph, key=methodcaller('as_bel'))):
-        data = node.copy()
-        data[id_key] = node.md5
-        data['bel'] = node.as_bel()
-        if any(attr in data for attr in (VARIANTS, FUSION, MEMBERS)):
-            data['cname'] = data['bel']
+    The nodes are sorted and added to the memo of BEL strings before this function returns, so the memo can be stored
+    before the response is streamed.
+    """
+    if canonical is None:
+        canonical = CanonicalStrings()
+
+    nodes = sorted(graph, key=canonical.get_bel)
+    mapping = {
+        canonical.get_bel(node): i
+        for i, node in enumerate(nodes)
+    }
+
+    def iter_nodes() -> Iterable[Dict[str, Any]]:
+        for node in nodes:
+            data = node.copy()
+            data[id_key] = node.md5
+            data['bel'] = canonical.get_bel(node)
+            if any(attr in data for attr in (VARIANTS, FUSION, MEMBERS)):
+                data['cname'] = data['bel']
+            yield data
+
+    def iter_links() -> Iterable[Dict[str, Any]]:
+        # all edges between the same source and target are next to each other, so each link is finished as soon as
+        # an edge between another pair of nodes comes up
+        link = None
+
+        for u, v, key, data in graph.edges(keys=True, data=True):
+            u_bel, v_bel = canonical.get_bel(u), canonical.get_bel(v)
+            if data[RELATION] in TWO_WAY_RELATIONS and v_bel < u_bel:
+                continue  # don't keep two way edges twice
+
+            entry_code = mapping[u_bel], mapping[v_bel]
+
+            # Avoids duplicate sending multiple edges between nodes with same relation
+            if link is None or (link[source_key], link[target_key]) != entry_code:
+                if link is not None:
+                    yield link
+                link = {
+                    source_key: entry_code[0],
+                    target_key: entry_code[1],
+                    'contexts': [],
+                }
+
+            payload = {
+                'id': key,
+                'bel': canonical.get_edge_bel(u, v, data),
+            }
+            payload.update(data)
+
+            if data[RELATION] in CAUSAL_INCREASE_RELATIONS:
+                link[RELATION] = INCREASES
+
+            elif data[RELATION] in CAUSAL_DECREASE_RELATIONS:
+                link[RELATION] = DECREASES
+
+            link['contexts'].append(payload)
+
+        if link is not None:
+            yield link
+
+    return JSONObject([
+        ('nodes', JSONArray(iter_nodes())),
+        ('links', JSONArray(iter_links())),
+    ])
+
+
+def to_nodelink_stream(graph: BELGraph, canonical: Optional[CanonicalStrings] = None) -> JSONObject:
+    """Prepare node-link JSON like :func:`pybel.to_nodelink` that's built while it's streamed."""
+    if canonical is None:
+        canonical = CanonicalStrings()
+
+    nodes = sorted(graph, key=canonical.get_bel)
+    mapping = {
+        canonical.get_bel(node): i
+        for i, node in enumerate(nodes)
+    }
+
+    graph_data = graph.graph.copy()
+    graph_data[GRAPH_ANNOTATION_LIST] = {
+        keyword: sorted(values)
+        for keyword, values in graph_data.get(GRAPH_ANNOTATION_LIST, {}).items()
+    }
+
+    links = (
+        dict(chain(
+            data.items(),
+            [('source', mapping[canonical.get_bel(u)]), ('target', mapping[canonical.get_bel(v)]), ('key', key)],
+        ))
+        for u, v, key, data in graph.edges(keys=True, data=True)
+    )
+
+    return JSONObject([
+        ('directed', True),
+        ('multigraph', True),
+        ('graph', graph_data),
+        ('nodes', JSONArray(_augment_node(node) for node in nodes)),
+        ('links', JSONArray(links)),
+    ])
+
+
+def to_jgif_stream(graph: BELGraph, canonical: Optional[CanonicalStrings] = None) -> JSONObject:
+    """Prepare JGIF like :func:`pybel.to_jgif` that's built while it's streamed."""
+    if canonical is None:
+        canonical = CanonicalStrings()
+
+    nodes = sorted(graph, key=canonical.get_bel)
+
+    nodes_entry = (
+        {
+            'id': node.md5,
+            'label': canonical.get_bel(node),
+            'bel_function_type': node.function,
+        }
+        for node in nodes
+    )
+
+    def iter_edges() -> Iterable[Dict[str, Any]]:
+        for u, v in graph.edges():
+            relation_bels = {}
+            relation_evidences = defaultdict(list)
+
+            for key, data in graph[u][v].items():
+                if data[RELATION] not in relation_bels:
+                    relation_bels[data[RELATION]] = canonical.get_edge_bel(u, v, data)
+
+                evidence_dict = {
+                    'bel_statement': relation_bels[data[RELATION]],
+                    'key': key,
+                }
+
+                if ANNOTATIONS in data:
+                    evidence_dict['experiment_context'] = data[ANNOTATIONS]
+
+                if EVIDENCE in data:
+                    evidence_dict['summary_text'] = data[EVIDENCE]
+
+                if CITATION in data:
+                    evidence_dict['citation'] = data[CITATION]
+
+                relation_evidences[data[RELATION]].append(evidence_dict)
+
+            for relation, evidences in relation_evidences.items():
+                yield {
+                    'source': u.md5,
+                    'target': v.md5,
+                    'relation': relation,
+                    'label': relation_bels[relation],
+                    'metadata': {
+                        'evidences': evidences,
+                    },
+                }
+
+    metadata = dict(
+        origin=dict(name='pybel', version=get_pybel_version()),
+        **graph.document,
+    )
+
+    return JSONObject([
+        ('graph', JSONObject([
+            ('metadata', metadata),
+            ('nodes', JSONArray(nodes_entry)),
+            ('edges', JSONArray(iter_edges())),
+        ])),
+    ])
+
+
+def to_cx_stream(graph: BELGraph, canonical: Optional[CanonicalStrings] = None) -> JSONArray:  # noqa: C901
+    """Prepare CX like :func:`pybel.to_cx` that's built while it's streamed.
+
+    The metadata at the beginning of CX has the number of elements in each aspect, so the attributes of the nodes
+    and edges are generated once to count them and again while they're streamed.
+    """
+    if canonical is None:
+        canonical = CanonicalStrings()
+
+    nodes = sorted(graph, key=canonical.get_bel)
+    node_mapping = {
+        canonical.get_bel(node): node_index
+        for node_index, node in enumerate(nodes)
+    }
+
+    def iter_nodes() -> Iterable[Dict[str, Any]]:
+        for node_index, node in enumerate(nodes):
+            node_entry_dict = {
+                '@id': node_index,
+                'n': calculate_canonical_name(node),
+            }
+            if isinstance(node, BaseAbundance):
+                node_entry_dict['r'] = node.curie
+            yield node_entry_dict
+
+    def iter_node_attributes() -> Iterable[Dict[str, Any]]:
+        for node_index, node in enumerate(nodes):
+            aliases = []
+            if isinstance(node, BaseAbundance):
+                aliases.extend(xref.curie for xref in node.xrefs)
+
+            if aliases:
+                yield {
+                    'po': node_index,
+                    'n': 'alias',
+                    'v': aliases,
+                    'd': 'list_of_str',
+                }
+
+            for k, v in node.items():
+                if k == VARIANTS:
+                    for i, el in enumerate(v):
+                        for a, b in flatten_dict(el).items():
+                            yield {'po': node_index, 'n': f'{k}_{i}_{a}', 'v': b}
+                elif k == FUSION:
+                    for a, b in flatten_dict(_cleanse_fusion_dict(v)).items():
+                        yield {'po': node_index, 'n': f'{k}_{a}', 'v': b}
+                elif k == NAME:
+                    yield {'po': node_index, 'n': CX_NODE_NAME, 'v': v}
+                elif k in {PRODUCTS, REACTANTS, MEMBERS}:
+                    yield {'po': node_index, 'n': k, 'v': json.dumps(v)}
+                else:
+                    yield {'po': node_index, 'n': k, 'v': v}
+
+    def iter_edges() -> Iterable[Dict[str, Any]]:
+        for edge_index, (source, target, d) in enumerate(graph.edges(data=True)):
+            yield {
+                '@id': edge_index,
+                's': node_mapping[canonical.get_bel(source)],
+                't': node_mapping[canonical.get_bel(target)],
+                'i': d[RELATION],
+            }
 
-        result['nodes'].append(data)
-        mapping[node] = i
+    def iter_edge_attributes() -> Iterable[Dict[str, Any]]:
+        for edge_index, (_, _, d) in enumerate(graph.edges(data=True)):
+            if EVIDENCE in d:
+                yield {'po': edge_index, 'n': EVIDENCE, 'v': d[EVIDENCE]}
+                for k, v in d[CITATION].items():
+                    yield {'po': edge_index, 'n': f'{CITATION}_{k}', 'v': v}
+
+            if ANNOTATIONS in d:
+                for annotation, values in d[ANNOTATIONS].items():
+                    yield {'po': edge_index, 'n': annotation, 'v': sorted(values), 'd': 'list_of_string'}
+
+            for position in (SUBJECT, OBJECT):
+                if position in d:
+                    for k, v in flatten_dict(d[position]).items():
+                        yield {'po': edge_index, 'n': f'{position}_{k}', 'v': v}
+
+    context_legend = {}
+    for key in graph.namespace_url:
+        context_legend[key] = GRAPH_NAMESPACE_URL
+    for key in graph.namespace_pattern:
+        context_legend[key] = GRAPH_NAMESPACE_PATTERN
+    for key in graph.annotation_url:
+        context_legend[key] = GRAPH_ANNOTATION_URL
+    for key in graph.annotation_pattern:
+        context_legend[key] = GRAPH_ANNOTATION_PATTERN
+    for key in graph.annotation_list:
+        context_legend[key] = GRAPH_ANNOTATION_LIST
+
+    context_legend_entry = [
+        {'k': keyword, 'v': resource_type}
+        for keyword, resource_type in context_legend.items()
+    ]
+
+    annotation_list_keys_lookup = {keyword: i for i, keyword in enumerate(sorted(graph.annotation_list))}
+    annotation_lists_entry = [
+        {'k': annotation_list_keys_lookup[keyword], 'v': v}
+        for keyword, values in graph.annotation_list.items()
+        for v in values
+    ]
+
+    context_entry_dict = {}
+    context_entry_dict.update(graph.namespace_url)
+    context_entry_dict.update(graph.namespace_pattern)
+    context_entry_dict.update(graph.annotation_url)
+    context_entry_dict.update(graph.annotation_pattern)
+    context_entry_dict.update(annotation_list_keys_lookup)
+
+    network_attributes_entry = [{'n': NDEX_SOURCE_FORMAT, 'v': 'PyBEL'}]
+    network_attributes_entry.extend(
+        {'n': k, 'v': v}
+        for k, v in graph.document.items()
+    )
+
+    # each aspect has a function to generate its elements and the number of elements
+    cx_aspects = [
+        ('@context', lambda: [context_entry_dict], 1),
+        ('context_legend', lambda: context_legend_entry, len(context_legend_entry)),
+        ('annotation_lists', lambda: annotation_lists_entry, len(annotation_lists_entry)),
+        ('networkAttributes', lambda: network_attributes_entry, len(network_attributes_entry)),
+        ('nodes', iter_nodes, len(nodes)),
+        ('nodeAttributes', iter_node_attributes, sum(1 for _ in iter_node_attributes())),
+        ('edges', iter_edges, graph.number_of_edges()),
+        ('edgeAttributes', iter_edge_attributes, sum(1 for _ in iter_edge_attributes())),
+    ]
+
+    cx_metadata = []
+    for key, _, element_count in cx_aspects:
+        aspect_dict = {
+            'name': key,
+            'elementCount': element_count,
+            'lastUpdate': time.time(),
+            'consistencyGroup': 1,
+            'properties': [],
+            'version': '1.0',
+        }
+        if key in {'citations', 'supports', 'nodes', 'edges'}:
+            aspect_dict['idCounter'] = element_count
+        cx_metadata.append(aspect_dict)
+
+    return JSONArray(chain(
+        [
+            {'numberVerification': [{'longNumber': 281474976710655}]},
+            {'metaData': cx_metadata},
+        ],
+        (
+            JSONObject([(key, JSONArray(iter_elements()))])
+            for key, iter_elements, _ in cx_aspects
+        ),
+        [
+            {'status': [{'error': '', 'success': True}]},
+        ],
+    ))
+
+
+def iter_sif_lines(graph: BELGraph, canonical: Optional[CanonicalStrings] = None) -> Iterable[str]:
+    """Iterate over the lines of the graph as a tab-separated SIF file, like :func:`pybel.to_sif`."""
+    if canonical is None:
+        canonical = CanonicalStrings()
+
+    for u, v, data in graph.edges(data=True):
+        yield canonical.get_edge_bel(u, v, data, sep='\t')
+
+
+def iter_csv_lines(graph: BELGraph, canonical: Optional[CanonicalStrings] = None) -> Iterable[str]:
+    """Iterate over the lines of the graph as a tab-separated edge list, like :func:`pybel.to_csv`."""
+    if canonical is None:
+        canonical = CanonicalStrings()
+
+    for u, v, data in graph.edges(data=True):
+        edge_bel = canonical.get_edge_bel(u, v, data, sep='\t')
+        yield f'{edge_bel}\t{json.dumps(data)}'
+
+
+def iter_gsea_lines(graph: BELGraph) -> Iterable[str]:
+    """Iterate over the lines of the GRP file of the HGNC genes in the graph, like :func:`pybel.to_gsea`."""
+    yield f'# {graph.name}'
+    yield from sorted({
+        node.name
+        for node in graph
+        if isinstance(node, CentralDogma) and node.namespace.lower() == 'hgnc'
+    })
+
+
+#: The MIME type of each export format and the suffix of the name of its file, or none if it's shown inline
+EXPORT_FILE_TYPES: Mapping[Optional[str], Tuple[str, Optional[str]]] = {
+    None: ('application/json', None),
+    'nl': ('application/json', None),
+    'nodelink': ('application/json', None),
+    'json': ('application/json', None),
+    'nodelink-umbrella': ('application/json', None),
+    'graphdati': ('application/json', None),
+    'cx': ('application/json', None),
+    'jgif': ('application/json', None),
+    'indra': ('application/json', None),
+    'bytes': ('application/octet-stream', '.bel.pickle'),
+    'bel': ('text/plain', None),
+    'graphml': ('text/xml', '.bel.graphml'),
+    'graphml-umbrella': ('text/xml', '.bel.graphml'),
+    'sif': ('text/plain', '.bel.sif'),
+    'csv': ('text/tab-separated-values', '.bel.tsv'),
+    'gsea': ('text/plain', '.grp'),
+    'citations': ('text/tab-separated-values', '-citations.txt'),
+}
+
+
+def iter_network_bytes(  # noqa:C901
+    graph: BELGraph,
+    serve_format: Optional[str] = None,
+    canonical: Optional[CanonicalStrings] = None,
+) -> Iterable[bytes]:
+    """Iterate over the chunks of the graph serialized in the given format, like :func:`serve_network` sends it.
 
-    edge_set = set()
+    :param graph: A BEL graph
+    :param serve_format: The format to serialize the graph in. If none, uses the JSON for the network explorer.
+    :param canonical: A memo of the BEL strings of the nodes in the graph
+    :raises TypeError: If the format isn't one of :data:`EXPORT_FILE_TYPES`
+    """
+    if serve_format is None:
+        return iter_chunks(iter_json(to_json_custom_stream(graph, canonical=canonical)))
 
-    rr = {}
+    elif serve_format in {'nl', 'nodelink', 'json'}:
+        return iter_chunks(iter_json(to_nodelink_stream(graph, canonical=canonical)))
 
-    for u, v, key, data in graph.edges(keys=True, data=True):
-        if data[RELATION] in TWO_WAY_RELATIONS and (u, v) != tuple(sorted((u, v), key=methodcaller('as_bel'))):
-            continue  # don't keep two way edges twice
+    elif serve_format == 'nodelink-umbrella':
+        return _iter_json_bytes(to_umbrella_nodelink(graph))
 
-        entry_code = u, v
+    elif serve_format == 'graphdati':
+        return _iter_json_bytes(to_graphdati(graph))
 
-        if entry_code not in edge_set:  # Avoids duplicate sending multiple edges between nodes with same relation
-            rr[entry_code] = {
-                source_key: mapping[u],
-                target_key: mapping[v],
-                'contexts': [],
-            }
+    elif serve_format == 'cx':
+        return iter_chunks(iter_json(to_cx_stream(graph, canonical=canonical)))
 
-            edge_set.add(entry_code)
+    elif serve_format == 'jgif':
+        return iter_chunks(iter_json(to_jgif_stream(graph, canonical=canonical)))
 
-        payload = {
-            'id': key,
-            'bel': edge_to_bel(u, v, data),
-        }
-        payload.update(data)
+    elif serve_format == 'indra':
+        return _iter_json_bytes(to_indra_statements_json(graph))
 
-        if data[RELATION] in CAUSAL_INCREASE_RELATIONS:
-            rr[entry_code][RELATION] = INCREASES
+    elif serve_format == 'bytes':
+        return iter([to_bytes(graph)])
 
-        elif data[RELATION] in CAUSAL_DECREASE_RELATIONS:
-            rr[entry_code][RELATION] = DECREASES
+    elif serve_format == 'bel':
+        return _iter_line_bytes(to_bel_script_lines(graph))
 
-        rr[entry_code]['contexts'].append(payload)
+    elif serve_format in {'graphml', 'graphml-umbrella'}:
+        bio = BytesIO()
+        to_graphml(graph, bio, schema='umbrella' if serve_format == 'graphml-umbrella' else 'simple')
+        return iter([bio.getvalue()])
 
-    result['links'] = list(rr.values())
+    elif serve_format == 'sif':
+        return _iter_line_bytes(iter_sif_lines(graph, canonical=canonical))
+
+    elif serve_format == 'csv':
+        return _iter_line_bytes(iter_csv_lines(graph, canonical=canonical))
+
+    elif serve_format == 'gsea':
+        return _iter_line_bytes(iter_gsea_lines(graph))
+
+    elif serve_format == 'citations':
+        return _iter_line_bytes(sorted(get_pubmed_identifiers(graph)))
+
+    raise TypeError(f'{serve_format} is not a valid format')
 
-    return result
 
+def _iter_json_bytes(value: Any) -> Iterable[bytes]:
+    return iter_chunks(iter_json(value))
+
+
+def _iter_line_bytes(lines: Iterable[str]) -> Iterable[bytes]:
+    return iter_chunks(f'{line}\n' for line in lines)
+
+
+def serve_network(  # noqa:C901
+    graph: BELGraph,
+    serve_format: Optional[str] = None,
+    canonical: Optional[CanonicalStrings] = None,
+    compress: Optional[bool] = None,
+) -> Response:
+    """Help serialize a graph and download as a file.
+
+    :param graph: A BEL graph
+    :param serve_format: The format to serialize the graph in. If none, uses the JSON for the network explorer.
+    :param canonical: A memo of the BEL strings of the nodes in the graph for the streamed formats
+    :param compress: Should the streamed text formats be compressed with gzip, if the client accepts it? Defaults
+     to the ``EXPORT_COMPRESS`` configuration.
+    """
+    if compress is None:
+        compress = current_app.config.get('EXPORT_COMPRESS', False)
 
-def serve_network(graph: BELGraph, serve_format: Optional[str] = None) -> Response:  # noqa:C901
-    """Help serialize a graph and download as a file."""
     if serve_format is None:
-        return jsonify(to_json_custom(graph))
+        return stream_json(to_json_custom_stream(graph, canonical=canonical))
 
     elif serve_format in {'nl', 'nodelink', 'json'}:
-        return jsonify(to_nodelink(graph))
+        return stream_json(to_nodelink_stream(graph, canonical=canonical))
 
     elif serve_format == 'nodelink-umbrella':
         return jsonify(to_umbrella_nodelink(graph))
@@ -106,10 +594,10 @@ def serve_network(graph: BELGraph, serve_format: Optional[str] = None) -> Respon
         return jsonify(to_graphdati(graph))
 
     elif serve_format == 'cx':
-        return jsonify(to_cx(graph))
+        return stream_json(to_cx_stream(graph, canonical=canonical))
 
     elif serve_format == 'jgif':
-        return jsonify(to_jgif(graph))
+        return stream_json(to_jgif_stream(graph, canonical=canonical))
 
     elif serve_format == 'indra':
         return jsonify(to_indra_statements_json(graph))
@@ -124,8 +612,7 @@ def serve_network(graph: BELGraph, serve_format: Optional[str] = None) -> Respon
         )
 
     elif serve_format == 'bel':
-        data = '\n'.join(to_bel_script_lines(graph))
-        return Response(data, mimetype='text/plain')
+        return stream_lines(to_bel_script_lines(graph), compress=compress)
 
     elif serve_format == 'graphml':
         bio = BytesIO()
@@ -150,52 +637,33 @@ def serve_network(graph: BELGraph, serve_format: Optional[str] = None) -> Respon
         )
 
     elif serve_format == 'sif':
-        bio = StringIO()
-        to_sif(graph, bio)
-        bio.seek(0)
-        data = BytesIO(bio.read().encode('utf-8'))
-        return send_file(
-            data,
-            attachment_filename=f"{graph.name}.bel.sif",
-            as_attachment=True,
+        return stream_lines(
+            iter_sif_lines(graph, canonical=canonical),
+            attachment_filename=f'{graph.name}.bel.sif',
+            compress=compress,
         )
 
     elif serve_format == 'csv':
-        bio = StringIO()
-        to_csv(graph, bio)
-        bio.seek(0)
-        data = BytesIO(bio.read().encode('utf-8'))
-        return send_file(
-            data,
-            mimetype="text/tab-separated-values",
-            attachment_filename=f"{graph.name}.bel.tsv",
-            as_attachment=True,
+        return stream_lines(
+            iter_csv_lines(graph, canonical=canonical),
+            mimetype='text/tab-separated-values',
+            attachment_filename=f'{graph.name}.bel.tsv',
+            compress=compress,
         )
 
     elif serve_format == 'gsea':
-        bio = StringIO()
-        to_gsea(graph, bio)
-        bio.seek(0)
-        data = BytesIO(bio.read().encode('utf-8'))
-        return send_file(
-            data,
-            attachment_filename=f"{graph.name}.grp",
-            as_attachment=True,
+        return stream_lines(
+            iter_gsea_lines(graph),
+            attachment_filename=f'{graph.name}.grp',
+            compress=compress,
         )
 
     elif serve_format == 'citations':
-        bio = StringIO()
-
-        for pubmed_identifier in sorted(get_pubmed_identifiers(graph)):
-            print(pubmed_identifier, file=bio)
-
-        bio.seek(0)
-        data = BytesIO(bio.read().encode('utf-8'))
-        return send_file(
-            data,
-            mimetype="text/tab-separated-values",
-            attachment_filename=f"{graph.name}-citations.txt",
-            as_attachment=True,
+        return stream_lines(
+            sorted(get_pubmed_identifiers(graph)),
+            mimetype='text/tab-separated-values',
+            attachment_filename=f'{graph.name}-citations.txt',
+            compress=compress,
         )
 
     raise TypeError(f'{serve_format} is not a valid format')
@@ -1581,15 +1581,21 @@ function initD3Force(graph, tree) {
 
     /**
      * Process the response of shortest/all paths and highlight nodes/edges in them
-     * @param {array} paths array containing path or paths
+     * @param {array|object} paths array containing the shortest path, or object containing all paths
      * @param {boolean} checkbox boolean (hide other nodes if true)
      * @param {string} pathMethods if "all" -> all paths else-> shortests
-     * @example colorPaths([[1,34,5,56],[123,234,3,4]], ,false)
+     * @example colorPaths({"paths": [[1,34,5,56],[123,234,3,4]], "truncated": false, "reason": null}, ,"all")
      */
     function handlePathResponse(paths, checkbox, pathMethods) {
         if (pathMethods === "all") {
+            var truncated = paths.truncated;
+            var reason = paths.reason;
+            paths = paths.paths;
+
             if (paths.length === 0) {
-                alert("No paths between the selected nodes");
+                alert(truncated ? "No paths found before the search was stopped (" + reason + ")" : "No paths between the selected nodes");
+            } else if (truncated) {
+                alert("Only showing the first " + paths.length + " paths because the search was stopped (" + reason + ")");
             }
 
             resetAttributes();
@@ -1902,36 +1908,66 @@ function initD3Force(graph, tree) {
 
     betweennessButton.off("click"); // It will unbind the previous click if multiple graphs has been rendered
 
-    betweennessButton.on("click", function () {
-        if (betwennessForm.valid()) {
-            $.ajax({
-                url: "/api/query/" + window.query + "/centrality/" + betwennessForm.find("input[name='betweenness']").val(),
-                type: betwennessForm.attr("method"),
-                dataType: "json",
-                success: function (data) {
+    // Poll the celery task calculating the betweenness centrality, then request the top nodes from its result
+    function pollBetweennessTask(taskId, statusUrl) {
+        $.getJSON(statusUrl, function (task) {
+            if (task.status === "SUCCESS") {
+                requestBetweenness(taskId);
+            } else if (task.status === "FAILURE" || task.status === "REVOKED") {
+                alert("Calculating the betweenness centrality failed");
+            } else {
+                setTimeout(function () {
+                    pollBetweennessTask(taskId, statusUrl);
+                }, 2000);
+            }
+        });
+    }
 
-                    var nodesToIncrease = nodesInArrayKeepOrder(data, 'id');
+    function requestBetweenness(taskId) {
+        $.ajax({
+            url: "/api/query/" + window.query + "/centrality/" + betwennessForm.find("input[name='betweenness']").val(),
+            type: betwennessForm.attr("method"),
+            data: taskId === undefined ? {} : {task: taskId},
+            dataType: "json",
+            success: function (data, textStatus, request) {
+
+                // The betweenness centrality of large graphs is calculated in the background
+                if (request.status === 202) {
+                    if (taskId === undefined) {
+                        pollBetweennessTask(data.task_id, data.status_url);
+                    } else {
+                        alert("Calculating the betweenness centrality failed");
+                    }
+                    return;
+                }
 
-                    var nodesToReduce = nodesNotInArray(data, 'id');
+                var nodesToIncrease = nodesInArrayKeepOrder(data, 'id');
 
-                    // Reduce to 7 radius the nodes not in top x
-                    $.each(nodesToReduce._groups[0], function (index, value) {
-                        value.childNodes[0].setAttribute("r", "7");
-                    });
+                var nodesToReduce = nodesNotInArray(data, 'id');
 
-                    // Make bigger by factor scale the nodes in the top x
-                    var nodeFactor = (nominalBaseNodeSize / 3) / nodesToIncrease.length;
-                    var factor = nominalBaseNodeSize + nodeFactor;
+                // Reduce to 7 radius the nodes not in top x
+                $.each(nodesToReduce._groups[0], function (index, value) {
+                    value.childNodes[0].setAttribute("r", "7");
+                });
 
-                    $.each(nodesToIncrease.reverse(), function (index, value) {
-                        value.childNodes[0].setAttribute("r", factor);
-                        factor += nodeFactor;
-                    });
-                },
-                error: function (request) {
-                    alert(request.responseText);
-                }
-            })
+                // Make bigger by factor scale the nodes in the top x
+                var nodeFactor = (nominalBaseNodeSize / 3) / nodesToIncrease.length;
+                var factor = nominalBaseNodeSize + nodeFactor;
+
+                $.each(nodesToIncrease.reverse(), function (index, value) {
+                    value.childNodes[0].setAttribute("r", factor);
+                    factor += nodeFactor;
+                });
+            },
+            error: function (request) {
+                alert(request.responseText);
+            }
+        })
+    }
+
+    betweennessButton.on("click", function () {
+        if (betwennessForm.valid()) {
+            requestBetweenness();
         }
     });
 
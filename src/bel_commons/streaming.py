@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""Utilities for streaming large payloads in the response.
+
+Instead of building the whole payload in memory and passing it to :func:`flask.jsonify`, the parts of the payload
+that grow with the size of a graph are wrapped in a :class:`JSONArray` or :class:`JSONObject` around a generator.
+:func:`iter_json` then encodes them one element at a time, so only one element is in memory at once. Text exports
+are streamed line by line with :func:`stream_lines`, optionally compressed with gzip as they're sent.
+"""
+
+import json
+import zlib
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+import flask
+from flask import Response, request, stream_with_context
+from werkzeug.datastructures import Headers
+
+__all__ = [
+    'JSONArray',
+    'JSONObject',
+    'iter_json',
+    'iter_chunks',
+    'iter_gzip',
+    'stream_json',
+    'stream_lines',
+]
+
+#: The number of characters to buffer before sending a chunk of the response
+CHUNK_SIZE = 2 ** 16
+
+
+class JSONArray:
+    """An iterable that is encoded as a JSON array one element at a time."""
+
+    def __init__(self, elements: Iterable[Any]) -> None:  # noqa: D107
+        self.elements = elements
+
+
+class JSONObject:
+    """An iterable of pairs of keys and values that is encoded as a JSON object one value at a time."""
+
+    def __init__(self, items: Iterable[Tuple[str, Any]]) -> None:  # noqa: D107
+        self.items = items
+
+
+def iter_json(value: Any, dumps: Callable[[Any], str] = json.dumps) -> Iterable[str]:
+    """Encode the value as JSON in parts.
+
+    :param value: A value that can be encoded as JSON or a :class:`JSONArray` or :class:`JSONObject`, which can
+     themselves contain either
+    :param dumps: The function for encoding values that aren't streamed
+    """
+    if isinstance(value, JSONArray):
+        yield '['
+        for i, element in enumerate(value.elements):
+            if i:
+                yield ','
+            yield from iter_json(element, dumps=dumps)
+        yield ']'
+
+    elif isinstance(value, JSONObject):
+        yield '{'
+        for i, (key, element) in enumerate(value.items):
+            if i:
+                yield ','
+            yield dumps(key)
+            yield ':'
+            yield from iter_json(element, dumps=dumps)
+        yield '}'
+
+    else:
+        yield dumps(value)
+
+
+def iter_chunks(parts: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterable[bytes]:
+    """Join the parts of a payload into chunks of at least the given size and encode them with UTF-8."""
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def iter_gzip(chunks: Iterable[bytes], level: int = 6) -> Iterable[bytes]:
+    """Compress the chunks of a payload in the gzip format as they're generated."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # add 16 to write the gzip header
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_lines(
+    lines: Iterable[str],
+    mimetype: str = 'text/plain',
+    attachment_filename: Optional[str] = None,
+    compress: bool = False,
+) -> Response:
+    """Stream the lines of a text file in the response.
+
+    :param lines: The lines of the file, without line breaks
+    :param mimetype: The MIME type of the file
+    :param attachment_filename: The name of the file for the browser to download it as. If none, it's shown inline.
+    :param compress: Should the response be compressed with gzip, if the client accepts it?
+    """
+    chunks = iter_chunks(f'{line}\n' for line in lines)
+
+    headers = Headers()
+    if attachment_filename is not None:
+        headers.set('Content-Disposition', 'attachment', filename=attachment_filename)
+
+    if compress:
+        headers.add('Vary', 'Accept-Encoding')
+        if 'gzip' in request.accept_encodings:
+            headers.set('Content-Encoding', 'gzip')
+            chunks = iter_gzip(chunks)
+
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+
+def stream_json(value: Any) -> Response:
+    """Stream the value as JSON in the response with the application's JSON encoder."""
+    parts = iter_json(value, dumps=_dumps_compact)
+    return Response(stream_with_context(iter_chunks(parts)), mimetype='application/json')
+
+
+def _dumps_compact(value: Any) -> str:
+    return flask.json.dumps(value, separators=(',', ':'))
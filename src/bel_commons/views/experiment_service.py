@@ -24,7 +24,7 @@ from ..celery_worker import celery_app
 from ..core import manager
 from ..forms import DifferentialGeneExpressionForm
 from ..manager_utils import create_omic, next_or_jsonify
-from ..models import Experiment, Omic, UserQuery
+from ..models import Experiment, Omic
 from ..tools_compat import RESULT_LABELS
 from ..utils import SecurityConfigurableBlueprint as Blueprint
 
@@ -241,11 +241,11 @@ def view_query_uploader(query_id: int):
 def view_network_uploader(network_id: int):
     """View the -*omics* data uploader for the given network."""
     network = manager.cu_get_network_by_id_or_404(network_id)
-    user_query = UserQuery.from_network(network=network, user=current_user)
-    manager.session.add(user_query)
+    query = manager.get_or_create_query(networks=[network])
+    manager.get_or_create_user_query(query=query, user=current_user)
     manager.session.commit()
 
-    return redirect(url_for('.view_query_uploader', query_id=user_query.query_id))
+    return redirect(url_for('.view_query_uploader', query_id=query.id))
 
 
 @experiment_blueprint.route('/comparison/<list:experiment_ids>.tsv')
@@ -22,6 +22,7 @@ from bel_commons.core import butler, manager, user_datastore
 from bel_commons.database_service import api_blueprint
 from bel_commons.ext import bio2bel, bootstrap, db, mail, security, swagger
 from bel_commons.forms import ExtendedRegisterForm
+from bel_commons.json_provider import init_json
 from bel_commons.main_service import ui_blueprint
 from bel_commons.utils import send_startup_mail
 from bel_commons.views import (
@@ -45,6 +46,7 @@ logger.info('logging to %s', log_path)
 
 flask_app = Flask(__name__)
 flask_app.config.update(BELCommonsConfig.load_dict())
+init_json(flask_app)
 
 # Add converters
 flask_app.url_map.converters.update({
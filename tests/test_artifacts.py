@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the store of pre-rendered network exports."""
+
+import os
+import tempfile
+import unittest
+
+from flask import Flask
+
+from bel_commons.artifacts import ArtifactStore, serve_artifact
+from bel_commons.send_utils import EXPORT_FILE_TYPES, iter_network_bytes, serve_network
+from pybel.examples import sialic_acid_graph
+
+
+class TestArtifactStore(unittest.TestCase):
+    """Test storing and serving rendered exports."""
+
+    def setUp(self):
+        """Make a store in a temporary directory."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = ArtifactStore(self.directory.name)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.directory.cleanup()
+
+    def test_store(self):
+        """Test that identical exports share a file, which is only removed when nothing points to it."""
+        self.assertIsNone(self.store.get(1, 'a', 'sif'))
+
+        first = self.store.put(1, 'a', 'sif', iter([b'x\n', b'y\n']), mimetype='text/plain', filename='x.sif')
+        self.assertEqual(first, self.store.get(1, 'a', 'sif'))
+        self.assertIsNone(self.store.get(1, 'b', 'sif'))
+        with open(first.path, 'rb') as file:
+            self.assertEqual(b'x\ny\n', file.read())
+
+        second = self.store.put(2, 'a', 'sif', iter([b'x\ny\n']), mimetype='text/plain', filename='x.sif')
+        self.assertEqual(first.digest, second.digest)
+        self.assertEqual(first.path, second.path)
+
+        calls = []
+
+        def render():
+            calls.append(None)
+            return iter([b'z']), 'text/plain', None
+
+        third = self.store.get_or_render(1, 'a', 'bel', render)
+        self.assertEqual(third, self.store.get_or_render(1, 'a', 'bel', render))
+        self.assertEqual(1, len(calls))
+
+        # make the files old enough to be pruned
+        for artifact in (first, third):
+            os.utime(artifact.path, (0, 0))
+
+        self.store.remove_network(1)
+        self.assertIsNone(self.store.get(1, 'a', 'sif'))
+        self.assertFalse(os.path.exists(third.path))
+        self.assertEqual(second, self.store.get(2, 'a', 'sif'))
+
+        self.store.remove_network(2)
+        self.assertFalse(os.path.exists(second.path))
+
+    def test_serve(self):
+        """Test serving an export with its ETag and answering conditional requests."""
+        serve_format = 'sif'
+        mimetype, suffix = EXPORT_FILE_TYPES[serve_format]
+        artifact = self.store.put(
+            1, 'a', serve_format, iter_network_bytes(sialic_acid_graph, serve_format=serve_format),
+            mimetype=mimetype, filename=f'{sialic_acid_graph.name}{suffix}',
+        )
+
+        app = Flask(__name__)
+
+        @app.route('/artifact')
+        def serve():
+            return serve_artifact(artifact)
+
+        @app.route('/network')
+        def serve_rendered():
+            return serve_network(sialic_acid_graph, serve_format=serve_format, compress=False)
+
+        with app.test_client() as client:
+            expected = client.get('/network').data
+
+            response = client.get('/artifact')
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(expected, response.data)
+            self.assertEqual(mimetype, response.mimetype)
+            self.assertIn('attachment', response.headers['Content-Disposition'])
+            self.assertEqual(f'"{artifact.digest}"', response.headers['ETag'])
+            self.assertIn('Last-Modified', response.headers)
+            self.assertIn('no-cache', response.headers['Cache-Control'])
+            etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+            response.close()
+
+            response = client.get('/artifact', headers={'If-None-Match': etag})
+            self.assertEqual(304, response.status_code)
+            self.assertEqual(b'', response.data)
+
+            response = client.get('/artifact', headers={'If-Modified-Since': last_modified})
+            self.assertEqual(304, response.status_code)
+
+            response = client.get('/artifact', headers={'If-None-Match': '"other"'})
+            self.assertEqual(200, response.status_code)
+            response.close()
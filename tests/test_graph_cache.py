@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the graph cache."""
+
+import errno
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from bel_commons.graph_cache import CacheBackend, DiskCacheBackend, GraphCache, MemoryCacheBackend, MmapCacheBackend
+from bel_commons.graph_snapshot import GraphSnapshot
+from pybel.examples import sialic_acid_graph
+
+
+def _count_checkpoint(directory: str) -> None:
+    """Count a hit of a checkpoint in a graph cache in the given directory, e.g., in another process."""
+    GraphCache.from_directory(directory).count_checkpoint(1, hit=True)
+
+
+class CacheBackendTestMixin:
+    """Tests for all cache backends."""
+
+    def make_backend(self, max_size: int) -> CacheBackend:
+        """Make a cache backend with the given maximum size."""
+        raise NotImplementedError
+
+    def test_get_set(self):
+        """Test getting and setting values."""
+        backend = self.make_backend(max_size=100)
+        self.assertIsNone(backend.get('a'))
+        backend.set('a', b'value')
+        self.assertEqual(b'value', backend.get('a'))
+        backend.delete('a')
+        self.assertIsNone(backend.get('a'))
+
+    def test_open(self):
+        """Test opening a view of a value."""
+        backend = self.make_backend(max_size=100)
+        with backend.open('a') as value:
+            self.assertIsNone(value)
+
+        backend.set('a', b'value')
+        with backend.open('a') as value:
+            self.assertEqual(b'value', bytes(value))
+
+    def test_evict_least_recently_used(self):
+        """Test that the least recently used value is evicted when the backend is full."""
+        backend = self.make_backend(max_size=100)
+        backend.set('a', b'a' * 40)
+        time.sleep(0.01)
+        backend.set('b', b'b' * 40)
+        time.sleep(0.01)
+        self.assertIsNotNone(backend.get('a'))  # now, b is the least recently used
+        time.sleep(0.01)
+        backend.set('c', b'c' * 40)
+
+        self.assertIsNotNone(backend.get('a'))
+        self.assertIsNone(backend.get('b'))
+        self.assertIsNotNone(backend.get('c'))
+
+
+class TestMemoryCacheBackend(CacheBackendTestMixin, unittest.TestCase):
+    """Tests for the in-memory cache backend."""
+
+    def make_backend(self, max_size: int) -> CacheBackend:  # noqa: D102
+        return MemoryCacheBackend(max_size=max_size)
+
+
+class TestDiskCacheBackend(CacheBackendTestMixin, unittest.TestCase):
+    """Tests for the on-disk cache backend."""
+
+    def setUp(self):
+        """Make a temporary directory for the cache."""
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.directory.cleanup()
+
+    def make_backend(self, max_size: int) -> CacheBackend:  # noqa: D102
+        return DiskCacheBackend(directory=self.directory.name, max_size=max_size)
+
+    def test_evict_over_budget(self):
+        """Test that the directory is only listed when a write pushes the cache over its maximum size."""
+        backend = self.make_backend(max_size=100)
+        with mock.patch.object(backend, '_iter_entries', wraps=backend._iter_entries) as iter_entries:
+            backend.set('a', b'a' * 40)  # counts the size of the directory
+            backend.set('b', b'b' * 40)
+            backend.set('a', b'a' * 50)  # replaces the first value
+            backend.delete('b')
+            self.assertEqual(1, iter_entries.call_count)
+
+            backend.set('c', b'c' * 60)
+            self.assertEqual(2, iter_entries.call_count)
+
+        self.assertIsNone(backend.get('a'))
+        self.assertIsNotNone(backend.get('c'))
+
+    def test_shared(self):
+        """Test that two backends on the same directory share their entries."""
+        self.make_backend(max_size=100).set('a', b'value')
+        self.assertEqual(b'value', self.make_backend(max_size=100).get('a'))
+
+
+class TestMmapCacheBackend(TestDiskCacheBackend):
+    """Tests for the memory-mapped cache backend."""
+
+    def make_backend(self, max_size: int) -> CacheBackend:  # noqa: D102
+        return MmapCacheBackend(directory=self.directory.name, max_size=max_size)
+
+
+class TestGraphCache(unittest.TestCase):
+    """Tests for the graph cache."""
+
+    def test_graph_round_trip(self):
+        """Test storing and loading a graph."""
+        with tempfile.TemporaryDirectory() as directory:
+            graph_cache = GraphCache.from_directory(directory)
+            graph_cache.set_graph('key', sialic_acid_graph)
+            self.assertTrue(os.listdir(os.path.join(directory, 'entries')))
+
+            graph = graph_cache.get_graph('key')
+            self.assertIsNotNone(graph)
+            self.assertEqual(sialic_acid_graph.number_of_edges(), graph.number_of_edges())
+
+    def test_snapshot_shared(self):
+        """Test that snapshots are memory-mapped from their own directory instead of being copied."""
+        snapshot = GraphSnapshot.from_graph(sialic_acid_graph)
+        with tempfile.TemporaryDirectory() as directory:
+            graph_cache = GraphCache.from_directory(directory)
+            graph_cache.set_snapshot('key', snapshot)
+            self.assertFalse(os.listdir(os.path.join(directory, 'entries')))
+            self.assertTrue(os.listdir(os.path.join(directory, 'snapshots')))
+
+            other_graph_cache = GraphCache.from_directory(directory)  # e.g., in another worker
+            other_snapshot = other_graph_cache.get_snapshot('key')
+            self.assertIs(other_snapshot, other_graph_cache.get_snapshot('key'))
+
+        self.assertIsNotNone(other_snapshot)
+        self.assertFalse(other_snapshot.neighbors.flags.writeable)
+        self.assertFalse(other_snapshot.neighbors.flags.owndata)
+        self.assertEqual(snapshot.number_of_edges(), other_snapshot.number_of_edges())
+        self.assertEqual(snapshot.get_node_hashes([0, 1]), other_snapshot.get_node_hashes([0, 1]))
+
+    def _help_test_single_flight(self, graph_cache: GraphCache):
+        calls = []
+        lock = threading.Lock()
+
+        def build():
+            with lock:
+                calls.append(None)
+            time.sleep(0.1)
+            return sialic_acid_graph
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            graphs = list(executor.map(lambda _: graph_cache.get_or_build_graph('key', build), range(8)))
+
+        self.assertEqual(1, len(calls), msg='the graph was built more than once')
+        for graph in graphs:
+            self.assertEqual(sialic_acid_graph.number_of_edges(), graph.number_of_edges())
+
+    def test_single_flight(self):
+        """Test that concurrent requests for a missing graph only build it once."""
+        self._help_test_single_flight(GraphCache())
+
+    def test_single_flight_directory(self):
+        """Test that concurrent requests for a missing graph only build it once when the locks are on disk."""
+        with tempfile.TemporaryDirectory() as directory:
+            self._help_test_single_flight(GraphCache.from_directory(directory))
+            self.assertEqual([], os.listdir(os.path.join(directory, 'locks')), msg='lock files were not cleaned up')
+
+    def test_full_backend(self):
+        """Test that a graph is still returned if the backend can't store it."""
+        class FullBackend(MemoryCacheBackend):
+            def set(self, key: str, value: bytes) -> None:
+                raise OSError(errno.ENOSPC, 'No space left on device')
+
+        graph_cache = GraphCache(backend=FullBackend())
+        key = graph_cache.get_network_key(1)
+        with self.assertLogs('bel_commons.graph_cache', level='WARNING'):
+            graph = graph_cache.get_or_build_graph(key, lambda: sialic_acid_graph)
+        self.assertIs(sialic_acid_graph, graph)
+        self.assertIsNone(graph_cache.get_graph(key))
+
+    def test_invalidate_network(self):
+        """Test that invalidating a network changes the keys of all entries that depend on it."""
+        graph_cache = GraphCache()
+        key = graph_cache.get_networks_key([2, 1])
+        self.assertEqual(key, graph_cache.get_networks_key([1, 2]))
+
+        graph_cache.invalidate_network(1)
+        self.assertNotEqual(key, graph_cache.get_networks_key([1, 2]))
+
+        key = graph_cache.get_networks_key([1, 2])
+        graph_cache.invalidate_network(3)
+        self.assertEqual(key, graph_cache.get_networks_key([1, 2]))
+
+    def test_checkpoint_statistics(self):
+        """Test summarizing the hits and misses of the pipeline checkpoints."""
+        with tempfile.TemporaryDirectory() as directory:
+            graph_cache = GraphCache.from_directory(directory)
+            graph_cache.count_checkpoint(0, hit=False)
+            graph_cache.count_checkpoint(1, hit=False)
+            graph_cache.count_checkpoint(1, hit=True)
+
+            other_graph_cache = GraphCache.from_directory(directory)  # e.g., in another worker
+            other_graph_cache.count_checkpoint(1, hit=True)
+            statistics = graph_cache.get_checkpoint_statistics()
+
+        self.assertEqual(2, statistics['hits'])
+        self.assertEqual(2, statistics['misses'])
+        self.assertEqual(
+            [{'steps': 0, 'hits': 0, 'misses': 1}, {'steps': 1, 'hits': 2, 'misses': 1}],
+            statistics['steps'],
+        )
+
+    @unittest.skipIf(os.name == 'nt', 'processes are not forked on Windows')
+    def test_checkpoint_statistics_retired(self):
+        """Test that the counts of processes that exited are kept after they're unregistered."""
+        with tempfile.TemporaryDirectory() as directory:
+            process = multiprocessing.get_context('fork').Process(target=_count_checkpoint, args=(directory,))
+            process.start()
+            process.join()
+
+            graph_cache = GraphCache.from_directory(directory)
+            graph_cache.count_checkpoint(1, hit=True)
+            self.assertEqual(1, len(graph_cache._get_checkpoint_keys()))
+            statistics = graph_cache.get_checkpoint_statistics()
+
+        self.assertEqual(2, statistics['hits'])
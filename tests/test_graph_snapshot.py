@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for graph snapshots."""
+
+import itertools as itt
+import pickle
+import unittest
+
+import networkx as nx
+import numpy as np
+
+from bel_commons.graph_snapshot import GraphSnapshot, PathSearch, get_number_of_samples, get_top_indexes
+from pybel import BELGraph
+from pybel.dsl import Pathology, Protein
+from pybel.examples import egf_graph, sialic_acid_graph
+
+
+class TestGraphSnapshot(unittest.TestCase):
+    """Test that graph snapshots give the same results as :mod:`networkx` on the BEL graphs."""
+
+    def test_structure(self):
+        """Test the nodes, edges, and relations of the snapshot."""
+        snapshot = GraphSnapshot.from_graph(sialic_acid_graph)
+        self.assertEqual(sialic_acid_graph.number_of_nodes(), snapshot.number_of_nodes())
+        self.assertEqual(sialic_acid_graph.number_of_edges(), snapshot.number_of_edges())
+
+        nodes = list(sialic_acid_graph)
+        self.assertEqual([node.md5 for node in nodes], snapshot.get_node_hashes(range(len(nodes))))
+        self.assertEqual(3, snapshot.get_node_index(nodes[3].md5))
+        self.assertIsNone(snapshot.get_node_index('0' * 32))
+
+        adjacency = snapshot.get_adjacency(undirected=True)
+        self.assertIs(adjacency, snapshot.get_adjacency(undirected=True), msg='the matrix was built again')
+
+        snapshot = pickle.loads(pickle.dumps(snapshot))
+        self.assertEqual(sialic_acid_graph.number_of_edges(), snapshot.number_of_edges())
+        self.assertEqual(3, snapshot.get_node_index(nodes[3].md5))
+
+    def test_neighbors(self):
+        """Test that the neighbors of each node are the same as in the adjacency matrices."""
+        graph = egf_graph.copy()
+        node = list(graph)[0]
+        pathology = Pathology('MESH', 'Alzheimer Disease')
+        graph.add_increases(node, pathology, citation='1', evidence='e')
+        graph.add_increases(node, node, citation='1', evidence='e')
+        snapshot = GraphSnapshot.from_graph(graph)
+        self.assertTrue(snapshot.pathologies.any())
+
+        for undirected, remove_pathologies in itt.product((False, True), repeat=2):
+            adjacency = snapshot.get_adjacency(undirected=undirected, remove_pathologies=remove_pathologies)
+            for node in range(snapshot.number_of_nodes()):
+                with self.subTest(undirected=undirected, remove_pathologies=remove_pathologies, node=node):
+                    np.testing.assert_array_equal(
+                        adjacency.indices[adjacency.indptr[node]:adjacency.indptr[node + 1]],
+                        snapshot.get_neighbors(node, undirected=undirected, remove_pathologies=remove_pathologies),
+                    )
+
+    def test_buffer_round_trip(self):
+        """Test reading a snapshot from its serialization without copying its arrays."""
+        snapshot = GraphSnapshot.from_graph(sialic_acid_graph)
+        other_snapshot = GraphSnapshot.from_buffer(snapshot.to_bytes())
+        for name in ('node_hashes', 'pathologies', 'offsets', 'neighbors'):
+            np.testing.assert_array_equal(getattr(snapshot, name), getattr(other_snapshot, name))
+            self.assertFalse(getattr(other_snapshot, name).flags.owndata)
+
+        empty_snapshot = GraphSnapshot.from_buffer(GraphSnapshot.from_graph(BELGraph()).to_bytes())
+        self.assertEqual(0, empty_snapshot.number_of_nodes())
+
+    def test_paths(self):
+        """Test shortest and all simple paths between all pairs of nodes."""
+        snapshot = GraphSnapshot.from_graph(sialic_acid_graph)
+
+        for undirected in (False, True):
+            graph = sialic_acid_graph.to_undirected() if undirected else sialic_acid_graph
+            for source in graph:
+                for target in graph:
+                    if source == target:
+                        continue
+
+                    source_index = snapshot.get_node_index(source.md5)
+                    target_index = snapshot.get_node_index(target.md5)
+
+                    path = snapshot.get_shortest_path(source_index, target_index, undirected=undirected)
+                    if nx.has_path(graph, source, target):
+                        self.assertEqual(nx.shortest_path_length(graph, source, target) + 1, len(path))
+                    else:
+                        self.assertIsNone(path)
+
+                    expected = {
+                        tuple(node.md5 for node in path)
+                        for path in nx.all_simple_paths(graph, source, target, cutoff=3)
+                    }
+                    paths = snapshot.iter_all_simple_paths(source_index, target_index, cutoff=3, undirected=undirected)
+                    self.assertEqual(expected, {tuple(snapshot.get_node_hashes(path)) for path in paths})
+
+    def test_betweenness_centrality(self):
+        """Test calculating betweenness centrality."""
+        for graph in (sialic_acid_graph, egf_graph):
+            snapshot = GraphSnapshot.from_graph(graph)
+            expected = nx.betweenness_centrality(graph)
+            self.assertTrue(np.allclose([expected[node] for node in graph], snapshot.get_betweenness_centrality()))
+
+    def test_approximate_betweenness_centrality(self):
+        """Test estimating betweenness centrality from a sample of sources."""
+        snapshot = GraphSnapshot.from_graph(egf_graph)
+        number_nodes = snapshot.number_of_nodes()
+        self.assertEqual(number_nodes, get_number_of_samples(number_nodes, 0.0))
+        self.assertEqual(number_nodes, get_number_of_samples(number_nodes, 0.05))
+        self.assertEqual(1, get_number_of_samples(number_nodes, 10.0))
+        self.assertLess(get_number_of_samples(10 ** 6, 0.05), 10 ** 6)
+
+        exact = snapshot.get_betweenness_centrality()
+        self.assertTrue(np.allclose(exact, snapshot.get_approximate_betweenness_centrality(0.05)))
+
+        sources = [0, 2, 3]
+        expected = nx.betweenness_centrality_subset(
+            egf_graph,
+            sources=[list(egf_graph)[source] for source in sources],
+            targets=list(egf_graph),
+            normalized=False,
+        )
+        scale = number_nodes / (len(sources) * (number_nodes - 1) * (number_nodes - 2))
+        self.assertTrue(np.allclose(
+            [expected[node] * scale for node in egf_graph],
+            snapshot.get_betweenness_centrality(sources=sources),
+        ))
+
+        estimate = snapshot.get_approximate_betweenness_centrality(0.5, seed=5)
+        self.assertEqual(estimate.tolist(), snapshot.get_approximate_betweenness_centrality(0.5, seed=5).tolist())
+
+    def test_top_indexes(self):
+        """Test getting the indexes of the largest values with a partial sort."""
+        values = np.array([0.5, 0.1, 0.9, 0.5, 0.0, 0.9])
+        self.assertEqual([2, 5, 0, 3], get_top_indexes(values, 4).tolist())
+        self.assertEqual([2], get_top_indexes(values, 1).tolist())
+        self.assertEqual(np.argsort(-values, kind='stable').tolist(), get_top_indexes(values, 10).tolist())
+        self.assertEqual([], get_top_indexes(values, 0).tolist())
+
+    def test_path_search(self):
+        """Test that the search for all paths stops at its bounds."""
+        graph = BELGraph()
+        proteins = [Protein('HGNC', str(i)) for i in range(6)]
+        for source, target in itt.combinations(proteins, 2):
+            graph.add_increases(source, target, citation='1', evidence='Made up')
+
+        snapshot = GraphSnapshot.from_graph(graph)
+        source, target = snapshot.get_node_index(proteins[0].md5), snapshot.get_node_index(proteins[-1].md5)
+        all_paths = list(snapshot.iter_all_simple_paths(source, target, undirected=True))
+        self.assertLess(2, len(all_paths))
+
+        search = PathSearch(snapshot, source, target, undirected=True)
+        self.assertEqual(all_paths, list(search))
+        self.assertFalse(search.truncated)
+
+        search = PathSearch(snapshot, source, target, undirected=True, max_paths=len(all_paths))
+        self.assertEqual(all_paths, list(search))
+        self.assertFalse(search.truncated)
+
+        search = PathSearch(snapshot, source, target, undirected=True, max_paths=2)
+        self.assertEqual(all_paths[:2], list(search))
+        self.assertTrue(search.truncated)
+        self.assertEqual(PathSearch.MAX_PATHS, search.reason)
+
+        search = PathSearch(snapshot, source, target, undirected=True, time_limit=0)
+        self.assertEqual([], list(search))
+        self.assertEqual(PathSearch.TIME_LIMIT, search.reason)
+
+        search = PathSearch(snapshot, source, target, undirected=True)
+        paths = iter(search)
+        next(paths)
+        search.cancel()
+        self.assertEqual([], list(paths))
+        self.assertEqual(PathSearch.CANCELLED, search.reason)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the fast JSON serialization of responses."""
+
+import datetime
+import json
+import unittest
+from unittest import mock
+
+import numpy as np
+from flask import Flask, jsonify
+
+from bel_commons import json_provider
+from bel_commons.json_provider import BELCommonsJSONEncoder, dumps, init_json
+from bel_commons.send_utils import to_json_custom
+from pybel.examples import sialic_acid_graph
+
+
+class TestJSONProvider(unittest.TestCase):
+    """Test that the fast JSON serialization gives the same values as the standard library."""
+
+    def setUp(self):
+        """Build a payload with PyBEL nodes, numpy values, and dates."""
+        self.payload = {
+            'graph': to_json_custom(sialic_acid_graph),
+            'scores': np.array([0.5, 1.5]),
+            'score': np.float32(0.25),
+            'count': np.int64(3),
+            'created': datetime.datetime(2019, 1, 2, 3, 4, 5),
+            'by_index': {1: 'a', 2: 'b'},
+        }
+        self.expected = json.loads(json.dumps(self.payload, default=json_provider.default))
+
+    def test_dumps(self):
+        """Test serializing with and without orjson."""
+        self.assertEqual([0.5, 1.5], self.expected['scores'])
+        self.assertEqual('Wed, 02 Jan 2019 03:04:05 GMT', self.expected['created'])
+
+        for orjson in (json_provider.orjson, None):
+            with self.subTest(orjson=orjson is not None), mock.patch.object(json_provider, 'orjson', orjson):
+                compact = dumps(self.payload, sort_keys=True)
+                self.assertEqual(self.expected, json.loads(compact))
+                self.assertNotIn('\n', compact)
+                self.assertEqual(self.expected, json.loads(dumps(self.payload, indent=2)))
+                self.assertEqual('[1,2]', dumps([1, 2]))
+                self.assertEqual(str(2 ** 70), dumps(2 ** 70))
+                with self.assertRaises(TypeError):
+                    dumps(object())
+
+    def test_encoder(self):
+        """Test the JSON encoder for older versions of Flask."""
+        self.assertEqual(self.expected, json.loads(json.dumps(self.payload, cls=BELCommonsJSONEncoder)))
+
+    def test_response(self):
+        """Test that API responses are compact while others are indented."""
+        app = Flask(__name__)
+        app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+        init_json(app)
+
+        @app.route('/api/payload')
+        @app.route('/payload')
+        def get_payload():
+            return jsonify(self.payload)
+
+        with app.test_client() as client:
+            response = client.get('/api/payload')
+            self.assertEqual(self.expected, response.get_json())
+            self.assertEqual(1, response.data.count(b'\n'))
+
+            response = client.get('/payload')
+            self.assertEqual(self.expected, response.get_json())
+            self.assertLess(1, response.data.count(b'\n'))
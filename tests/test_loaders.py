@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the loader strategies of edges and citations."""
+
+import unittest
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from bel_commons.loaders import load_citations, load_edge_evidences, load_edge_nodes
+from pybel.dsl import Protein
+from pybel.manager.models import Author, Base, Citation, Edge, Evidence, Node
+
+NUMBER_EDGES = 30
+
+
+class TestLoaders(unittest.TestCase):
+    """Test that converting edges and citations to JSON takes a constant number of queries."""
+
+    def setUp(self):
+        """Fill a database with a chain of edges that each have their own evidence and citation."""
+        self.engine = create_engine('sqlite://')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+        nodes = [
+            Node(type=protein.function, bel=protein.as_bel(), md5=protein.md5, data=protein)
+            for protein in (Protein('HGNC', f'GENE{i}') for i in range(NUMBER_EDGES + 1))
+        ]
+        authors = [Author(name=f'Author {i}') for i in range(3)]
+        for i, (source, target) in enumerate(zip(nodes, nodes[1:])):
+            citation = Citation(db='PubMed', db_id=str(i), first=authors[0], last=authors[1], authors=authors)
+            self.session.add(Edge(
+                bel=f'{source.bel} increases {target.bel}',
+                relation='increases',
+                source=source,
+                target=target,
+                evidence=Evidence(text=f'Evidence {i}', citation=citation),
+                md5=f'{i:064x}',
+                data={'relation': 'increases'},
+            ))
+        self.session.commit()
+        self.session.expunge_all()
+
+    def tearDown(self):
+        """Close the session."""
+        self.session.close()
+
+    @contextmanager
+    def assert_number_queries(self, number: int):
+        """Assert that the given number of queries are run in the context."""
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(self.engine, 'before_cursor_execute', count)
+        try:
+            yield
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', count)
+
+        self.assertEqual(number, len(statements), msg='\n\n'.join(statements))
+
+    def test_lazy(self):
+        """Test that converting edges to JSON without loader strategies takes a query per edge."""
+        with self.assertRaises(AssertionError):
+            with self.assert_number_queries(1):
+                for edge in self.session.query(Edge).limit(NUMBER_EDGES):
+                    edge.to_json(include_id=True)
+
+    def test_edge_nodes(self):
+        """Test converting a page of edges to JSON."""
+        with self.assert_number_queries(1):
+            edges = [
+                edge.to_json(include_id=True)
+                for edge in load_edge_nodes(self.session.query(Edge).order_by(Edge.id).limit(NUMBER_EDGES))
+            ]
+        self.assertEqual(NUMBER_EDGES, len(edges))
+        self.assertEqual('p(HGNC:GENE0)', edges[0]['source'].as_bel())
+
+    def test_edge_evidences(self):
+        """Test converting edges to JSON along with their evidences and citations."""
+        with self.assert_number_queries(2):
+            edges = [
+                (edge.to_json(), edge.evidence.text, edge.evidence.citation.to_json())
+                for edge in load_edge_evidences(self.session.query(Edge))
+            ]
+        self.assertEqual(NUMBER_EDGES, len(edges))
+        self.assertEqual(['Author 0', 'Author 1', 'Author 2'], edges[0][2]['authors'])
+
+    def test_citations(self):
+        """Test converting citations to JSON."""
+        with self.assert_number_queries(2):
+            citations = [
+                citation.to_json(include_id=True)
+                for citation in load_citations(self.session.query(Citation))
+            ]
+        self.assertEqual(NUMBER_EDGES, len(citations))
+        self.assertEqual('Author 0', citations[0]['first'])
@@ -4,17 +4,27 @@
 
 import json
 import logging
+import pickle
 import time
+from unittest import mock
 
+from flask_login import AnonymousUserMixin
 from werkzeug.exceptions import HTTPException
 
-from bel_commons.manager import iter_recent_public_networks
-from bel_commons.models import Assembly, EdgeComment, EdgeVote, Query, User
+from bel_commons.manager import WebManager
+from bel_commons.manager_base import iter_recent_public_networks
+from bel_commons.models import (
+    Assembly, EdgeComment, EdgeFeedback, EdgeVote, NetworkContents, NetworkOverlap, Project, Query, User, UserQuery,
+    network_contents_annotation, network_contents_citation,
+)
+from pybel import BELGraph
 from pybel.constants import INCREASES, PROTEIN, RELATION
-from pybel.manager.models import Edge, Node
+from pybel.dsl import Protein
+from pybel.manager.models import Citation, Edge, Evidence, Namespace, NamespaceEntry, Node
+from pybel.parser.exc import MissingNamespaceNameWarning
 from pybel.testing.utils import n
 from tests.cases import TemporaryCacheMethodMixin
-from tests.utils import make_edge, make_network, make_report, upgrade_network
+from tests.utils import make_edge, make_network, make_node, make_protein_node, make_report, upgrade_network
 
 log = logging.getLogger(__name__)
 
@@ -69,6 +79,223 @@ class TestManager(TemporaryCacheMethodMixin):
         self.assertIn(n2, public_networks)
         self.assertEqual(2, len(public_networks))
 
+    def test_network_ids_with_permission(self):
+        """Test getting the identifiers of the networks a user has rights to, and that they're cached."""
+        u1 = User(email='u1@example.com', active=True)
+        u2 = User(email='u2@example.com', active=True)
+        anonymous = AnonymousUserMixin()
+        n1, n2, n3, n4 = networks = [make_network() for _ in range(4)]
+        r1, r2, r3, r4 = reports = [make_report(network) for network in networks]
+        r1.public = True
+        r2.user = u1
+        for report in (r1, r3, r4):
+            report.user = u2
+        u1.networks.append(n3)
+        project = Project(name=n(), users=[u1, u2], networks=[n4])
+        self.add_all_and_commit([u1, u2, project, *networks, *reports])
+
+        self.assertEqual({n1.id}, self.manager.get_network_ids_with_permission(anonymous))
+        self.assertEqual({n1.id, n2.id, n3.id, n4.id}, self.manager.get_network_ids_with_permission(u1))
+        self.assertEqual({n1.id, n3.id, n4.id}, self.manager.get_network_ids_with_permission(u2))
+        self.assertEqual({n1, n2, n3, n4}, set(self.manager.iter_networks_with_permission(u1)))
+
+        r3.public = True
+        self.manager.session.commit()
+        self.assertEqual({n1.id}, self.manager.get_network_ids_with_permission(anonymous))
+
+        self.manager.bump_permission_version()
+        self.manager.session.commit()
+        self.assertEqual({n1.id, n3.id}, self.manager.get_network_ids_with_permission(anonymous))
+
+        u3 = User(email='u3@example.com', active=True)
+        self.add_all_and_commit([u3])
+        self.assertEqual({n1.id, n3.id}, self.manager.get_network_ids_with_permission(u3))
+        admin = self.manager.user_datastore.find_or_create_role('admin')
+        self.manager.user_datastore.add_role_to_user(u3, admin)
+        self.manager.session.commit()
+        self.assertEqual({n1.id, n2.id, n3.id, n4.id}, self.manager.get_network_ids_with_permission(u3))
+        self.manager.user_datastore.remove_role_from_user(u3, admin)
+        self.manager.session.commit()
+        self.assertEqual({n1.id, n3.id}, self.manager.get_network_ids_with_permission(u3))
+
+        with mock.patch('bel_commons.manager_base._PERMISSION_CACHE_SIZE', 2):
+            for user in (u1, u2, anonymous):
+                self.manager.get_network_ids_with_permission(user)
+        self.assertEqual([u2.id, None], list(self.manager._permission_cache))
+
+    def test_node_overlaps(self):
+        """Test finding similar networks with the LSH index and calculating their overlaps."""
+        nodes = [make_node() for _ in range(60)]
+        n1, n2, n3 = networks = [make_network() for _ in range(3)]
+        n1.nodes = nodes[:40]
+        n2.nodes = nodes[:30]
+        n3.nodes = nodes[40:]
+        self.add_all_and_commit(networks)
+
+        self.assertEqual(3, self.manager.ensure_network_sketches())
+        self.assertEqual(40, n1.sketch.number_nodes)
+        self.assertEqual(0, self.manager.ensure_network_sketches())
+
+        overlaps = self.manager.get_node_overlaps(n1)
+        self.assertEqual({n2.id: (n2, 1.0)}, overlaps)
+        self.assertEqual(1, self.manager.session.query(NetworkOverlap).count())
+
+        n4 = make_network()
+        n4.nodes = nodes[:20] + nodes[50:]
+        self.add_all_and_commit([n4])
+        self.assertEqual({n2.id: (n2, 1.0)}, self.manager.get_node_overlaps(n1))
+
+        self.manager.add_network_sketches([n4])
+        self.assertEqual({n2.id: (n2, 1.0), n4.id: (n4, 2 / 3)}, self.manager.get_node_overlaps(n1))
+
+    def test_node_overlaps_containment(self):
+        """Test finding a small network that is contained in a big one, even though their Jaccard index is low."""
+        nodes = [make_node() for _ in range(400)]
+        small, big, other = networks = [make_network() for _ in range(3)]
+        small.nodes = nodes[:10]
+        big.nodes = nodes[:300]
+        other.nodes = nodes[299:]
+        self.add_all_and_commit(networks)
+        self.assertEqual(3, self.manager.ensure_network_sketches())
+
+        self.assertEqual({big.id: (big, 1.0)}, self.manager.get_node_overlaps(small))
+        self.assertEqual({small.id: (small, 1.0)}, self.manager.get_node_overlaps(big))
+
+    def test_node_overlaps_conflict(self):
+        """Test that overlaps cached concurrently by the task updating them don't fail the request."""
+        nodes = [make_node() for _ in range(10)]
+        n1, n2 = networks = [make_network() for _ in range(2)]
+        n1.nodes = nodes
+        n2.nodes = nodes[:5]
+        self.add_all_and_commit(networks)
+        self.manager.add_network_sketches(networks)
+        self.manager.session.commit()
+
+        get_node_ids_by_network_id = self.manager._get_node_ids_by_network_id
+
+        def get_node_ids_concurrently(networks_):
+            # another worker caches the same overlaps after they've been looked up
+            other_manager = WebManager(connection=self.connection)
+            other_manager.update_network_overlaps(other_manager.get_network_by_id(n1.id))
+            other_manager.session.close()
+            return get_node_ids_by_network_id(networks_)
+
+        with mock.patch.object(self.manager, '_get_node_ids_by_network_id', side_effect=get_node_ids_concurrently):
+            self.assertEqual({n2.id: (n2, 1.0)}, self.manager.get_node_overlaps(n1))
+
+        self.assertEqual(1, self.manager.session.query(NetworkOverlap).count())
+
+    def test_build_network_overlaps(self):
+        """Test calculating the overlaps of all networks at once and of one network at a time."""
+        nodes = [make_node() for _ in range(40)]
+        n1, n2, n3 = networks = [make_network() for _ in range(3)]
+        n1.nodes = nodes[:20]
+        n2.nodes = nodes[10:40]
+        n3.nodes = nodes[15:20]
+        self.add_all_and_commit(networks)
+
+        self.assertEqual(3, self.manager.build_network_overlaps())
+        overlaps = {
+            (overlap.left_id, overlap.right_id): overlap.overlap
+            for overlap in self.manager.session.query(NetworkOverlap)
+        }
+        self.assertEqual({(n2.id, n1.id): 0.5, (n3.id, n1.id): 1.0, (n3.id, n2.id): 1.0}, overlaps)
+
+        n4 = make_network()
+        n4.nodes = nodes[30:40]
+        self.add_all_and_commit([n4])
+        self.assertEqual(1, self.manager.update_network_overlaps(n4))
+        self.assertEqual(4, self.manager.session.query(NetworkOverlap).count())
+        self.assertEqual({n2.id: (n2, 1.0)}, self.manager.get_node_overlaps(n4))
+
+    def test_network_overview(self):
+        """Test getting the meta-network of the overlaps between networks and that it's versioned."""
+        nodes = [make_node() for _ in range(40)]
+        n1, n2, n3 = networks = [make_network() for _ in range(3)]
+        n1.nodes = nodes[:20]
+        n2.nodes = nodes[10:40]
+        n3.nodes = nodes[15:20]
+        reports = [make_report(network) for network in networks]
+        reports[0].number_nodes = 20
+        self.add_all_and_commit(networks + reports)
+
+        version = self.manager.get_overlap_version()
+        self.manager.build_network_overlaps()
+        self.assertLess(version, self.manager.get_overlap_version())
+
+        elements = self.manager.get_network_overview(0.6)
+        self.assertEqual(
+            [(n1.id, 20), (n2.id, None), (n3.id, None)],
+            [(element['data']['id'], element['data']['size']) for element in elements[:3]],
+        )
+        self.assertEqual(
+            [(n3.id, n1.id, 100), (n3.id, n2.id, 100)],
+            [(element['data']['source'], element['data']['target'], element['data']['weight']) for element in elements[3:]],
+        )
+        self.assertEqual(6, len(self.manager.get_network_overview(0.5)))
+
+        version = self.manager.get_overlap_version()
+        self.manager.drop_network(n3)
+        self.assertLess(version, self.manager.get_overlap_version())
+        self.assertEqual(1, self.manager.session.query(NetworkOverlap).count())
+        self.assertEqual(3, len(self.manager.get_network_overview(0.5)))
+
+    def test_report_document_summary(self):
+        """Test storing the summary of a network's document in its report and reading old reports without one."""
+        graph = BELGraph(name='Test Network', version='1.0.0')
+        graph.namespace_url['HGNC'] = 'https://example.com/hgnc.belns'
+        graph.annotation_list['Confidence'] = {'High', 'Low'}
+        graph.add_increases(Protein('HGNC', 'A'), Protein('HGNC', 'B'), citation='1', evidence='Evidence')
+        graph.add_warning(MissingNamespaceNameWarning(3, 'p(HGNC:C)', 0, 'C', 'HGNC'))
+
+        network = make_network()
+        report = make_report(network)
+        report.dump_calculations(graph)
+        self.add_all_and_commit([network, report])
+
+        document = self.manager.get_network_by_id(network.id).report.get_document_summary()
+        summary, same_document = report.get_calculations_and_document_summary()
+        self.assertIsInstance(summary, type(report.get_calculations()))
+        self.assertEqual(str(document), str(same_document))
+        self.assertEqual('Test Network v1.0.0', str(document))
+        self.assertEqual({'HGNC': 'https://example.com/hgnc.belns'}, document.namespace_url)
+        self.assertEqual(set(), document.unused_namespaces)
+        self.assertEqual({'Confidence': {'High', 'Low'}}, document.unused_list_annotation_values)
+        self.assertEqual([(3, 'p(HGNC:C)')], [(number, line) for number, line, _, _ in document.warnings])
+
+        summary = report.get_calculations()
+        report.calculations = pickle.dumps(summary)
+        self.assertIsNone(report.get_document_summary())
+        report.add_document_summary(graph)
+        self.assertEqual('Test Network v1.0.0', str(report.get_document_summary()))
+        self.assertIsInstance(report.get_calculations(), type(summary))
+
+    def test_network_contents(self):
+        """Test listing the citations and annotation entries of a network's edges for pagination."""
+        namespace = Namespace(keyword='Confidence', url=n(), is_annotation=True)
+        high, low = NamespaceEntry(name='High', namespace=namespace), NamespaceEntry(name='Low', namespace=namespace)
+        c1, c2 = Citation(db='PubMed', db_id=n()), Citation(db='PubMed', db_id=n())
+        edges = [make_edge() for _ in range(3)]
+        edges[0].evidence, edges[0].annotations = Evidence(text=n(), citation=c1), [high]
+        edges[1].evidence, edges[1].annotations = Evidence(text=n(), citation=c1), [high, low]
+        edges[2].evidence = Evidence(text=n(), citation=c2)
+        network = make_network()
+        network.edges = edges
+        self.add_all_and_commit([network])
+
+        contents = self.manager.get_or_create_network_contents(network)
+        self.assertEqual(2, contents.number_citations)
+        self.assertEqual(2, contents.number_annotation_entries)
+        self.assertEqual(0, self.manager.ensure_network_contents())
+        self.assertEqual(
+            {c1.id, c2.id},
+            {citation_id for _, citation_id in self.manager.session.execute(network_contents_citation.select())},
+        )
+
+        self.manager.drop_network(network)
+        self.assertEqual(0, self.manager.session.query(NetworkContents).count())
+        self.assertEqual([], self.manager.session.execute(network_contents_annotation.select()).fetchall())
+
     def test_user_iter_owned_networks(self):
         """Test getting networks owned by a given user."""
 
@@ -120,6 +347,108 @@ class TestManager(TemporaryCacheMethodMixin):
         self.assertIsNotNone(vote.changed)
         self.assertFalse(vote.agreed)
 
+    def test_edge_entries(self):
+        """Test getting edges with the user's votes and the comments without creating votes."""
+        nodes = [make_protein_node() for _ in range(3)]
+        e1 = make_edge(nodes[0], nodes[1])
+        e2 = make_edge(nodes[1], nodes[2])
+        user = User(email='test@example.com', active=True)
+        other_user = User(email='other@example.com', active=True)
+        self.manager.session.add_all([e1, e2, user, other_user])
+        self.manager.session.commit()
+
+        self.manager.get_or_create_vote(e1, user, agreed=False)
+        comment = EdgeComment(edge=e2, user=other_user, comment=n())
+        self.manager.session.add(comment)
+        self.manager.session.commit()
+
+        entries = self.manager._help_get_edge_entries([e1, e2], user)
+        self.assertEqual([-1, 0], [entry['vote'] for entry in entries])
+        self.assertEqual([[], [comment.comment]], [
+            [edge_comment['comment'] for edge_comment in entry['comments']]
+            for entry in entries
+        ])
+        self.assertEqual('other@example.com', entries[1]['comments'][0]['user']['email'])
+        self.assertEqual(1, self.manager.session.query(EdgeVote).count())
+
+        self.assertEqual(0, self.manager._help_get_edge_entry(e2, other_user)['vote'])
+        self.assertEqual(1, self.manager.session.query(EdgeVote).count())
+
+    def test_edge_feedback(self):
+        """Test that the counts of votes and comments on edges are kept in sync and can be used for sorting."""
+        nodes = [make_protein_node() for _ in range(3)]
+        e1 = make_edge(nodes[0], nodes[1])
+        e2 = make_edge(nodes[1], nodes[2])
+        u1 = User(email='u1@example.com')
+        u2 = User(email='u2@example.com')
+        self.manager.session.add_all([e1, e2, u1, u2])
+        self.manager.session.commit()
+
+        self.manager.get_or_create_vote(e1, u1, agreed=False)
+        self.manager.get_or_create_vote(e1, u2, agreed=False)
+        self.manager.get_or_create_vote(e2, u1)
+        self.assertEqual((0, 2), (e1.feedback.up, e1.feedback.down))
+        self.assertIsNone(e2.feedback)
+        self.assertEqual(2, self.manager.count_votes())
+
+        self.manager.get_or_create_vote(e1, u2, agreed=True)
+        self.manager.get_or_create_vote(e2, u1, agreed=True)
+        self.assertEqual((1, 1), (e1.feedback.up, e1.feedback.down))
+        self.assertEqual((1, 0), (e2.feedback.up, e2.feedback.down))
+        self.assertEqual(3, self.manager.count_votes())
+
+        self.manager.create_edge_comment(e1, u1, n())
+        self.assertEqual({'up': 1, 'down': 1, 'comments': 1}, e1.feedback.to_json())
+        self.assertEqual(1, self.manager.count_comments())
+
+        edges = self.manager.sort_edges_by_consensus(self.manager.session.query(Edge)).all()
+        self.assertEqual([e2, e1], edges)
+
+        self.manager.session.query(EdgeFeedback).delete()
+        self.manager.session.commit()
+        self.assertEqual(0, self.manager.count_votes())
+
+        self.manager.refresh_edge_feedback()
+        self.assertEqual(3, self.manager.count_votes())
+        self.assertEqual(1, self.manager.count_comments())
+        self.assertEqual({'up': 1, 'down': 1, 'comments': 1}, e1.feedback.to_json())
+
+        # like deleting them in the admin interface
+        vote = self.manager.get_edge_vote_by_user(e1, u1)
+        self.manager.uncount_edge_vote(vote)
+        self.manager.session.delete(vote)
+        comment = e1.comments.one()
+        self.manager.uncount_edge_comment(comment)
+        self.manager.session.delete(comment)
+        self.manager.session.commit()
+        self.assertEqual({'up': 1, 'down': 0, 'comments': 0}, e1.feedback.to_json())
+        self.assertEqual(2, self.manager.count_votes())
+        self.assertEqual(0, self.manager.count_comments())
+
+    def test_edge_feedback_conflict(self):
+        """Test that the first votes on an edge made concurrently by two workers are both counted."""
+        edge = make_edge(make_protein_node(), make_protein_node())
+        u1, u2 = User(email='u1@example.com'), User(email='u2@example.com')
+        self.manager.session.add_all([edge, u1, u2])
+        self.manager.session.commit()
+
+        other_manager = WebManager(connection=self.connection)
+        other_manager.get_or_create_vote(other_manager.session.merge(edge), other_manager.session.merge(u2), True)
+        other_manager.session.close()
+
+        # pretend the other worker counted its vote between checking for the counts and adding them
+        increment_edge_feedback = self.manager._increment_edge_feedback
+        increments = [lambda *args, **kwargs: False, increment_edge_feedback]
+        with mock.patch.object(
+            self.manager,
+            '_increment_edge_feedback',
+            side_effect=lambda *args, **kwargs: increments.pop(0)(*args, **kwargs),
+        ), self.assertLogs('bel_commons.manager_base', level='DEBUG'):
+            self.manager.get_or_create_vote(edge, u1, agreed=True)
+
+        self.assertEqual((2, 0), (edge.feedback.up, edge.feedback.down))
+        self.assertEqual(2, self.manager.count_votes())
+
     def test_drop_edge_cascade_to_vote(self):
         """Test the drop cascade from edge to votes."""
         n1 = Node(type=PROTEIN, bel='p(HGNC:A)')
@@ -231,6 +560,39 @@ class TestManager(TemporaryCacheMethodMixin):
 
         self.assertEqual(0, self.manager.count_queries())
 
+    def test_drop_queries_by_user(self):
+        """Test that dropping queries for a user only drops the queries that no other users own."""
+        u1, u2 = User(), User()
+        n1, n2 = make_network(), make_network()
+        self.add_all_and_commit([u1, u2, n1, n2])
+
+        q1 = self.manager.get_or_create_query([n1])
+        q2 = self.manager.get_or_create_query([n2])
+        q3 = self.manager.get_or_create_query([n1, n2])
+        self.manager.session.commit()
+        for query, user in [(q1, u1), (q2, u1), (q3, u1), (q2, u2), (q3, u2)]:
+            self.manager.get_or_create_user_query(query=query, user=user)
+            self.manager.session.commit()
+        self.assertEqual([q3, q2], u2.get_sorted_queries())
+
+        self.manager.get_or_create_user_query(query=q2, user=u2)  # runs q2 again
+        self.manager.session.commit()
+        self.assertEqual([q2, q3], u2.get_sorted_queries())
+        self.assertEqual([q3, q2, q1], u1.get_sorted_queries())
+
+        self.manager.drop_query_by_user_id(q3, u2.id)
+        self.assertEqual(3, self.manager.count_queries())
+        self.assertEqual([q2], u2.get_sorted_queries())
+
+        self.manager.drop_queries_by_user_id(u1.id)
+        self.assertEqual(1, self.manager.count_queries())
+        self.assertEqual([], u1.get_sorted_queries())
+        self.assertEqual([q2], u2.get_sorted_queries())
+
+        self.manager.drop_query_by_user_id(q2)
+        self.assertEqual(0, self.manager.count_queries())
+        self.assertEqual(0, self.manager.session.query(UserQuery).count())
+
     def test_drop_assembly_cascade_query(self):
         """Test that dropping an assembly cascades to queries using it."""
         a1 = Assembly()
@@ -250,3 +612,134 @@ class TestManager(TemporaryCacheMethodMixin):
 
         self.assertEqual(1, self.manager.count_assemblies())
         self.assertEqual(1, self.manager.count_queries(), msg='Cascade to queries did not work')
+
+    def test_query_prefix_hashes(self):
+        """Test that derived queries share the hashes of the prefixes of their pipelines."""
+        assembly = Assembly()
+        q1 = Query(assembly=assembly)
+        self.add_all_and_commit([assembly, q1])
+        q1_hashes = q1.get_prefix_hashes()
+        self.assertEqual(1, len(q1_hashes))
+        self.assertEqual(q1.get_canonical_hash(), q1_hashes[-1])
+
+        q2 = q1.build_appended('remove_pathologies')
+        q3 = q2.build_appended('remove_associations')
+        self.add_all_and_commit([q2, q3])
+        q2_hashes = q2.get_prefix_hashes()
+        q3_hashes = q3.get_prefix_hashes()
+        self.assertEqual(q1_hashes, q2_hashes[:1])
+        self.assertEqual(q2_hashes, q3_hashes[:2])
+        self.assertEqual(q3.get_canonical_hash(), q3_hashes[-1])
+
+        q4 = Query(assembly=assembly, pipeline=q1.build_appended('remove_associations').pipeline)
+        self.add_all_and_commit([q4])
+        q4_hashes = q4.get_prefix_hashes()
+        self.assertEqual(q1_hashes, q4_hashes[:1])
+        self.assertNotEqual(q2_hashes[1], q4_hashes[1])
+
+    def test_query_checkpoints(self):
+        """Test that queries derived from other queries are resumed from their results."""
+        graph = BELGraph()
+        graph.add_increases(Protein('HGNC', 'A'), Protein('HGNC', 'B'), citation=n(), evidence=n())
+        graph.add_association(Protein('HGNC', 'B'), Protein('HGNC', 'C'), citation=n(), evidence=n())
+        network = make_network()
+        self.add_all_and_commit([network])
+
+        q1 = self.manager.get_or_create_query([network])
+        q2 = q1.build_appended('remove_associations')
+        q3 = q2.build_appended('remove_isolated_nodes')
+        q4 = q2.build_appended('remove_pathologies')
+        self.add_all_and_commit([q2, q3, q4])
+
+        with mock.patch.object(self.manager, 'get_graph_by_ids', side_effect=lambda _: graph.copy()) as get_universe:
+            self.assertEqual(3, self.manager.get_graph_from_query(q1).number_of_nodes())
+            self.assertEqual(2, self.manager.get_graph_from_query(q3).number_of_nodes())
+            # the sibling query resumes from the checkpoint stored after the first step of the other one
+            self.assertEqual(3, self.manager.get_graph_from_query(q4).number_of_nodes())
+            self.assertEqual(2, self.manager.get_graph_from_query(q3).number_of_nodes())
+            self.assertEqual(1, get_universe.call_count)
+
+        self.assertEqual(
+            [
+                {'steps': 0, 'hits': 1, 'misses': 1},
+                {'steps': 1, 'hits': 1, 'misses': 1},
+                {'steps': 2, 'hits': 1, 'misses': 2},
+            ],
+            self.manager.graph_cache.get_checkpoint_statistics()['steps'],
+        )
+        self.assertEqual(1, self.manager.graph_cache.get_graph(self.manager.graph_cache.get_query_key(q3)).number_of_edges())
+
+    def test_set_betweenness_centrality(self):
+        """Test storing a betweenness centrality calculated on a snapshot by another process."""
+        graph = BELGraph()
+        graph.add_increases(Protein('HGNC', 'A'), Protein('HGNC', 'B'), citation=n(), evidence=n())
+        graph.add_increases(Protein('HGNC', 'B'), Protein('HGNC', 'C'), citation=n(), evidence=n())
+        network = make_network()
+        self.add_all_and_commit([network])
+        query = self.manager.get_or_create_query([network])
+        self.manager.session.commit()
+
+        with mock.patch.object(self.manager, 'get_graph_by_ids', side_effect=lambda _: graph.copy()):
+            snapshot = self.manager.get_snapshot_from_query(query)
+            self.assertIsNone(self.manager.get_cached_betweenness_centrality_from_query(query, 0.0))
+            self.assertIsNone(self.manager.set_betweenness_centrality_from_query(query, 0.0, [0.0, 0.5, 0.0], n()))
+            self.assertIsNone(self.manager.get_cached_betweenness_centrality_from_query(query, 0.0))
+
+            betweenness = snapshot.get_betweenness_centrality()
+            self.manager.set_betweenness_centrality_from_query(query, 0.0, betweenness.tolist(), snapshot.get_digest())
+            self.assertEqual(
+                betweenness.tolist(),
+                self.manager.get_cached_betweenness_centrality_from_query(query, 0.0).tolist(),
+            )
+
+    def test_get_or_create_query(self):
+        """Test that identical queries share a single query and assembly while each user's ownership is recorded."""
+        u1, u2 = User(), User()
+        n1, n2 = make_network(), make_network()
+        self.add_all_and_commit([u1, u2, n1, n2])
+
+        q1 = self.manager.get_or_create_query([n1, n2])
+        self.manager.get_or_create_user_query(query=q1, user=u1)
+        self.manager.session.commit()
+
+        q2 = self.manager.get_or_create_query([n2, n1])
+        uq2 = self.manager.get_or_create_user_query(query=q2, user=u2)
+        self.manager.session.commit()
+        created = uq2.created
+        self.assertIs(uq2, self.manager.get_or_create_user_query(query=q2, user=u2))
+        self.manager.session.commit()
+        self.assertLess(created, uq2.created)
+
+        self.assertEqual(q1.id, q2.id)
+        self.assertEqual(q1.get_canonical_hash(), q1.canonical_hash)
+        self.assertEqual(1, self.manager.count_queries())
+        self.assertEqual(1, self.manager.count_assemblies())
+        self.assertEqual({u1, u2}, {user_query.user for user_query in q1.user_queries})
+
+        q3 = self.manager.get_or_create_query([n1, n2], pipeline=json.dumps([{'function': 'remove_pathologies'}]))
+        self.manager.session.commit()
+        self.assertNotEqual(q1.id, q3.id)
+        self.assertEqual(q1.assembly, q3.assembly)
+        self.assertEqual(2, self.manager.count_queries())
+        self.assertEqual(1, self.manager.count_assemblies())
+
+    def test_get_or_create_query_conflict(self):
+        """Test that a query built concurrently by another worker is used without losing the pending changes."""
+        user = User()
+        n1 = make_network()
+        self.add_all_and_commit([user, n1])
+        q1 = self.manager.get_or_create_query([n1])
+        self.manager.session.commit()
+
+        n2 = make_network()
+        self.manager.session.add(n2)
+        # pretend another worker stored the query between checking for it and building it
+        lookups = [None, q1]
+        with mock.patch.object(self.manager, 'get_query_by_canonical_hash', side_effect=lambda _: lookups.pop(0)):
+            q2 = self.manager.get_or_create_query([n1])
+
+        self.assertEqual(q1.id, q2.id)
+        self.assertIn(n2, self.manager.session)
+        self.manager.session.commit()
+        self.assertEqual(1, self.manager.count_queries())
+        self.assertIsNotNone(n2.id)
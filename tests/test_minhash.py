@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for MinHash signatures and LSH buckets."""
+
+import unittest
+
+import numpy as np
+
+from bel_commons.minhash import (
+    NUMBER_BANDS, NUMBER_PERMUTATIONS, estimate_jaccard, estimate_overlap, get_buckets, get_containment_buckets,
+    get_signature, signature_from_bytes, signature_to_bytes,
+)
+
+
+class TestMinHash(unittest.TestCase):
+    """Test MinHash signatures and LSH buckets."""
+
+    def test_signature(self):
+        """Test that signatures are deterministic and estimate the Jaccard index."""
+        left = range(0, 2000)
+        right = range(1000, 3000)
+
+        signature = get_signature(left)
+        self.assertEqual((NUMBER_PERMUTATIONS,), signature.shape)
+        self.assertTrue(np.array_equal(signature, get_signature(reversed(left))))
+        self.assertTrue(np.array_equal(signature, signature_from_bytes(signature_to_bytes(signature))))
+
+        self.assertEqual(1.0, estimate_jaccard(signature, get_signature(left)))
+        self.assertAlmostEqual(1 / 3, estimate_jaccard(signature, get_signature(right)), delta=0.15)
+        self.assertEqual(0.0, estimate_jaccard(signature, get_signature(range(5000, 6000))))
+        self.assertEqual(0.0, estimate_jaccard(signature, get_signature([])))
+
+    def test_buckets(self):
+        """Test that similar sets share buckets and dissimilar sets don't."""
+        buckets = get_buckets(get_signature(range(0, 100)))
+        self.assertEqual(NUMBER_BANDS, len(set(buckets)))
+
+        self.assertTrue(set(buckets) & set(get_buckets(get_signature(range(10, 110)))))
+        self.assertFalse(set(buckets) & set(get_buckets(get_signature(range(1000, 1100)))))
+
+    def test_containment(self):
+        """Test that a small set contained in a big one shares containment buckets and has a high estimated overlap."""
+        small, big = range(0, 20), range(0, 1000)
+        small_signature, big_signature = get_signature(small), get_signature(big)
+        self.assertLess(estimate_jaccard(small_signature, big_signature), 0.1)
+
+        buckets = get_containment_buckets(small_signature)
+        self.assertEqual(NUMBER_PERMUTATIONS, len(set(buckets)))
+        self.assertTrue(set(buckets) & set(get_containment_buckets(big_signature)))
+        self.assertFalse(set(get_buckets(small_signature)) & set(get_buckets(big_signature)))
+
+        self.assertGreater(estimate_overlap(small_signature, len(small), big_signature, len(big)), 0.5)
+        self.assertEqual(1.0, estimate_overlap(big_signature, len(big), big_signature, len(big)))
+        self.assertEqual(0.0, estimate_overlap(big_signature, len(big), get_signature(range(5000, 5100)), 100))
+        self.assertEqual(0.0, estimate_overlap(big_signature, len(big), get_signature([]), 0))
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the vectorized calculation of overlaps between networks."""
+
+import random
+import unittest
+
+from bel_commons.overlaps import build_incidence, calculate_network_overlaps, calculate_overlaps
+
+
+class TestOverlaps(unittest.TestCase):
+    """Test calculating overlaps with sparse matrices."""
+
+    def setUp(self):
+        """Make random networks with some nodes in common, one network with no nodes, and one isolated network."""
+        rng = random.Random(0)
+        self.nodes = {
+            network_id: set(rng.sample(range(200), rng.randint(5, 50)))
+            for network_id in range(3, 30, 3)
+        }
+        self.nodes[100] = set()
+        self.nodes[101] = {1000, 1001}
+        pairs = [
+            (network_id, node_id)
+            for network_id, node_ids in self.nodes.items()
+            for node_id in node_ids
+        ]
+        # a duplicate pair and a pair from a network that isn't included
+        pairs.extend([pairs[0], (200, 1)])
+        self.incidence = build_incidence(self.nodes, pairs)
+
+    def get_expected(self, left_id: int, right_id: int):
+        """Calculate the overlap of the two networks the slow way."""
+        left, right = self.nodes[left_id], self.nodes[right_id]
+        if not left or not right:
+            return 0.0
+        return len(left & right) / min(len(left), len(right))
+
+    def test_incidence(self):
+        """Test building the incidence matrix."""
+        self.assertEqual(sorted(self.nodes), self.incidence.network_ids.tolist())
+        sizes = [len(self.nodes[network_id]) for network_id in sorted(self.nodes)]
+        self.assertEqual(sizes, self.incidence.sizes.tolist())
+
+    def test_overlaps(self):
+        """Test calculating the overlaps of all pairs of networks."""
+        overlaps = calculate_overlaps(self.incidence)
+        self.assertEqual(len(overlaps), len({(left_id, right_id) for left_id, right_id, _ in overlaps}))
+        for left_id, right_id, overlap in overlaps:
+            self.assertGreater(left_id, right_id)
+            self.assertAlmostEqual(self.get_expected(left_id, right_id), overlap)
+
+        expected = {
+            (left_id, right_id)
+            for left_id in self.nodes
+            for right_id in self.nodes
+            if left_id > right_id and self.get_expected(left_id, right_id) > 0
+        }
+        self.assertEqual(expected, {(left_id, right_id) for left_id, right_id, _ in overlaps})
+
+    def test_network_overlaps(self):
+        """Test calculating the overlaps of one network."""
+        overlaps = calculate_network_overlaps(self.incidence, 9)
+        self.assertEqual(
+            sorted(t for t in calculate_overlaps(self.incidence) if 9 in t[:2]),
+            sorted(overlaps),
+        )
+        self.assertEqual([], calculate_network_overlaps(self.incidence, 101))
+
+        with self.assertRaises(ValueError):
+            calculate_network_overlaps(self.incidence, 10)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for keyset pagination."""
+
+import unittest
+
+from flask import Flask
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+from werkzeug.exceptions import BadRequest
+
+from bel_commons.pagination import decode_cursor, encode_cursor, get_page, get_requested_page, jsonify_page
+
+Base = declarative_base()
+
+
+class Item(Base):
+    """A row to paginate."""
+
+    __tablename__ = 'item'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255))
+
+
+class TestPagination(unittest.TestCase):
+    """Test walking through the pages of a query."""
+
+    def setUp(self):
+        """Fill a database with items that have gaps between their identifiers."""
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine)
+        self.session = sessionmaker(bind=engine)()
+        self.session.add_all([Item(id=i * 3, name=f'item {i}') for i in range(1, 11)])
+        self.session.commit()
+
+    def tearDown(self):
+        """Close the session."""
+        self.session.close()
+
+    def test_cursor(self):
+        """Test that continuation tokens are opaque and round trip."""
+        cursor = encode_cursor(12)
+        self.assertNotIn('12', cursor)
+        self.assertEqual(12, decode_cursor(cursor))
+
+        for cursor in ('!', encode_cursor('a'), 'W10'):
+            with self.subTest(cursor=cursor), self.assertRaises(BadRequest):
+                decode_cursor(cursor)
+
+    def test_pages(self):
+        """Test that walking through the pages gives every row once, in order."""
+        query = self.session.query(Item).filter(Item.id > 3)
+
+        ids = []
+        cursor = None
+        number_pages = 0
+        while True:
+            page = get_page(query, Item.id, cursor=cursor, limit=4)
+            self.assertLessEqual(len(page.items), 4)
+            ids.extend(item.id for item in page.items)
+            number_pages += 1
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        self.assertEqual(list(range(6, 31, 3)), ids)
+        self.assertEqual(3, number_pages)
+
+        page = get_page(query, Item.id, limit=9)
+        self.assertEqual(9, len(page.items))
+        self.assertIsNone(page.next_cursor)
+
+    def test_response(self):
+        """Test getting the page from the arguments of a request."""
+        app = Flask(__name__)
+
+        @app.route('/items')
+        def get_items():
+            page = get_requested_page(self.session.query(Item), Item.id)
+            return jsonify_page(page, lambda item: item.name, total=10)
+
+        with app.test_client() as client:
+            data = client.get('/items', query_string={'limit': 8}).get_json()
+            self.assertEqual([f'item {i}' for i in range(1, 9)], data['items'])
+            self.assertEqual(10, data['total'])
+
+            data = client.get('/items', query_string={'limit': 8, 'cursor': data['next']}).get_json()
+            self.assertEqual(['item 9', 'item 10'], data['items'])
+            self.assertIsNone(data['next'])
+
+            self.assertEqual(400, client.get('/items', query_string={'limit': 0}).status_code)
+            self.assertEqual(400, client.get('/items', query_string={'cursor': 'x'}).status_code)
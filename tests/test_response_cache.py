@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the cache of responses from read-only API endpoints."""
+
+import unittest
+
+from flask import Flask, abort, jsonify
+
+from bel_commons.response_cache import ResponseCache, cache_response, get_response_cache
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test conditional requests and cached bodies."""
+
+    def setUp(self):
+        """Build an app with a cached view that counts how many times it's called."""
+        self.app = Flask(__name__)
+        self.calls = []
+        self.versions = {1: 'a', 2: 'a'}
+
+        def get_identity(item_id: int) -> str:
+            if item_id not in self.versions:
+                abort(404)
+            return f'{item_id}:{self.versions[item_id]}'
+
+        @self.app.route('/item/<int:item_id>')
+        @cache_response(get_identity)
+        def get_item(item_id: int):
+            self.calls.append(item_id)
+            if item_id == 2:
+                return jsonify(error='failed'), 500
+            return jsonify(id=item_id, version=self.versions[item_id])
+
+    def test_cache(self):
+        """Test that repeated requests are answered from the cache and revalidated with the ETag."""
+        with self.app.test_client() as client:
+            response = client.get('/item/1')
+            self.assertEqual(200, response.status_code)
+            self.assertEqual({'id': 1, 'version': 'a'}, response.get_json())
+            self.assertIn('private', response.headers['Cache-Control'])
+            etag = response.headers['ETag']
+
+            response = client.get('/item/1')
+            self.assertEqual({'id': 1, 'version': 'a'}, response.get_json())
+            self.assertEqual(etag, response.headers['ETag'])
+            self.assertEqual('application/json', response.mimetype)
+            self.assertEqual([1], self.calls)
+
+            response = client.get('/item/1', headers={'If-None-Match': etag})
+            self.assertEqual(304, response.status_code)
+            self.assertEqual(b'', response.data)
+            self.assertEqual(etag, response.headers['ETag'])
+
+            self.versions[1] = 'b'
+            response = client.get('/item/1', headers={'If-None-Match': etag})
+            self.assertEqual(200, response.status_code)
+            self.assertEqual({'id': 1, 'version': 'b'}, response.get_json())
+            self.assertNotEqual(etag, response.headers['ETag'])
+            self.assertEqual([1, 1], self.calls)
+
+            with self.app.app_context():
+                response_cache = get_response_cache()
+            self.assertEqual((1, 2), (response_cache.hits, response_cache.misses))
+
+    def test_uncached(self):
+        """Test that failed responses and aborted identities aren't cached."""
+        with self.app.test_client() as client:
+            self.assertEqual(404, client.get('/item/3').status_code)
+            self.assertEqual(500, client.get('/item/2').status_code)
+            self.assertEqual(500, client.get('/item/2').status_code)
+            self.assertNotIn('ETag', client.get('/item/2').headers)
+            self.assertEqual([2, 2, 2], self.calls)
+
+    def test_bounded(self):
+        """Test that the least recently used bodies are evicted."""
+        response_cache = ResponseCache(max_size=200)
+        response_cache.set('a', 'application/json', b'a' * 100)
+        response_cache.set('b', 'application/json', b'b' * 100)
+        self.assertIsNone(response_cache.get('a'))
+        self.assertEqual(('application/json', b'b' * 100), response_cache.get('b'))
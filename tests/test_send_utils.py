@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for serializing graphs for the response."""
+
+import gzip
+import json
+import unittest
+from io import StringIO
+
+from flask import Flask
+
+from bel_commons.send_utils import (
+    CanonicalStrings, iter_csv_lines, iter_gsea_lines, iter_sif_lines, serve_network, to_cx_stream, to_jgif_stream,
+    to_json_custom, to_json_custom_stream, to_nodelink_stream,
+)
+from bel_commons.streaming import JSONArray, JSONObject, iter_chunks, iter_json
+from pybel import from_bytes, to_bytes, to_csv, to_cx, to_gsea, to_jgif, to_nodelink, to_sif
+from pybel.canonicalize import edge_to_bel
+from pybel.examples import braf_graph, egf_graph, homology_graph, sialic_acid_graph
+
+
+class TestCanonicalStrings(unittest.TestCase):
+    """Test the memo of BEL strings for the network explorer."""
+
+    def test_strings(self):
+        """Test that the memo gives the same strings as PyBEL."""
+        canonical = CanonicalStrings()
+        for node in sialic_acid_graph:
+            self.assertEqual(node.as_bel(), canonical.get_bel(node))
+        for u, v, data in sialic_acid_graph.edges(data=True):
+            self.assertEqual(edge_to_bel(u, v, data), canonical.get_edge_bel(u, v, data))
+
+        self.assertTrue(canonical.changed)
+        self.assertEqual({node.md5: node.as_bel() for node in sialic_acid_graph}, canonical.bels)
+
+    def test_reuse(self):
+        """Test that a memo of a graph can be used for a copy of the graph loaded from the cache."""
+        expected = to_json_custom(braf_graph)
+
+        canonical = CanonicalStrings()
+        self.assertEqual(expected, to_json_custom(braf_graph, canonical=canonical))
+
+        canonical = CanonicalStrings(canonical.bels)
+        graph = from_bytes(to_bytes(braf_graph))
+        self.assertEqual(expected, to_json_custom(graph, canonical=canonical))
+        self.assertFalse(canonical.changed)
+
+
+def _remove_last_update(cx):
+    for aspect in cx:
+        for metadata in aspect.get('metaData', []):
+            del metadata['lastUpdate']
+    return cx
+
+
+class TestStreaming(unittest.TestCase):
+    """Test streaming JSON for large graphs."""
+
+    def test_iter_json(self):
+        """Test encoding JSON in parts."""
+        value = JSONObject([
+            ('a', JSONArray(iter([1, {'b': 2}, JSONArray(iter([]))]))),
+            ('c', None),
+        ])
+        parts = list(iter_json(value))
+        self.assertEqual({'a': [1, {'b': 2}, []], 'c': None}, json.loads(''.join(parts)))
+        self.assertEqual(
+            [''.join(parts).encode('utf-8')],
+            list(iter_chunks(parts)),
+        )
+        self.assertEqual(len(parts), len(list(iter_chunks(parts, chunk_size=1))))
+
+    def test_formats(self):
+        """Test the streamed formats give the same JSON as the ones built in memory."""
+        for graph in (egf_graph, homology_graph, sialic_acid_graph):
+            with self.subTest(graph=graph.name):
+                self.assertEqual(
+                    json.loads(json.dumps(to_json_custom(graph))),
+                    json.loads(''.join(iter_json(to_json_custom_stream(graph)))),
+                )
+                self.assertEqual(
+                    json.loads(json.dumps(to_nodelink(graph))),
+                    json.loads(''.join(iter_json(to_nodelink_stream(graph)))),
+                )
+                self.assertEqual(
+                    json.loads(json.dumps(to_jgif(graph))),
+                    json.loads(''.join(iter_json(to_jgif_stream(graph)))),
+                )
+                self.assertEqual(
+                    _remove_last_update(json.loads(json.dumps(to_cx(graph)))),
+                    _remove_last_update(json.loads(''.join(iter_json(to_cx_stream(graph))))),
+                )
+
+    def test_response(self):
+        """Test streaming a graph in the response."""
+        app = Flask(__name__)
+
+        @app.route('/<serve_format>')
+        def serve(serve_format):
+            return serve_network(sialic_acid_graph, serve_format=serve_format)
+
+        with app.test_client() as client:
+            response = client.get('/jgif')
+            self.assertTrue(response.is_streamed)
+            self.assertEqual('application/json', response.mimetype)
+            self.assertEqual(json.loads(json.dumps(to_jgif(sialic_acid_graph))), response.get_json())
+
+    def test_lines(self):
+        """Test the streamed text formats give the same lines as the ones written to files."""
+        for graph in (egf_graph, homology_graph, sialic_acid_graph):
+            for iter_lines, to_file in ((iter_sif_lines, to_sif), (iter_csv_lines, to_csv), (iter_gsea_lines, to_gsea)):
+                with self.subTest(graph=graph.name, format=to_file.__name__):
+                    file = StringIO()
+                    to_file(graph, file)
+                    self.assertEqual(file.getvalue().splitlines(), list(iter_lines(graph)))
+
+    def test_compressed_response(self):
+        """Test streaming a text export compressed with gzip, if the client accepts it."""
+        app = Flask(__name__)
+        app.config['EXPORT_COMPRESS'] = True
+
+        @app.route('/<serve_format>')
+        def serve(serve_format):
+            return serve_network(sialic_acid_graph, serve_format=serve_format)
+
+        expected = list(iter_sif_lines(sialic_acid_graph))
+
+        with app.test_client() as client:
+            response = client.get('/sif', headers={'Accept-Encoding': 'gzip, deflate'})
+            self.assertTrue(response.is_streamed)
+            self.assertEqual('gzip', response.headers['Content-Encoding'])
+            self.assertIn('Accept-Encoding', response.headers['Vary'])
+            self.assertIn('attachment', response.headers['Content-Disposition'])
+            self.assertEqual(expected, gzip.decompress(response.data).decode('utf-8').splitlines())
+
+            response = client.get('/sif')
+            self.assertNotIn('Content-Encoding', response.headers)
+            self.assertEqual(expected, response.data.decode('utf-8').splitlines())
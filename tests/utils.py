@@ -7,6 +7,7 @@ from typing import Optional
 
 from bel_commons.models import Report
 from pybel.constants import INCREASES, PROTEIN
+from pybel.dsl import Protein
 from pybel.manager import Edge, Network, Node
 from pybel.testing.utils import n
 
@@ -38,6 +39,12 @@ def make_node() -> Node:
     return Node(type=PROTEIN, bel=bel, md5=hashlib.md5(bel.encode('utf-8')).hexdigest(), data={})
 
 
+def make_protein_node() -> Node:
+    """Make a dummy protein node whose data can be converted back to a PyBEL node."""
+    protein = Protein(namespace='HGNC', name=n())
+    return Node(type=PROTEIN, bel=protein.as_bel(), md5=protein.md5, data=protein)
+
+
 def make_edge(source: Optional[Node] = None, target: Optional[Node] = None) -> Edge:
     """Make a dummy edge."""
     if source is None: